@@ -0,0 +1,114 @@
+import time
+import argparse
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from json_to_packetcsv import (FEATURE_COLUMNS, MAX_QUIC_FRAMES, MAX_HTTP3_FRAMES, iter_packet_records,
+                               iter_packet_feature_chunks, safe_int)
+
+# python3 benchmark_packet_features.py ../../result_files/flood_con:20-50_time:180_it:10.json
+
+def parse_timestamp(time_str):
+    time_str = ' '.join(time_str.split())
+    if 'CET' in time_str:
+        time_str = time_str.replace(' CET', '')
+    base_time_str = time_str.split('.')[0]
+    microseconds = time_str.split('.')[1][:6] if '.' in time_str else '0'
+    base_time = datetime.strptime(base_time_str, "%b %d, %Y %H:%M:%S")
+    return base_time.replace(microsecond=int(microseconds))
+
+def ensure_three_elements(lst):
+    return (lst + [np.nan] * 3)[:3]
+
+def dict_row_features(file_path):
+    # The builder before the streaming rewrite: the whole file in memory, one dict of
+    # f-string keys per packet and a single DataFrame at the end
+    packets = []
+    prev_time = None
+    for packet in list(iter_packet_records(file_path)):
+        try:
+            attack_type = int(str(packet.get("Attack Type", "0")))
+        except ValueError:
+            attack_type = 6
+
+        quic_frames = packet.get("QUIC Frames", [])
+        http3_frames = packet.get("HTTP3 Frames", [])
+        if len(quic_frames) > MAX_QUIC_FRAMES or len(http3_frames) > MAX_HTTP3_FRAMES:
+            continue
+
+        arrival_time = parse_timestamp(packet["Arrival Time"])
+        interarrival_time = (arrival_time - prev_time).total_seconds() if prev_time else 0
+        prev_time = arrival_time
+
+        packet_info = {
+            "Packet Length": int(packet["Packet Length"]),
+            "Interarrival Time": interarrival_time,
+            "Num QUIC Frames": len(quic_frames),
+            "Num HTTP3 Frames": len(http3_frames),
+        }
+        for i, frame in enumerate(quic_frames):
+            frame_types = ensure_three_elements(frame.get("Frame Types", []))
+            packet_info.update({
+                f"QUIC_Frame_{i+1}_Packet_Length": safe_int(frame.get("Packet Length")),
+                f"QUIC_Frame_{i+1}_Packet_Number": safe_int(frame.get("Packet number")),
+                f"QUIC_Frame_{i+1}_Length": safe_int(frame.get("Length")),
+                f"QUIC_Frame_{i+1}_Type_1": frame_types[0],
+                f"QUIC_Frame_{i+1}_Type_2": frame_types[1],
+                f"QUIC_Frame_{i+1}_Type_3": frame_types[2]
+            })
+        for i, frame in enumerate(http3_frames):
+            frame_types = ensure_three_elements(frame.get("Frame Types", []))
+            packet_info.update({
+                f"HTTP3_Frame_{i+1}_Type_1": frame_types[0],
+                f"HTTP3_Frame_{i+1}_Type_2": frame_types[1],
+                f"HTTP3_Frame_{i+1}_Type_3": frame_types[2],
+                f"HTTP3_Frame_{i+1}_Length": safe_int(frame.get("Frame Length")),
+                f"HTTP3_Frame_{i+1}_Settings_Capacity": safe_int(frame.get("Settings Max Table Capacity"))
+            })
+        packet_info["Attack Type"] = attack_type
+        packets.append(packet_info)
+
+    return pd.DataFrame(packets).fillna(0).reindex(columns=FEATURE_COLUMNS, fill_value=0)
+
+def decode_only(file_path):
+    # Lower bound for any builder: decoding the packet records and nothing else
+    return pd.DataFrame(index=range(sum(1 for _ in iter_packet_records(file_path))))
+
+def chunked_features(file_path):
+    chunks = list(iter_packet_feature_chunks(file_path))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=FEATURE_COLUMNS)
+
+BUILDERS = {"decode only": decode_only, "dict rows": dict_row_features, "chunked": chunked_features}
+
+def time_builder(builder, file_path, repeats):
+    durations = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        df = builder(file_path)
+        durations.append(time.perf_counter() - start_time)
+    return df, min(durations)
+
+def main():
+    parser = argparse.ArgumentParser(description="Packets/sec of the packet feature builders on one result file.")
+    parser.add_argument('result_file', type=str, help="JSON or JSON Lines file written by pcap_to_json.py")
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    results = {}
+    for name, builder in BUILDERS.items():
+        df, duration = time_builder(builder, args.result_file, args.repeats)
+        results[name] = df
+        rate = len(df) / duration if duration > 0 else float('inf')
+        print(f"{name:<12} {len(df):>10} packets in {duration:>8.2f}s ({rate:,.0f} packets/sec)")
+
+    reference, chunked = results["dict rows"], results["chunked"]
+    if reference.shape != chunked.shape:
+        print(f"Shapes differ: {reference.shape} vs {chunked.shape}")
+    elif np.allclose(reference.to_numpy(dtype=np.float64), chunked.to_numpy(dtype=np.float64)):
+        print("Outputs match.")
+    else:
+        print("Outputs differ.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import time
+import argparse
+
+from pcap_to_json import BASE_DIR, BACKENDS, build_packet_info, extract_pcap_name, open_capture
+
+def extract_records(pcap_file, keylog_file, case, backend):
+    start_time = time.time()
+    cap = open_capture(pcap_file, keylog_file, backend)
+    records = [build_packet_info(packet, case) for packet in cap]
+    cap.close()
+    return records, time.time() - start_time
+
+def compare_records(reference, candidate):
+    mismatches = []
+    if len(reference) != len(candidate):
+        mismatches.append(f"Packet count differs: {len(reference)} vs {len(candidate)}")
+    for expected, actual in zip(reference, candidate):
+        if expected != actual:
+            mismatches.append(f"Packet {expected['Packet Number']} differs:\n  expected: {expected}\n  actual:   {actual}")
+    return mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare speed and output of the pyshark and tshark extraction backends.")
+    parser.add_argument('case', type=str)
+    parser.add_argument('--base-dir', type=str, default=BASE_DIR)
+    parser.add_argument('--show', type=int, default=5, help='Number of mismatching packets to print')
+    args = parser.parse_args()
+
+    case = extract_pcap_name(args.case)
+    pcap_file = f'{args.base_dir}/packet_capture/{case}.pcap'
+    keylog_file = f'{args.base_dir}/secrets_files/{case}.txt'
+
+    results = {}
+    for backend in BACKENDS:
+        records, duration = extract_records(pcap_file, keylog_file, case, backend)
+        results[backend] = (records, duration)
+        rate = len(records) / duration if duration > 0 else float('inf')
+        print(f"{backend}: {len(records)} packets in {duration:.2f}s ({rate:.1f} packets/sec)")
+
+    pyshark_records, pyshark_duration = results['pyshark']
+    tshark_records, tshark_duration = results['tshark']
+    if tshark_duration > 0:
+        print(f"Speedup: {pyshark_duration / tshark_duration:.1f}x")
+
+    mismatches = compare_records(pyshark_records, tshark_records)
+    if mismatches:
+        print(f"\n{len(mismatches)} mismatches found:")
+        for mismatch in mismatches[:args.show]:
+            print(mismatch)
+    else:
+        print("Outputs are identical.")
+
+if __name__ == "__main__":
+    main()
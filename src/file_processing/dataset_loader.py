@@ -0,0 +1,114 @@
+import os
+import glob
+import json
+import shutil
+import hashlib
+import tempfile
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.impute import SimpleImputer
+from dataset_store import list_partitions, load_partitions
+
+BASE_DIR = "/home/philipp/Documents/Thesis/session_Datasets"
+CACHE_DIR = "/home/philipp/Documents/Thesis/dataset_cache"
+
+SCENARIO_CONFIG = {
+    "normal": {"label": 0, "prefix": None},
+    "slowloris": {"label": 1, "prefix": "slowloris_isolated_con:5-10_sleep:1-5_time:100_it:"},
+    "quicly": {"label": 2, "prefix": "quicly_isolation_time:100_it:"},
+    "lsquic": {"label": 3, "prefix": "lsquic_isolation_time:100_it:"}
+}
+
+def list_scenario_files(base_dir, scenario, prefix=None):
+    csv_files = glob.glob(os.path.join(base_dir, scenario, "*.csv"))
+    if prefix:
+        csv_files = [f for f in csv_files if os.path.basename(f).startswith(prefix)]
+    return csv_files
+
+def load_csv_files(file_paths, label):
+    dfs = []
+    for file in file_paths:
+        try:
+            df = pd.read_csv(file)
+            df['label'] = label
+            dfs.append(df)
+        except Exception as e:
+            print(f"Error loading {file}: {e}")
+    return dfs
+
+def collect_dataset_files(scenario_config, base_dir=BASE_DIR, store_dir=None):
+    dataset_files = {}
+    for scenario, config in scenario_config.items():
+        if store_dir:
+            dataset_files[scenario] = list_partitions(store_dir, scenario, config["prefix"])
+        else:
+            dataset_files[scenario] = list_scenario_files(base_dir, scenario, config["prefix"])
+    return dataset_files
+
+def dataset_fingerprint(dataset_files, scenario_config):
+    digest = hashlib.sha256()
+    digest.update(json.dumps(scenario_config, sort_keys=True).encode())
+    for scenario, files in dataset_files.items():
+        for file in files:
+            stat = os.stat(file)
+            digest.update(f"{scenario}|{file}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:16]
+
+def build_labeled_matrix(dataset_files, scenario_config, from_store=False):
+    dataframes = []
+    for scenario, files in dataset_files.items():
+        label = scenario_config[scenario]["label"]
+        if from_store:
+            df = load_partitions(files)
+            df['label'] = label
+            dataframes.append(df)
+        else:
+            dataframes.extend(load_csv_files(files, label))
+
+    data = pd.concat(dataframes, ignore_index=True)
+    X = data.drop(columns=['label'])
+    y = data['label'].to_numpy()
+
+    imputer = SimpleImputer(strategy='mean')
+    X_imputed = imputer.fit_transform(X)
+    return X_imputed, y, list(imputer.get_feature_names_out()), imputer
+
+def write_cache(cache_path, X, y, feature_names, imputer, dataset_files):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = tempfile.mkdtemp(dir=os.path.dirname(cache_path))
+    np.save(os.path.join(tmp_path, "X.npy"), np.ascontiguousarray(X))
+    np.save(os.path.join(tmp_path, "y.npy"), y)
+    joblib.dump(imputer, os.path.join(tmp_path, "imputer.pkl"))
+    with open(os.path.join(tmp_path, "meta.json"), 'w') as f:
+        json.dump({"feature_names": feature_names, "files": dataset_files}, f, indent=4)
+
+    try:
+        os.rename(tmp_path, cache_path)
+    except OSError:
+        # Another process finished writing the same cache entry first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+def read_cache(cache_path):
+    X = np.load(os.path.join(cache_path, "X.npy"), mmap_mode='r')
+    y = np.load(os.path.join(cache_path, "y.npy"))
+    imputer = joblib.load(os.path.join(cache_path, "imputer.pkl"))
+    with open(os.path.join(cache_path, "meta.json"), 'r') as f:
+        feature_names = json.load(f)["feature_names"]
+    return X, y, feature_names, imputer
+
+def load_labeled_matrix(scenario_config=SCENARIO_CONFIG, base_dir=BASE_DIR, cache_dir=CACHE_DIR, store_dir=None, use_cache=True):
+    dataset_files = collect_dataset_files(scenario_config, base_dir, store_dir)
+    cache_path = os.path.join(cache_dir, dataset_fingerprint(dataset_files, scenario_config))
+
+    if use_cache and os.path.exists(os.path.join(cache_path, "meta.json")):
+        print(f"Loading cached feature matrix from {cache_path}")
+        return read_cache(cache_path)
+
+    X, y, feature_names, imputer = build_labeled_matrix(dataset_files, scenario_config, from_store=store_dir is not None)
+    if not use_cache:
+        return X, y, feature_names, imputer
+
+    write_cache(cache_path, X, y, feature_names, imputer, dataset_files)
+    print(f"Cached feature matrix at {cache_path}")
+    return read_cache(cache_path)
@@ -0,0 +1,78 @@
+import os
+import re
+import glob
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+BASE_DIR = '/home/philipp/Documents/Thesis'
+FLOW_STORE_DIR = os.path.join(BASE_DIR, "session_Datasets_parquet")
+PACKET_STORE_DIR = os.path.join(BASE_DIR, "packet_Datasets_parquet")
+LABEL_COLUMNS = ["label", "Label", "Attack Type"]
+
+def parse_iteration(file_name):
+    match = re.search(r'it:(\d+)', file_name)
+    return int(match.group(1)) if match else -1
+
+def partition_path(store_dir, scenario, iteration, name):
+    return os.path.join(store_dir, f"scenario={scenario}", f"iteration={iteration}", f"{name}.parquet")
+
+def to_float32(df):
+    return df.astype({column: np.float32 for column in df.columns if column not in LABEL_COLUMNS})
+
+def write_partition(frames, store_dir, scenario, name, iteration=None):
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+    if iteration is None:
+        iteration = parse_iteration(name)
+
+    path = partition_path(store_dir, scenario, iteration, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+
+    writer = None
+    try:
+        for df in frames:
+            table = pa.Table.from_pandas(to_float32(df), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        return None
+    os.replace(tmp_path, path)
+    return path
+
+def list_partitions(store_dir, scenario, prefix=None, iterations=None):
+    pattern = os.path.join(store_dir, f"scenario={scenario}", "iteration=*", "*.parquet")
+    partitions = []
+    for path in glob.glob(pattern):
+        name = os.path.basename(path)
+        if prefix and not name.startswith(prefix):
+            continue
+        iteration = int(os.path.basename(os.path.dirname(path)).split("=")[1])
+        if iterations is not None and not iterations[0] <= iteration <= iterations[1]:
+            continue
+        partitions.append((iteration, name, path))
+    return [path for _, _, path in sorted(partitions)]
+
+def load_partitions(paths, columns=None):
+    tables = [pq.read_table(path, columns=columns) for path in paths]
+    if not tables:
+        return pd.DataFrame(columns=columns)
+    return pa.concat_tables(tables).to_pandas()
+
+def load_scenario(store_dir, scenario, prefix=None, iterations=None, columns=None):
+    return load_partitions(list_partitions(store_dir, scenario, prefix, iterations), columns)
+
+def load_labeled_scenarios(store_dir, scenario_config, columns=None, iterations=None):
+    frames = []
+    for scenario, config in scenario_config.items():
+        df = load_scenario(store_dir, scenario, config["prefix"], iterations, columns)
+        df['label'] = config["label"]
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
@@ -2,6 +2,7 @@ import os
 import pyshark
 import argparse
 import sys
+from tshark_capture import TsharkJsonCapture
 
 QUIC_FRAME_TYPES = {
     "PADDING": 0x00,
@@ -79,15 +80,16 @@ def extract_quic_frames(packet):
 
     return list(frame_types)
 
-def process_pcap(pcap_file, keylog_file):
-    cap = pyshark.FileCapture(
-        pcap_file,
-        override_prefs={
-            'tls.keylog_file': keylog_file,
-            'tls.desegment_ssl_records': 'TRUE',
-            'tls.desegment_ssl_application_data': 'TRUE',
-        },
-    )
+def process_pcap(pcap_file, keylog_file, backend='pyshark'):
+    override_prefs = {
+        'tls.keylog_file': keylog_file,
+        'tls.desegment_ssl_records': 'TRUE',
+        'tls.desegment_ssl_application_data': 'TRUE',
+    }
+    if backend == 'tshark':
+        cap = TsharkJsonCapture(pcap_file, override_prefs=override_prefs)
+    else:
+        cap = pyshark.FileCapture(pcap_file, override_prefs=override_prefs)
 
     for packet in cap:
         try:
@@ -105,6 +107,7 @@ def extract_pcap_name(pcap_path):
 parser = argparse.ArgumentParser()
 parser.add_argument('case', type=str)
 parser.add_argument('--outfile', type=str, default=None, help='Output file path')
+parser.add_argument('--backend', choices=['pyshark', 'tshark'], default='pyshark', help='Packet dissection backend')
 args = parser.parse_args()
 
 if args.outfile:
@@ -115,4 +118,4 @@ case = extract_pcap_name(args.case)
 pcap_file = f'{base_dir}/packet_capture/{case}.pcap'
 keylog_file = f'{base_dir}/secrets_files/{case}.txt'
 
-process_pcap(pcap_file, keylog_file)
+process_pcap(pcap_file, keylog_file, args.backend)
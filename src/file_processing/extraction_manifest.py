@@ -0,0 +1,62 @@
+import os
+import json
+import hashlib
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(manifest_path):
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+def save_manifest(manifest, manifest_path):
+    os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=4, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+def is_up_to_date(manifest, name, path, extractor_version):
+    entry = manifest.get(name)
+    if entry is None or entry.get("extractor_version") != extractor_version:
+        return False
+    if not all(os.path.exists(output) for output in entry.get("outputs", [])):
+        return False
+
+    stat = os.stat(path)
+    if stat.st_size != entry["size"]:
+        return False
+    if stat.st_mtime_ns == entry["mtime_ns"]:
+        return True
+
+    # Touched but possibly unchanged, only then pay for hashing the content
+    if file_sha256(path) != entry["sha256"]:
+        return False
+    entry["mtime_ns"] = stat.st_mtime_ns
+    return True
+
+def record_extraction(manifest, name, path, extractor_version, outputs):
+    stat = os.stat(path)
+    manifest[name] = {
+        "sha256": file_sha256(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "extractor_version": extractor_version,
+        "outputs": list(outputs),
+    }
+
+def remove_stale_entries(manifest, names):
+    # Inputs deleted since the last run: drop their entries and the outputs no other entry uses
+    stale = sorted(set(manifest) - set(names))
+    removed_outputs = [output for name in stale for output in manifest.pop(name).get("outputs", [])]
+    kept_outputs = {output for entry in manifest.values() for output in entry.get("outputs", [])}
+    for output in removed_outputs:
+        if output not in kept_outputs and os.path.exists(output):
+            os.remove(output)
+    return stale
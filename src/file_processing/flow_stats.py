@@ -0,0 +1,208 @@
+import os
+import argparse
+import subprocess
+import time
+import numpy as np
+import pandas as pd
+
+# Same layout as netml's STATS features: duration, packet rate, byte rate, mean,
+# std, 25/50/75% quantiles, min and max of the packet sizes, packets and bytes.
+NUM_STATS = 12
+STATS_COLUMNS = [f"STATS_{i}" for i in range(NUM_STATS)]
+PACKET_FIELDS = [
+    "frame.time_epoch", "frame.cap_len", "ip.src", "ip.dst", "ip.proto",
+    "tcp.srcport", "tcp.dstport", "udp.srcport", "udp.dstport"
+]
+FLOW_KEY = ["src", "dst", "sport", "dport", "proto"]
+
+def read_packets(pcap_path, tshark_path="tshark"):
+    command = [tshark_path, "-r", pcap_path, "-Y", "tcp or udp", "-T", "fields",
+               "-E", "separator=,", "-E", "occurrence=f"]
+    for field in PACKET_FIELDS:
+        command.extend(["-e", field])
+
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    raw = pd.read_csv(process.stdout, header=None, names=PACKET_FIELDS,
+                      dtype={"ip.src": str, "ip.dst": str}, keep_default_na=False, na_values=[""])
+    if process.wait() != 0:
+        raise RuntimeError(f"tshark exited with code {process.returncode} for {pcap_path}")
+
+    # netml's _get_fid puts every TCP/UDP packet without an IPv4 header (IPv6) into
+    # the single flow ('', '', -1, -1, -1)
+    ipv4 = raw["ip.src"].notna()
+    return pd.DataFrame({
+        "time": raw["frame.time_epoch"].to_numpy(dtype=np.float64),
+        "size": raw["frame.cap_len"].to_numpy(dtype=np.float64),
+        "src": raw["ip.src"].where(ipv4, ""),
+        "dst": raw["ip.dst"].where(ipv4, ""),
+        "sport": raw["tcp.srcport"].fillna(raw["udp.srcport"]).where(ipv4, -1),
+        "dport": raw["tcp.dstport"].fillna(raw["udp.dstport"]).where(ipv4, -1),
+        "proto": raw["ip.proto"].where(ipv4, -1),
+    })
+
+def split_by_timeout(times, starts, counts, timeout, flow_ptks_thres):
+    # Same rules as netml's _pcap2flows: a flow ends where the gap to the previous packet
+    # exceeds the tcp/udp timeout and is kept only with at least flow_ptks_thres packets.
+    # Flows that are never split are kept whole, split flows lose their trailing piece.
+    piece_ids = np.full(len(times), -1, dtype=np.int64)
+    gaps = np.diff(times) > timeout
+    next_id = 0
+    for start, count in zip(starts, counts):
+        end = start + count
+        breaks = start + 1 + np.flatnonzero(gaps[start:end - 1])
+        if len(breaks) == 0:
+            if count >= flow_ptks_thres:
+                piece_ids[start:end] = next_id
+                next_id += 1
+            continue
+
+        for piece_start, piece_end in zip(np.r_[start, breaks[:-1]], breaks):
+            if piece_end - piece_start >= flow_ptks_thres:
+                piece_ids[piece_start:piece_end] = next_id
+                next_id += 1
+    return piece_ids
+
+def split_subflows(times, starts, counts, interval, flow_ptks_thres):
+    # Same rules as netml's _flows2subflows. After a split netml records the new subflow's
+    # first packet at the old start advanced by whole intervals, not at its own time, so the
+    # next gap is measured from that quantized start. Split flows lose their trailing subflow.
+    subflow_ids = np.full(len(times), -1, dtype=np.int64)
+    min_packets = max(2, flow_ptks_thres)
+    gaps = np.diff(times) > interval
+    next_id = 0
+    for start, count in zip(starts, counts):
+        end = start + count
+        # Only a gap in the real times can cause the first split
+        if not gaps[start:end - 1].any():
+            if count >= min_packets:
+                subflow_ids[start:end] = next_id
+                next_id += 1
+            continue
+
+        subflow_start = start
+        start_time = last_time = float(times[start])
+        for i in range(start + 1, end):
+            packet_time = float(times[i])
+            if packet_time - last_time <= interval:
+                last_time = packet_time
+                continue
+            if i - subflow_start >= min_packets:
+                subflow_ids[subflow_start:i] = next_id
+                next_id += 1
+            start_time += int((packet_time - start_time) // interval) * interval
+            last_time = start_time
+            subflow_start = i
+    return subflow_ids
+
+def segment_bounds(ids):
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    return starts, np.diff(np.r_[starts, len(ids)])
+
+def segment_quantiles(sorted_sizes, starts, counts, q):
+    # Linear interpolation matching np.quantile's default method
+    position = q * (counts - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, counts - 1)
+    weight = position - lower
+    a = sorted_sizes[starts + lower]
+    b = sorted_sizes[starts + upper]
+    diff = b - a
+    return np.where(weight >= 0.5, b - diff * (1 - weight), a + diff * weight)
+
+def compute_segment_stats(times, sizes, segment_ids):
+    order = np.lexsort((sizes, segment_ids))
+    starts, counts = segment_bounds(segment_ids[order])
+    sorted_sizes = sizes[order]
+    sorted_times = times[order]
+
+    duration = np.maximum.reduceat(sorted_times, starts) - np.minimum.reduceat(sorted_times, starts)
+    num_bytes = np.add.reduceat(sorted_sizes, starts)
+    mean = num_bytes / counts
+    deviation = sorted_sizes - np.repeat(mean, counts)
+    std = np.sqrt(np.add.reduceat(deviation * deviation, starts) / counts)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pkts_rate = np.where(duration > 0, counts / duration, 0.0)
+        bytes_rate = np.where(duration > 0, num_bytes / duration, 0.0)
+
+    return np.column_stack([
+        duration, pkts_rate, bytes_rate, mean, std,
+        segment_quantiles(sorted_sizes, starts, counts, 0.25),
+        segment_quantiles(sorted_sizes, starts, counts, 0.5),
+        segment_quantiles(sorted_sizes, starts, counts, 0.75),
+        np.minimum.reduceat(sorted_sizes, starts),
+        np.maximum.reduceat(sorted_sizes, starts),
+        counts.astype(np.float64), num_bytes
+    ])
+
+def packets_to_flow_stats(packets, flow_ptks_thres=2, q_interval=0.9, timeout=600):
+    if packets.empty:
+        return None
+
+    flow_ids = packets.groupby(FLOW_KEY, sort=False, dropna=False).ngroup().to_numpy()
+    flow_sizes = np.bincount(flow_ids)
+    keep = flow_sizes[flow_ids] >= max(2, flow_ptks_thres)
+    if not keep.any():
+        return None
+
+    flow_ids = flow_ids[keep]
+    times = packets["time"].to_numpy()[keep]
+    sizes = packets["size"].to_numpy()[keep]
+
+    # Flows in order of their first packet, packets by time within a flow, as netml sorts them
+    order = np.lexsort((times, flow_ids))
+    flow_ids, times, sizes = flow_ids[order], times[order], sizes[order]
+    starts, counts = segment_bounds(flow_ids)
+
+    # The pieces left by the timeout split are the flows the interval is computed on
+    piece_ids = split_by_timeout(times, starts, counts, timeout, flow_ptks_thres)
+    valid = piece_ids >= 0
+    if not valid.any():
+        return None
+    piece_ids, times, sizes = piece_ids[valid], times[valid], sizes[valid]
+    starts, counts = segment_bounds(piece_ids)
+
+    durations = np.maximum.reduceat(times, starts) - np.minimum.reduceat(times, starts)
+    interval = np.quantile(durations, q=q_interval)
+
+    subflow_ids = split_subflows(times, starts, counts, interval, flow_ptks_thres)
+    valid = subflow_ids >= 0
+    if not valid.any():
+        return None
+
+    features = compute_segment_stats(times[valid], sizes[valid], subflow_ids[valid])
+    return pd.DataFrame(features, columns=STATS_COLUMNS)
+
+def extract_flow_stats(pcap_path, flow_ptks_thres=2, q_interval=0.9):
+    return packets_to_flow_stats(read_packets(pcap_path), flow_ptks_thres, q_interval)
+
+def main():
+    from netml_feature_extraction_to_csv import extract_netml_features
+
+    parser = argparse.ArgumentParser(description="Compare the native flow statistics with netml's STATS features.")
+    parser.add_argument("pcap_file", type=str, help="File name inside packet_capture/")
+    args = parser.parse_args()
+
+    pcap_path = os.path.join('/home/philipp/Documents/Thesis', "packet_capture", args.pcap_file)
+
+    start_time = time.time()
+    reference = extract_netml_features(args.pcap_file)
+    netml_duration = time.time() - start_time
+
+    start_time = time.time()
+    native = extract_flow_stats(pcap_path)
+    native_duration = time.time() - start_time
+
+    print(f"netml:  {0 if reference is None else len(reference)} flows in {netml_duration:.2f}s")
+    print(f"native: {0 if native is None else len(native)} flows in {native_duration:.2f}s")
+    if reference is None or native is None or reference.shape != native.shape:
+        print("Flow counts differ, cannot compare values.")
+        return
+
+    reference = reference.reindex(columns=STATS_COLUMNS)
+    difference = np.abs(reference.to_numpy() - native.to_numpy())
+    for column, max_difference in zip(STATS_COLUMNS, difference.max(axis=0)):
+        print(f"{column}: max abs difference {max_difference:.6g}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import json
+import textwrap
+
+SEPARATORS = " \t\r\n[,]"
+
+def iter_json_objects(stream, chunk_size=1 << 20):
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+
+    while True:
+        while position < len(buffer) and buffer[position] in SEPARATORS:
+            position += 1
+
+        if position < len(buffer):
+            try:
+                obj, end = decoder.raw_decode(buffer, position)
+                yield obj
+                position = end
+                continue
+            except json.JSONDecodeError:
+                pass
+
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            if position < len(buffer):
+                raise ValueError("Truncated JSON input")
+            return
+        buffer = buffer[position:] + chunk
+        position = 0
+
+def write_json_array(records, f, indent=4):
+    count = 0
+    for record in records:
+        f.write("[\n" if count == 0 else ",\n")
+        f.write(textwrap.indent(json.dumps(record, indent=indent), " " * indent))
+        count += 1
+    f.write("\n]" if count else "[]")
+    return count
+
+def write_json_lines(records, f):
+    count = 0
+    for record in records:
+        f.write(json.dumps(record))
+        f.write("\n")
+        count += 1
+    return count
@@ -1,17 +1,33 @@
 import json
 import pandas as pd
 import numpy as np
-from datetime import datetime
 import os
+from collections import Counter
+import argparse
+from json_stream import iter_json_objects
+from dataset_store import PACKET_STORE_DIR, write_partition
+from extraction_manifest import load_manifest, save_manifest, is_up_to_date, record_extraction, remove_stale_entries
 
-def parse_timestamp(time_str):
-    time_str = ' '.join(time_str.split())
-    if 'CET' in time_str:
-        time_str = time_str.replace(' CET', '')
-    base_time_str = time_str.split('.')[0]
-    microseconds = time_str.split('.')[1][:6] if '.' in time_str else '0'
-    base_time = datetime.strptime(base_time_str, "%b %d, %Y %H:%M:%S")
-    return base_time.replace(microsecond=int(microseconds))
+TIMESTAMP_FORMAT = "%b %d, %Y %H:%M:%S.%f"
+
+def parse_timestamps(time_strs):
+    times = pd.Series(time_strs, dtype=object).str.replace(r'\s+', ' ', regex=True)
+    times = times.str.replace(r' [A-Z]{2,5}$', '', regex=True)
+    times = times.str.replace(r'(:\d{2})$', r'\1.0', regex=True)
+    return pd.to_datetime(times, format=TIMESTAMP_FORMAT, errors='coerce')
+
+def compute_interarrival_times(time_strs, prev_ns=None):
+    arrival_times = parse_timestamps(time_strs).ffill()
+    if prev_ns is not None:
+        arrival_times = arrival_times.fillna(pd.Timestamp(prev_ns))
+    arrival_times = arrival_times.bfill()
+    if arrival_times.isna().all():
+        return np.zeros(len(arrival_times)), prev_ns
+
+    arrival_ns = arrival_times.to_numpy(dtype='datetime64[ns]').view(np.int64)
+    first_ns = arrival_ns[0] if prev_ns is None else prev_ns
+    interarrival_times = np.diff(arrival_ns, prepend=first_ns) / 1e9
+    return interarrival_times, int(arrival_ns[-1])
 
 def safe_int(value):
     try:
@@ -21,120 +37,20 @@ def safe_int(value):
     except (ValueError, TypeError):
         return np.nan
 
-def create_default_quic_frame():
-    return {
-        "Packet Length": np.nan,
-        "Packet number": np.nan,
-        "Length": np.nan,
-        "Frame Types": [np.nan, np.nan, np.nan]
-    }
-
-def create_default_http3_frame():
-    return {
-        "Frame Types": [np.nan, np.nan, np.nan],
-        "Frame Length": np.nan,
-        "Settings Max Table Capacity": np.nan
-    }
-
-def ensure_three_elements(lst):
-    return (lst + [np.nan] * 3)[:3]
-
+MAX_QUIC_FRAMES = 2
+MAX_HTTP3_FRAMES = 4
+CHUNK_SIZE = 65536
+INTEGER_COLUMNS = ["Packet Length", "Num QUIC Frames", "Num HTTP3 Frames", "Attack Type"]
+CSV_FILE = "all_iterations_quic_packets.csv"
+EXTRACTOR_VERSION = "packet-features-1"
 
-def extract_packet_features(file_path):
-    MAX_QUIC_FRAMES = 2
-    MAX_HTTP3_FRAMES = 4
-    
-    with open(file_path, "r") as f:
-        data = json.load(f)
-
-    packets = []
-    prev_time = None
-
-    for packet in data:
-        try:
-            attack_type = int(str(packet.get("Attack Type", "0")))
-        except ValueError:
-            attack_type = 6
-        
-        quic_frames = packet.get("QUIC Frames", [])
-        http3_frames = packet.get("HTTP3 Frames", [])
-        if len(quic_frames) > MAX_QUIC_FRAMES or len(http3_frames) > MAX_HTTP3_FRAMES:
-            continue
-        
-        arrival_time = parse_timestamp(packet["Arrival Time"])
-        if arrival_time is None:
-            arrival_time = prev_time or datetime.now()
-        interarrival_time = (arrival_time - prev_time).total_seconds() if prev_time else 0
-        prev_time = arrival_time
-
-        processed_quic_frames = []
-        for frame in quic_frames[:MAX_QUIC_FRAMES]:
-            processed_quic_frames.append({
-                "Packet Length": safe_int(frame.get("Packet Length")),
-                "Packet number": safe_int(frame.get("Packet number")),
-                "Length": safe_int(frame.get("Length")),
-                "Frame Types": ensure_three_elements(frame.get("Frame Types", []))
-            })
-        
-        processed_http3_frames = []
-        for frame in http3_frames[:MAX_HTTP3_FRAMES]:
-            processed_http3_frames.append({
-                "Frame Types": ensure_three_elements(frame.get("Frame Types", [])),
-                "Frame Length": safe_int(frame.get("Frame Length")),
-                "Settings Max Table Capacity": safe_int(frame.get("Settings Max Table Capacity"))
-            })
-
-        while len(processed_quic_frames) < MAX_QUIC_FRAMES:
-            processed_quic_frames.append(create_default_quic_frame())
-        while len(processed_http3_frames) < MAX_HTTP3_FRAMES:
-            processed_http3_frames.append(create_default_http3_frame())
-
-        packet_info = {
-            "Packet Length": int(packet["Packet Length"]),
-            "Interarrival Time": interarrival_time,
-            "Num QUIC Frames": len(quic_frames),
-            "Num HTTP3 Frames": len(http3_frames),
-        }
-
-        for i in range(MAX_QUIC_FRAMES):
-            quic_frame = processed_quic_frames[i]
-            packet_info.update({
-                f"QUIC_Frame_{i+1}_Packet_Length": quic_frame["Packet Length"],
-                f"QUIC_Frame_{i+1}_Packet_Number": quic_frame["Packet number"],
-                f"QUIC_Frame_{i+1}_Length": quic_frame["Length"],
-                f"QUIC_Frame_{i+1}_Type_1": quic_frame["Frame Types"][0],
-                f"QUIC_Frame_{i+1}_Type_2": quic_frame["Frame Types"][1],
-                f"QUIC_Frame_{i+1}_Type_3": quic_frame["Frame Types"][2]
-            })
-        
-        for i in range(MAX_HTTP3_FRAMES):
-            http3_frame = processed_http3_frames[i]
-            packet_info.update({
-                f"HTTP3_Frame_{i+1}_Type_1": http3_frame["Frame Types"][0],
-                f"HTTP3_Frame_{i+1}_Type_2": http3_frame["Frame Types"][1],
-                f"HTTP3_Frame_{i+1}_Type_3": http3_frame["Frame Types"][2],
-                f"HTTP3_Frame_{i+1}_Length": http3_frame["Frame Length"],
-                f"HTTP3_Frame_{i+1}_Settings_Capacity": http3_frame["Settings Max Table Capacity"]
-            })
-
-        packet_info["Attack Type"] = attack_type
-
-        packets.append(packet_info)
-
-    df = pd.DataFrame(packets)
-    df = df.fillna(0)
-    expected_columns = create_empty_packet_df().columns.tolist()
-    df = df.reindex(columns=expected_columns)
-    
-    return df
-
-def create_empty_packet_df():
+def packet_feature_columns():
     columns = [
         "Packet Length", "Interarrival Time",
         "Num QUIC Frames", "Num HTTP3 Frames"
     ]
     
-    for i in range(1, 3):  
+    for i in range(1, MAX_QUIC_FRAMES + 1):  
         columns.extend([
             f"QUIC_Frame_{i}_Packet_Length",
             f"QUIC_Frame_{i}_Packet_Number",
@@ -144,7 +60,7 @@ def create_empty_packet_df():
             f"QUIC_Frame_{i}_Type_3"
         ])
     
-    for i in range(1, 5): 
+    for i in range(1, MAX_HTTP3_FRAMES + 1): 
         columns.extend([
             f"HTTP3_Frame_{i}_Type_1",
             f"HTTP3_Frame_{i}_Type_2",
@@ -154,52 +70,209 @@ def create_empty_packet_df():
         ])
     
     columns.append("Attack Type")
-    return pd.DataFrame(columns=columns)
+    return columns
+
+FEATURE_COLUMNS = packet_feature_columns()
+COLUMN_INDEX = {name: i for i, name in enumerate(FEATURE_COLUMNS)}
+QUIC_FRAME_COLUMNS = [
+    [COLUMN_INDEX[f"QUIC_Frame_{i}_{suffix}"] for suffix in ("Packet_Length", "Packet_Number", "Length", "Type_1", "Type_2", "Type_3")]
+    for i in range(1, MAX_QUIC_FRAMES + 1)
+]
+HTTP3_FRAME_COLUMNS = [
+    [COLUMN_INDEX[f"HTTP3_Frame_{i}_{suffix}"] for suffix in ("Type_1", "Type_2", "Type_3", "Length", "Settings_Capacity")]
+    for i in range(1, MAX_HTTP3_FRAMES + 1)
+]
+
+def safe_number(value):
+    if isinstance(value, (int, float)) and value == value:
+        return value
+    return 0
+
+def iter_packet_records(file_path):
+    with open(file_path, "r") as f:
+        if file_path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from iter_json_objects(f)
+
+def int_field(value):
+    # safe_number(safe_int(value)), with pyshark's usual decimal strings and 'N/A' first
+    if value.__class__ is str:
+        if value.isdecimal() and len(value) < 20:
+            return int(value)
+        if value == 'N/A' or not value:
+            return 0
+    return safe_number(safe_int(value))
+
+def fill_packet_row(row, packet):
+    # One row per packet: the records arrive as decoded dicts, and gathering the same
+    # values column by column across a chunk measured slower than this
+    try:
+        attack_type = int(str(packet.get("Attack Type", "0")))
+    except ValueError:
+        attack_type = 6
+
+    quic_frames = packet.get("QUIC Frames", [])
+    http3_frames = packet.get("HTTP3 Frames", [])
+
+    row[0] = int(packet["Packet Length"])
+    row[2] = len(quic_frames)
+    row[3] = len(http3_frames)
+
+    for frame, columns in zip(quic_frames, QUIC_FRAME_COLUMNS):
+        row[columns[0]] = int_field(frame.get("Packet Length"))
+        row[columns[1]] = int_field(frame.get("Packet number"))
+        row[columns[2]] = int_field(frame.get("Length"))
+        for column, frame_type in zip(columns[3:], frame.get("Frame Types", [])):
+            row[column] = frame_type if frame_type.__class__ is int else safe_number(frame_type)
+
+    for frame, columns in zip(http3_frames, HTTP3_FRAME_COLUMNS):
+        for column, frame_type in zip(columns[:3], frame.get("Frame Types", [])):
+            row[column] = frame_type if frame_type.__class__ is int else safe_number(frame_type)
+        row[columns[3]] = int_field(frame.get("Frame Length"))
+        row[columns[4]] = int_field(frame.get("Settings Max Table Capacity"))
+
+    row[-1] = attack_type
+    return row
+
+def chunk_to_dataframe(values, size, arrival_times, prev_ns):
+    interarrival_times, prev_ns = compute_interarrival_times(arrival_times, prev_ns)
+    values[:size, COLUMN_INDEX["Interarrival Time"]] = interarrival_times
+    df = pd.DataFrame(values[:size], columns=FEATURE_COLUMNS)
+    df[INTEGER_COLUMNS] = df[INTEGER_COLUMNS].astype(np.int64)
+    return df, prev_ns
+
+def iter_packet_feature_chunks(file_path, chunk_size=CHUNK_SIZE):
+    values = np.zeros((chunk_size, len(FEATURE_COLUMNS)), dtype=np.float64)
+    empty_row = [0] * len(FEATURE_COLUMNS)
+    arrival_times = []
+    size = 0
+    prev_ns = None
+
+    for packet in iter_packet_records(file_path):
+        if len(packet.get("QUIC Frames", [])) > MAX_QUIC_FRAMES or len(packet.get("HTTP3 Frames", [])) > MAX_HTTP3_FRAMES:
+            continue
+
+        values[size] = fill_packet_row(list(empty_row), packet)
+        arrival_times.append(packet["Arrival Time"])
+        size += 1
+        if size == chunk_size:
+            df, prev_ns = chunk_to_dataframe(values, size, arrival_times, prev_ns)
+            yield df
+            values = np.zeros_like(values)
+            arrival_times = []
+            size = 0
+
+    if size:
+        df, prev_ns = chunk_to_dataframe(values, size, arrival_times, prev_ns)
+        yield df
+
+def extract_packet_features(file_path):
+    chunks = list(iter_packet_feature_chunks(file_path))
+    if not chunks:
+        return create_empty_packet_df()
+    return pd.concat(chunks, ignore_index=True)
+
+def create_empty_packet_df():
+    return pd.DataFrame(columns=FEATURE_COLUMNS)
 
 def initialize_csv_files():
     packet_df = create_empty_packet_df()
-    packet_df.to_csv("all_iterations_quic_packets.csv", index=False)
+    packet_df.to_csv(CSV_FILE, index=False)
 
 def append_to_csv(df, filename):
     df.to_csv(filename, mode='a', header=False, index=False)
 
-def process_all_json_files(base_dir):
+def count_attack_types(chunks, attack_counts):
+    for chunk in chunks:
+        attack_counts.update(chunk["Attack Type"].value_counts().to_dict())
+        yield chunk
+
+def list_json_files(json_dir):
+    return [f for f in os.listdir(json_dir) if f.endswith((".json", ".jsonl"))]
+
+def can_append_to_csv(manifest, json_dir):
+    if not manifest or not os.path.exists(CSV_FILE):
+        return False
+    for json_file in manifest:
+        file_path = os.path.join(json_dir, json_file)
+        if not os.path.exists(file_path) or not is_up_to_date(manifest, json_file, file_path, EXTRACTOR_VERSION):
+            print(f"{json_file} changed or was removed since the last run, rebuilding {CSV_FILE}")
+            return False
+    return True
+
+def process_all_json_files(base_dir, output_format="csv", store_dir=PACKET_STORE_DIR, manifest=None, manifest_path=None):
     json_dir = os.path.join(base_dir, "result_files")
-    json_files = [f for f in os.listdir(json_dir) if f.endswith(".json")]
+    json_files = list_json_files(json_dir)
     packet_count = 0
+    skipped = 0
 
     print(f"\nProcessing all JSON files in {json_dir}...")
+    if manifest is not None:
+        for json_file in remove_stale_entries(manifest, json_files):
+            print(f"{json_file} was removed, deleted its packet features")
 
     for json_file in json_files:
         file_path = os.path.join(json_dir, json_file)
+        if manifest is not None and is_up_to_date(manifest, json_file, file_path, EXTRACTOR_VERSION):
+            skipped += 1
+            continue
         print(f"Processing file: {json_file}")
 
+        csv_size = os.path.getsize(CSV_FILE) if output_format == "csv" else None
         try:
-            packet_features = extract_packet_features(file_path)
-            
-            if "Attack Type" in packet_features.columns:
-                print(f"Attack Type column exists with values: {packet_features['Attack Type'].value_counts().to_dict()}")
+            attack_counts = Counter()
+            chunks = count_attack_types(iter_packet_feature_chunks(file_path), attack_counts)
+            if output_format == "parquet":
+                name = os.path.splitext(json_file)[0]
+                output_file = write_partition(chunks, store_dir, name.split('_')[0], name)
             else:
-                print("Attack Type column is missing!")
-            
-            append_to_csv(packet_features, "all_iterations_quic_packets.csv")
-            packet_count += len(packet_features)
+                for packet_features in chunks:
+                    append_to_csv(packet_features, CSV_FILE)
+                output_file = CSV_FILE
 
-            del packet_features
+            packet_count += sum(attack_counts.values())
+            print(f"Attack Type column exists with values: {dict(attack_counts)}")
 
         except Exception as e:
             print(f"Error processing file {json_file}: {e}")
+            if csv_size is not None:
+                # Drop the rows of the failed file so a later incremental run does not duplicate them
+                os.truncate(CSV_FILE, csv_size)
             continue
 
+        if manifest is not None and output_file:
+            record_extraction(manifest, json_file, file_path, EXTRACTOR_VERSION, [output_file])
+            save_manifest(manifest, manifest_path)
+
+    if skipped:
+        print(f"Skipped {skipped} unchanged files")
     return packet_count
 
 def main():
+    parser = argparse.ArgumentParser(description="Build the packet-level dataset from the JSON result files.")
+    parser.add_argument("--output-format", choices=["csv", "parquet"], default="csv", help="Append to one CSV or write a Parquet partition per result file.")
+    parser.add_argument("--store-dir", type=str, default=PACKET_STORE_DIR, help="Root directory of the Parquet dataset.")
+    parser.add_argument("--force", action="store_true", help="Rebuild the dataset from all files, ignoring the manifest.")
+    args = parser.parse_args()
+
     base_dir = '/home/philipp/Documents/Thesis'
     total_packets = 0
 
-    initialize_csv_files()
+    if args.output_format == "parquet":
+        manifest_path = os.path.join(args.store_dir, "extraction_manifest.json")
+    else:
+        manifest_path = f"{os.path.splitext(CSV_FILE)[0]}_manifest.json"
+    manifest = {} if args.force else load_manifest(manifest_path)
+
+    if args.output_format == "csv" and not can_append_to_csv(manifest, os.path.join(base_dir, "result_files")):
+        manifest = {}
+        initialize_csv_files()
 
-    total_packets = process_all_json_files(base_dir)
+    total_packets = process_all_json_files(base_dir, args.output_format, args.store_dir, manifest, manifest_path)
+    save_manifest(manifest, manifest_path)
 
     print("\nFinal Statistics:")
     print(f"Total packets processed: {total_packets}")
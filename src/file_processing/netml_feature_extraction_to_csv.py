@@ -6,43 +6,53 @@ import re
 import numpy as np
 from sklearn.impute import SimpleImputer
 import argparse
+import json
+import time
+from dataset_store import FLOW_STORE_DIR, write_partition
+from extraction_manifest import load_manifest, save_manifest, is_up_to_date, record_extraction, remove_stale_entries
+from parallel_extraction import run_jobs
+from flow_stats import extract_flow_stats
 
 COMMON_FEATURES = None
+EXTRACTOR_VERSIONS = {"netml": "netml-stats-1", "native": "native-stats-3"}
 
 def extract_netml_features(pcap_file):
     print(f"Reading PCAP file: {pcap_file}")
     base_dir = '/home/philipp/Documents/Thesis'
     pcap_dir = os.path.join(base_dir, "packet_capture")
     pcap_path = os.path.join(pcap_dir, pcap_file)
-    try:
-        pcap = PCAP(pcap_path, flow_ptks_thres=2)
-        pcap.pcap2flows()
-
-        feature_types = ['STATS']
-        feature_frames = []
-
-        for feature_type in feature_types:
-            pcap.flow2features(feature_type, fft=False, header=False)
-            if pcap.features is not None:
-                df = pd.DataFrame(pcap.features)
-                df.columns = [f"{feature_type}_{col}" for col in df.columns]
-                feature_frames.append(df)
-            else:
-                print(f"No features extracted for {pcap_file} using {feature_type}")
-                return None
-    
-        if feature_frames:
-            all_features = pd.concat(feature_frames, axis=1)
-            return all_features
+    pcap = PCAP(pcap_path, flow_ptks_thres=2)
+    pcap.pcap2flows()
+
+    feature_types = ['STATS']
+    feature_frames = []
+
+    for feature_type in feature_types:
+        pcap.flow2features(feature_type, fft=False, header=False)
+        if pcap.features is not None:
+            df = pd.DataFrame(pcap.features)
+            df.columns = [f"{feature_type}_{col}" for col in df.columns]
+            feature_frames.append(df)
         else:
-            print(f"No feature frames to concatenate for {pcap_file}")
+            print(f"No features extracted for {pcap_file} using {feature_type}")
             return None
 
-    except (RuntimeError, IndexError) as e:
-        print(f"Error processing PCAP file {pcap_file}: {e}")
+    if feature_frames:
+        all_features = pd.concat(feature_frames, axis=1)
+        return all_features
+    else:
+        print(f"No feature frames to concatenate for {pcap_file}")
         return None
 
-def process_pcap_file(pcap_dir, pcap_file, output_dir, prefix=None):
+def extract_native_features(pcap_file):
+    print(f"Reading PCAP file: {pcap_file}")
+    pcap_path = os.path.join('/home/philipp/Documents/Thesis', "packet_capture", pcap_file)
+    features = extract_flow_stats(pcap_path, flow_ptks_thres=2)
+    if features is None:
+        print(f"No features extracted for {pcap_file} using STATS")
+    return features
+
+def process_pcap_file(pcap_dir, pcap_file, output_dir, prefix=None, output_format="csv", store_dir=FLOW_STORE_DIR, extractor="netml"):
     global COMMON_FEATURES
 
     if prefix and not pcap_file.startswith(prefix):
@@ -57,19 +67,31 @@ def process_pcap_file(pcap_dir, pcap_file, output_dir, prefix=None):
 
     if os.path.exists(pcap_path):
         print(f"Processing file: {pcap_path}")
-        try:
+        if extractor == "native":
+            features_df = extract_native_features(pcap_file)
+        else:
             features_df = extract_netml_features(pcap_file)
-            if features_df is not None:
-                features_df = features_df.reindex(sorted(features_df.columns, key=lambda x: int("".join(filter(str.isdigit, x)))), axis=1)
+        if features_df is not None:
+            features_df = features_df.reindex(sorted(features_df.columns, key=lambda x: int("".join(filter(str.isdigit, x)))), axis=1)
+            if output_format == "parquet":
+                scenario = os.path.basename(os.path.normpath(output_dir))
+                partition = write_partition(features_df, store_dir, scenario, pcap_file.replace(".pcap", ""))
+                print(f"Features saved to {partition}")
+                return partition
+            else:
                 features_df.to_csv(csv_file, index=False, header=True)
                 print(f"Features saved to {csv_file}")
-            else:
-                print(f"No features extracted from {pcap_file}, skipping CSV creation.")
-
-        except Exception as e:
-            print(f"Error processing file {pcap_path}: {e}")
+                return csv_file
+        else:
+            print(f"No features extracted from {pcap_file}, skipping CSV creation.")
     else:
         print(f"File missing: {pcap_path}")
+    return None
+
+def write_summary(summary_path, summary):
+    with open(summary_path, 'w') as f:
+        json.dump(summary, f, indent=4)
+    print(f"Summary saved to {summary_path}")
 
 def main():
     base_dir = '/home/philipp/Documents/Thesis'
@@ -78,14 +100,77 @@ def main():
     
     parser = argparse.ArgumentParser(description="Extract NetML features from PCAP files.")
     parser.add_argument("--prefix", type=str, help="Process only files starting with this prefix.")
+    parser.add_argument("--output-format", choices=["csv", "parquet"], default="csv", help="Write per-file CSVs or a partitioned Parquet dataset.")
+    parser.add_argument("--store-dir", type=str, default=FLOW_STORE_DIR, help="Root directory of the Parquet dataset.")
+    parser.add_argument("--force", action="store_true", help="Re-extract all files, ignoring the manifest.")
+    parser.add_argument("--extractor", choices=list(EXTRACTOR_VERSIONS), default="netml", help="netml, or the built-in vectorized flow statistics. native is opt-in and should only be used while test_native_stats.py passes.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of extraction processes.")
+    parser.add_argument("--timeout", type=float, default=None, help="Wall-clock limit per file in seconds.")
+    parser.add_argument("--retries", type=int, default=1, help="Retries for files whose worker crashes or exceeds --timeout. Extraction errors are reported, not retried.")
     args = parser.parse_args()
 
-    for filename in os.listdir(pcap_dir):
-        if filename.endswith(".pcap"):
-            scenario = filename.split('_')[0]
-            output_dir = os.path.join(output_base_dir, scenario)
-            
-            process_pcap_file(pcap_dir, filename, output_dir, args.prefix)
+    output_root = args.store_dir if args.output_format == "parquet" else output_base_dir
+    manifest_path = os.path.join(output_root, "extraction_manifest.json")
+    manifest = load_manifest(manifest_path)
+    extractor_version = EXTRACTOR_VERSIONS[args.extractor]
+    skipped = 0
+    jobs = []
+
+    pcap_files = [filename for filename in os.listdir(pcap_dir) if filename.endswith(".pcap")]
+    removed = remove_stale_entries(manifest, pcap_files)
+    for filename in removed:
+        print(f"{filename} was removed, deleted its extracted features")
+
+    for filename in pcap_files:
+        pcap_path = os.path.join(pcap_dir, filename)
+        if not args.force and is_up_to_date(manifest, filename, pcap_path, extractor_version):
+            skipped += 1
+            continue
+
+        scenario = filename.split('_')[0]
+        output_dir = os.path.join(output_base_dir, scenario)
+        jobs.append((filename, (pcap_dir, filename, output_dir, args.prefix, args.output_format, args.store_dir, args.extractor)))
+
+    start_time = time.time()
+    if args.workers > 1 or args.timeout:
+        jobs = [(filename, job_args) for filename, job_args in jobs if not args.prefix or filename.startswith(args.prefix)]
+        results, failures = run_jobs(jobs, process_pcap_file, args.workers, args.timeout, args.retries)
+    else:
+        results = {}
+        failures = {}
+        for filename, job_args in jobs:
+            try:
+                results[filename] = process_pcap_file(*job_args)
+            except Exception as e:
+                failures[filename] = {"reason": f"{type(e).__name__}: {e}", "attempts": 1}
+                print(f"Error processing {filename}: {e}")
+    elapsed = time.time() - start_time
+
+    extracted_bytes = 0
+    for filename, output_file in results.items():
+        if output_file:
+            pcap_path = os.path.join(pcap_dir, filename)
+            record_extraction(manifest, filename, pcap_path, extractor_version, [output_file])
+            extracted_bytes += os.path.getsize(pcap_path)
+        elif filename not in failures and (not args.prefix or filename.startswith(args.prefix)):
+            failures[filename] = {"reason": "no features extracted", "attempts": 1}
+
+    save_manifest(manifest, manifest_path)
+    print(f"Skipped {skipped} unchanged files listed in {manifest_path}")
+
+    extracted = sum(1 for output_file in results.values() if output_file)
+    write_summary(os.path.join(output_root, "extraction_summary.json"), {
+        "workers": args.workers,
+        "timeout": args.timeout,
+        "elapsed_seconds": elapsed,
+        "files_skipped": skipped,
+        "files_removed": len(removed),
+        "files_extracted": extracted,
+        "files_failed": len(failures),
+        "files_per_second": extracted / elapsed if elapsed > 0 else 0.0,
+        "megabytes_per_second": extracted_bytes / 1e6 / elapsed if elapsed > 0 else 0.0,
+        "failures": failures,
+    })
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,74 @@
+import time
+import queue
+import multiprocessing
+from collections import deque
+
+def run_job(job_id, func, args, result_queue):
+    try:
+        result_queue.put((job_id, func(*args), None))
+    except Exception as e:
+        # An extraction error is reported as such, only crashes and timeouts are retried
+        result_queue.put((job_id, None, f"{type(e).__name__}: {e}"))
+
+def run_jobs(jobs, func, workers, timeout=None, retries=0, poll_interval=0.2):
+    result_queue = multiprocessing.Queue()
+    pending = deque((job_id, args, 1) for job_id, args in jobs)
+    running = {}
+    results = {}
+    failures = {}
+
+    def collect(job_id, result, error):
+        if error is None:
+            results[job_id] = result
+        else:
+            failures[job_id] = {"reason": error, "attempts": running[job_id][2] if job_id in running else 1}
+            print(f"Error in {job_id}: {error}")
+
+    while pending or running:
+        while pending and len(running) < workers:
+            job_id, args, attempt = pending.popleft()
+            process = multiprocessing.Process(target=run_job, args=(job_id, func, args, result_queue), daemon=True)
+            process.start()
+            running[job_id] = (process, args, attempt, time.time())
+
+        try:
+            while True:
+                collect(*result_queue.get(timeout=poll_interval))
+        except queue.Empty:
+            pass
+
+        for job_id, (process, args, attempt, start_time) in list(running.items()):
+            if process.is_alive():
+                if timeout and time.time() - start_time > timeout:
+                    process.kill()
+                    process.join()
+                    del running[job_id]
+                    if attempt <= retries:
+                        print(f"Killed {job_id}: exceeded {timeout}s, retrying ({attempt}/{retries})")
+                        pending.append((job_id, args, attempt + 1))
+                    else:
+                        failures[job_id] = {"reason": f"timeout after {timeout}s", "attempts": attempt}
+                        print(f"Killed {job_id}: exceeded {timeout}s")
+                continue
+
+            process.join()
+            if job_id in results or job_id in failures:
+                del running[job_id]
+                continue
+            # The worker may have exited right after queueing its result
+            try:
+                while True:
+                    collect(*result_queue.get(timeout=poll_interval))
+            except queue.Empty:
+                pass
+            del running[job_id]
+            if job_id in results or job_id in failures:
+                continue
+
+            if attempt <= retries:
+                print(f"Worker for {job_id} exited with code {process.exitcode}, retrying ({attempt}/{retries})")
+                pending.append((job_id, args, attempt + 1))
+            else:
+                failures[job_id] = {"reason": f"worker exited with code {process.exitcode}", "attempts": attempt}
+
+    return results, failures
@@ -1,7 +1,8 @@
 import os
 import pyshark
 import argparse
-import json
+from tshark_capture import TsharkJsonCapture
+from json_stream import write_json_array, write_json_lines
 
 QUIC_FRAME_TYPES = {
     "PADDING": 0x00,
@@ -93,97 +94,126 @@ def determine_attack_type(quic_frames, http3_frames, file_name):
         return 3
     return 0
 
-parser = argparse.ArgumentParser()
-parser.add_argument('case', type=str)
-args = parser.parse_args()
+BASE_DIR = '/home/philipp/Documents/Thesis'
+BACKENDS = ['pyshark', 'tshark']
+OUTPUT_FORMATS = {'json': write_json_array, 'jsonl': write_json_lines}
 
 def extract_pcap_name(pcap_path):
     file_name = os.path.basename(pcap_path)
     name_without_extension = os.path.splitext(file_name)[0]
     return name_without_extension
 
-base_dir = '/home/philipp/Documents/Thesis'
-case = extract_pcap_name(args.case)
-pcap_file = f'{base_dir}/packet_capture/{case}.pcap'
-keylog_file = f'{base_dir}/secrets_files/{case}.txt'
-
-try:
-    cap = pyshark.FileCapture(
-        pcap_file,
-        override_prefs={
-            'tls.keylog_file': keylog_file,
-            'tls.desegment_ssl_records': 'TRUE',
-            'tls.desegment_ssl_application_data': 'TRUE',
-        },
-    )
-    packets_info = []
-
-    def print_packet_attributes(packet):
-        print("\n=== NEW PACKET ===")
-        print(f"Packet number: {packet.number}")
-        if hasattr(packet, 'quic'):
-            print("\nQUIC Layer Attributes:")
-            for field_name in packet.quic.field_names:
-                print(f"{field_name}: {getattr(packet.quic, field_name)}")
-                
-        if hasattr(packet, 'http3'):
-            print("\nHTTP3 Layer Attributes:")
-            for field_name in packet.http3.field_names:
-                print(f"{field_name}: {getattr(packet.http3, field_name)}")
-
-    for packet in cap:
-        packet_info = {
-            "Packet Number": packet.number,
-            "Source IP": packet.ip.src,
-            "Destination IP": packet.ip.dst,
-            "Packet Length": packet.length,
-            "Protocol": packet.transport_layer,
-            "Arrival Time": packet.frame_info.time,
-            "QUIC Frames": [],
-            "HTTP3 Frames": []
-        }
-
-        if hasattr(packet, 'quic'):
-            frame_types = extract_quic_frames(packet)
-            for layer in packet.layers:
-                if layer.layer_name == 'quic':
-                    quic_packet_info = {
-                        "Packet Length": getattr(layer, 'packet_length', 'N/A'),
-                        "Destination Connection ID": getattr(layer, 'dcid', 'N/A'),
-                        "Source Connection ID": getattr(layer, 'scid', 'N/A') if hasattr(layer, 'scid') else "",
-                        "Packet number": getattr(layer, 'packet_number', 'N/A'),
-                        "Length": getattr(layer, 'length', 'N/A'),
-                        "Frame Types": frame_types
-                    }
-                    packet_info["QUIC Frames"].append(quic_packet_info)
-
-        if hasattr(packet, 'http3'):
-            for layer in packet.layers:
-                if layer.layer_name == 'http3':
-                    http3_packet_info = {
-                        "Frame Type": getattr(layer, 'frame_type', 'N/A'),
-                        "Frame Length": getattr(layer, 'frame_length', 'N/A'),
-                        "Settings Max Table Capacity": getattr(layer, 'settings_qpack_max_table_capacity', 'N/A') if hasattr(layer, 'settings_qpack_max_table_capacity') else ""
-                    }
-                    packet_info["HTTP3 Frames"].append(http3_packet_info)
-
-        attack_type = determine_attack_type(frame_types, packet_info["HTTP3 Frames"], case)
-        packet_info["Attack Type"] = str(attack_type)  # Convert attack_type to string for JSON consistency
-
-        packets_info.append(packet_info)
-
-    cap.close()
-
-except pyshark.capture.capture.TSharkCrashException as e:
-    print(f"TShark crashed while processing {pcap_file}: {e}")
-    print("Skipping this file due to incomplete or corrupted data.")
-
-if packets_info:
-    output_file = f'{base_dir}/result_files/{case}.json'
-    with open(output_file, 'w') as f:
-        json.dump(packets_info, f, indent=4)
-    print(f"Results saved to {output_file}")
-else:
-    print(f"No valid packets processed for {pcap_file}.")
-
-
+def print_packet_attributes(packet):
+    print("\n=== NEW PACKET ===")
+    print(f"Packet number: {packet.number}")
+    if hasattr(packet, 'quic'):
+        print("\nQUIC Layer Attributes:")
+        for field_name in packet.quic.field_names:
+            print(f"{field_name}: {getattr(packet.quic, field_name)}")
+            
+    if hasattr(packet, 'http3'):
+        print("\nHTTP3 Layer Attributes:")
+        for field_name in packet.http3.field_names:
+            print(f"{field_name}: {getattr(packet.http3, field_name)}")
+
+def build_packet_info(packet, case):
+    packet_info = {
+        "Packet Number": packet.number,
+        "Source IP": packet.ip.src,
+        "Destination IP": packet.ip.dst,
+        "Packet Length": packet.length,
+        "Protocol": packet.transport_layer,
+        "Arrival Time": packet.frame_info.time,
+        "QUIC Frames": [],
+        "HTTP3 Frames": []
+    }
+
+    frame_types = []
+    if hasattr(packet, 'quic'):
+        frame_types = extract_quic_frames(packet)
+        for layer in packet.layers:
+            if layer.layer_name == 'quic':
+                quic_packet_info = {
+                    "Packet Length": getattr(layer, 'packet_length', 'N/A'),
+                    "Destination Connection ID": getattr(layer, 'dcid', 'N/A'),
+                    "Source Connection ID": getattr(layer, 'scid', 'N/A') if hasattr(layer, 'scid') else "",
+                    "Packet number": getattr(layer, 'packet_number', 'N/A'),
+                    "Length": getattr(layer, 'length', 'N/A'),
+                    "Frame Types": frame_types
+                }
+                packet_info["QUIC Frames"].append(quic_packet_info)
+
+    if hasattr(packet, 'http3'):
+        for layer in packet.layers:
+            if layer.layer_name == 'http3':
+                http3_packet_info = {
+                    "Frame Type": getattr(layer, 'frame_type', 'N/A'),
+                    "Frame Length": getattr(layer, 'frame_length', 'N/A'),
+                    "Settings Max Table Capacity": getattr(layer, 'settings_qpack_max_table_capacity', 'N/A') if hasattr(layer, 'settings_qpack_max_table_capacity') else ""
+                }
+                packet_info["HTTP3 Frames"].append(http3_packet_info)
+
+    attack_type = determine_attack_type(frame_types, packet_info["HTTP3 Frames"], case)
+    packet_info["Attack Type"] = str(attack_type)  # Convert attack_type to string for JSON consistency
+    return packet_info
+
+def open_capture(pcap_file, keylog_file, backend='pyshark'):
+    override_prefs = {
+        'tls.keylog_file': keylog_file,
+        'tls.desegment_ssl_records': 'TRUE',
+        'tls.desegment_ssl_application_data': 'TRUE',
+    }
+    if backend == 'tshark':
+        return TsharkJsonCapture(pcap_file, override_prefs=override_prefs)
+    return pyshark.FileCapture(pcap_file, override_prefs=override_prefs, keep_packets=False)
+
+def iter_packet_infos(pcap_file, keylog_file, case, backend='pyshark'):
+    try:
+        cap = open_capture(pcap_file, keylog_file, backend)
+        try:
+            for packet in cap:
+                yield build_packet_info(packet, case)
+        finally:
+            cap.close()
+
+    except pyshark.capture.capture.TSharkCrashException as e:
+        print(f"TShark crashed while processing {pcap_file}: {e}")
+        print("Skipping this file due to incomplete or corrupted data.")
+
+def process_pcap(case, base_dir=BASE_DIR, backend='pyshark', output_format='json'):
+    pcap_file = f'{base_dir}/packet_capture/{case}.pcap'
+    keylog_file = f'{base_dir}/secrets_files/{case}.txt'
+    output_file = f'{base_dir}/result_files/{case}.{output_format}'
+
+    # Streamed into a temporary file, so a failed run never leaves truncated output behind
+    tmp_file = f'{output_file}.tmp'
+    packets_info = iter_packet_infos(pcap_file, keylog_file, case, backend)
+    try:
+        with open(tmp_file, 'w') as f:
+            packet_count = OUTPUT_FORMATS[output_format](packets_info, f)
+        if packet_count:
+            os.replace(tmp_file, output_file)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+    if packet_count:
+        print(f"Results saved to {output_file}")
+    else:
+        print(f"No valid packets processed for {pcap_file}.")
+
+    return packet_count
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('case', type=str)
+    parser.add_argument('--backend', choices=BACKENDS, default='pyshark',
+                        help='pyshark probes each packet layer, tshark exports all fields in a single pass')
+    parser.add_argument('--output-format', choices=list(OUTPUT_FORMATS), default='json',
+                        help='json writes a JSON array, jsonl writes one packet per line; both are streamed to disk')
+    args = parser.parse_args()
+
+    process_pcap(extract_pcap_name(args.case), backend=args.backend, output_format=args.output_format)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import os
+import re
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from pcap_to_json import BASE_DIR, BACKENDS, OUTPUT_FORMATS, process_pcap
+
+PREFIXES = ["slowloris_isolated_con:5-10_sleep:1-5_time:100_it:", "quicly_isolation_time:100_it:", "lsquic_isolation_time:100_it:", "normal"]
+
+def natural_sort_key(name):
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+def collect_cases(capture_dir, prefixes):
+    cases = []
+    for filename in sorted(os.listdir(capture_dir), key=natural_sort_key):
+        if not filename.endswith(".pcap"):
+            continue
+        if prefixes and not any(filename.startswith(prefix) for prefix in prefixes):
+            continue
+        cases.append(os.path.splitext(filename)[0])
+    return cases
+
+def process_case(case, base_dir, backend, output_format):
+    start_time = time.time()
+    try:
+        packet_count = process_pcap(case, base_dir, backend, output_format)
+        return case, packet_count, time.time() - start_time, None
+    except Exception as e:
+        return case, 0, time.time() - start_time, f"{type(e).__name__}: {e}"
+
+def process_all_pcaps(cases, base_dir, workers, queue_size, backend='pyshark', output_format='json'):
+    results = []
+    pending = set()
+    case_iter = iter(cases)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for case in case_iter:
+            pending.add(executor.submit(process_case, case, base_dir, backend, output_format))
+            if len(pending) >= queue_size:
+                break
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                case, packet_count, duration, error = future.result()
+                results.append((case, packet_count, duration, error))
+                if error:
+                    print(f"[{len(results)}/{len(cases)}] Failed {case}: {error}")
+                else:
+                    print(f"[{len(results)}/{len(cases)}] {case}: {packet_count} packets in {duration:.1f}s")
+
+                next_case = next(case_iter, None)
+                if next_case is not None:
+                    pending.add(executor.submit(process_case, next_case, base_dir, backend, output_format))
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert all packet captures to JSON using one tshark worker per core.")
+    parser.add_argument("--base-dir", type=str, default=BASE_DIR)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes (default: one per core).")
+    parser.add_argument("--queue-size", type=int, default=None, help="Maximum number of queued files (default: 2 x workers).")
+    parser.add_argument("--backend", choices=BACKENDS, default="pyshark")
+    parser.add_argument("--output-format", choices=list(OUTPUT_FORMATS), default="json")
+    parser.add_argument("--prefix", type=str, action="append", help="Only process files starting with this prefix (repeatable).")
+    args = parser.parse_args()
+
+    capture_dir = os.path.join(args.base_dir, "packet_capture")
+    os.makedirs(os.path.join(args.base_dir, "result_files"), exist_ok=True)
+
+    cases = collect_cases(capture_dir, args.prefix or PREFIXES)
+    queue_size = args.queue_size or 2 * args.workers
+    print(f"Processing {len(cases)} packet captures with {args.workers} workers...")
+
+    start_time = time.time()
+    results = process_all_pcaps(cases, args.base_dir, args.workers, queue_size, args.backend, args.output_format)
+    elapsed = time.time() - start_time
+
+    total_packets = sum(packet_count for _, packet_count, _, _ in results)
+    failed = [(case, error) for case, _, _, error in results if error]
+
+    print("\nFinal Statistics:")
+    print(f"Files processed: {len(results) - len(failed)}/{len(cases)}")
+    print(f"Total packets processed: {total_packets}")
+    print(f"Elapsed time: {elapsed:.1f}s")
+    if elapsed > 0:
+        print(f"Aggregate throughput: {total_packets / elapsed:.1f} packets/sec")
+    for case, error in failed:
+        print(f"Failed: {case} ({error})")
+
+if __name__ == "__main__":
+    main()
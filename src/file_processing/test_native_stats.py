@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+import numpy as np
+from netml.pparser.parser import PCAP
+from scapy.all import Ether, IP, IPv6, TCP, UDP, wrpcap
+from flow_stats import STATS_COLUMNS, extract_flow_stats
+
+# Compares flow_stats.extract_flow_stats with netml's STATS features. --extractor native
+# in netml_feature_extraction_to_csv.py should only be used while this passes.
+
+pcap_file = '/home/philipp/Documents/Thesis/packet_capture/flood_con:20-50_time:180_it:10.pcap'
+
+def netml_stats(pcap_path):
+    pcap = PCAP(pcap_path, flow_ptks_thres=2)
+    pcap.pcap2flows()
+    pcap.flow2features('STATS', fft=False, header=False)
+    return np.asarray(pcap.features, dtype=np.float64)
+
+def synthetic_pcap(path):
+    # A steady flow longer than the split interval (kept whole), nine short flows,
+    # a flow split by a gap (trailing subflow dropped), a flow split three times where
+    # 224.5 only splits because netml measures from the quantized start 216.0, a flow
+    # split by the 600 s timeout, an IPv6 flow and two packets written out of order
+    packets = []
+    for i in range(51):
+        packets.append((100 + i * 0.1, Ether() / IP(src="10.0.0.1", dst="10.0.0.2") / TCP(sport=1000, dport=80)))
+    for flow in range(9):
+        for i in range(2):
+            packets.append((100.5 + flow * 0.2 + i * 0.01,
+                            Ether() / IP(src=f"10.0.1.{flow}", dst="10.0.0.2") / UDP(sport=2000 + flow, dport=443) / (b"x" * 20)))
+    for packet_time in (100, 100.01, 100.02, 110, 110.01):
+        packets.append((packet_time, Ether() / IP(src="10.0.2.1", dst="10.0.0.2") / TCP(sport=3000, dport=80) / (b"y" * 40)))
+    for packet_time in (200, 200.1, 223, 224.5, 225, 225.5, 250, 250.1):
+        packets.append((packet_time, Ether() / IP(src="10.0.3.1", dst="10.0.0.2") / TCP(sport=5000, dport=80) / (b"z" * 60)))
+    for packet_time in (100.3, 100.4, 800, 800.1, 1500, 1500.1):
+        packets.append((packet_time, Ether() / IP(src="10.0.4.1", dst="10.0.0.2") / UDP(sport=6000, dport=443)))
+    for packet_time in (101, 101.05):
+        packets.append((packet_time, Ether() / IPv6(src="fe80::1", dst="fe80::2") / UDP(sport=4000, dport=53)))
+
+    packets.sort(key=lambda item: item[0])
+    packets[3], packets[4] = packets[4], packets[3]
+    for packet_time, packet in packets:
+        packet.time = packet_time
+    wrpcap(path, [packet for _, packet in packets])
+
+def compare(name, pcap_path):
+    reference = netml_stats(pcap_path)
+    native = extract_flow_stats(pcap_path)
+    native = np.empty((0, len(STATS_COLUMNS))) if native is None else native.to_numpy()
+
+    print(f"{name}: netml {len(reference)} flows, native {len(native)} flows")
+    if reference.shape != native.shape:
+        print(f"  packets per flow, netml:  {reference[:, 10].astype(int).tolist()}")
+        print(f"  packets per flow, native: {native[:, 10].astype(int).tolist()}")
+        return False
+
+    difference = np.abs(reference - native)
+    for column, max_difference in zip(STATS_COLUMNS, difference.max(axis=0, initial=0)):
+        print(f"  {column}: max abs difference {max_difference:.6g}")
+    # Timestamps go through tshark's text output, so allow for their rounding
+    return bool(np.allclose(reference, native, rtol=1e-6, atol=1e-6))
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+    synthetic_path = os.path.join(tmp_dir, "synthetic.pcap")
+    synthetic_pcap(synthetic_path)
+    passed = compare("synthetic", synthetic_path)
+
+if os.path.exists(pcap_file):
+    passed = compare(os.path.basename(pcap_file), pcap_file) and passed
+
+print("PASSED" if passed else "FAILED")
+sys.exit(0 if passed else 1)
@@ -0,0 +1,93 @@
+import subprocess
+import tempfile
+from pyshark.capture.capture import TSharkCrashException
+
+from json_stream import iter_json_objects
+
+TRANSPORT_LAYERS = ['udp', 'tcp']
+PROTOCOL_FILTER = "frame ip udp tcp quic http3"
+
+# Mimics the pyshark layer interface used by pcap_to_json.py, but the fields are
+# plain dict entries, so hasattr/getattr are cheap lookups instead of XML probing.
+class TsharkLayer:
+    def __init__(self, layer_name, fields):
+        self.layer_name = layer_name
+        self._fields = fields
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['_fields'][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    @property
+    def field_names(self):
+        return list(self._fields)
+
+class TsharkPacket:
+    def __init__(self, frame_info, layers):
+        self.frame_info = frame_info
+        self.layers = layers
+        self.number = frame_info.number
+        self.length = int(frame_info.len)
+        for layer in reversed(layers):
+            setattr(self, layer.layer_name, layer)
+        self.transport_layer = next(
+            (name.upper() for name in TRANSPORT_LAYERS if any(layer.layer_name == name for layer in layers)),
+            None
+        )
+
+def sanitize_field_name(field_name, layer_name):
+    return field_name.replace(f"{layer_name}.", "").replace('.', '_').replace('-', '_')
+
+def flatten_fields(node, layer_name, fields):
+    for key, value in node.items():
+        if isinstance(value, dict):
+            flatten_fields(value, layer_name, fields)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    flatten_fields(item, layer_name, fields)
+                else:
+                    fields.setdefault(sanitize_field_name(key, layer_name), item)
+        else:
+            fields.setdefault(sanitize_field_name(key, layer_name), value)
+    return fields
+
+def build_packet(source):
+    frame_info = None
+    layers = []
+    for layer_name, layer_data in source["_source"]["layers"].items():
+        instances = layer_data if isinstance(layer_data, list) else [layer_data]
+        for instance in instances:
+            layer = TsharkLayer(layer_name, flatten_fields(instance, layer_name, {}))
+            if layer_name == 'frame':
+                frame_info = layer
+            else:
+                layers.append(layer)
+    return TsharkPacket(frame_info, layers)
+
+class TsharkJsonCapture:
+    def __init__(self, pcap_file, override_prefs=None, tshark_path="tshark"):
+        self.pcap_file = pcap_file
+        self.command = [tshark_path, "-r", pcap_file, "-T", "json", "--no-duplicate-keys", "-J", PROTOCOL_FILTER]
+        for key, value in (override_prefs or {}).items():
+            self.command.extend(["-o", f"{key}:{value}"])
+        self.process = None
+
+    def __iter__(self):
+        with tempfile.TemporaryFile(mode='w+') as stderr_file:
+            self.process = subprocess.Popen(
+                self.command, stdout=subprocess.PIPE, stderr=stderr_file, text=True, bufsize=1 << 20
+            )
+            for source in iter_json_objects(self.process.stdout):
+                yield build_packet(source)
+
+            if self.process.wait() != 0:
+                stderr_file.seek(0)
+                raise TSharkCrashException(f"TShark exited with code {self.process.returncode}: {stderr_file.read().strip()}")
+
+    def close(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
@@ -1,13 +1,36 @@
 import pandas as pd
+import numpy as np
 import glob
+from sklearn.base import clone
 from sklearn.ensemble import IsolationForest  # Add this import
 from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import StandardScaler, MinMaxScaler
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import copy
 import joblib
 import os
 from itertools import product
 import json
-from tqdm import tqdm
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "model_evaluation"))
+from score_store import ScoreIndex, save_scores, split_scores, stack_files
+
+contamination_values = [0.0001, 0.001, 0.01, 0.05, 0.1, 0.2]
+n_estimators_values = [100, 200, 500, 1000]
+max_samples_values = [10000]
+scaling_methods = [
+    ('none', None),
+    ('standard', StandardScaler()),
+    ('minmax', MinMaxScaler())
+]
+
+base_dir = "/home/philipp/Documents/Thesis"
+scenarios = ["normal", "flooding", "slowloris", "quicly", "lsquic"]
+script_dir = os.path.dirname(os.path.abspath(__file__))
+models_dir = os.path.join(script_dir, "grid_search_models")
+scores_dir = os.path.join(script_dir, "grid_search_scores")
 
 def load_csv_files(file_paths):
     dataframes = []
@@ -19,9 +42,9 @@ def load_csv_files(file_paths):
             print(f"Error loading {file}: {e}")
     return dataframes
 
-def test_scenario(scenario_path, model, scaler, imputer, scenario_name):
+def select_test_files(scenario_path):
     csv_files = glob.glob(os.path.join(scenario_path, "*.csv"))
-    
+
     file_numbers = []
     for f in csv_files:
         try:
@@ -29,152 +52,146 @@ def test_scenario(scenario_path, model, scaler, imputer, scenario_name):
             file_numbers.append((f, num))
         except:
             continue
-    
-    file_numbers.sort(key=lambda x: x[1])
-    valid_files = [f for f, num in file_numbers if 1 <= num <= 50]
-    
-    if not valid_files:
-        return None
-
-    results = {
-        "scenario": scenario_name,
-        "files": [],
-        "total": {"normal": 0, "attack": 0, "total": 0}
-    }
-    
-    for file in tqdm(valid_files, desc=f"Testing {scenario_name}"):
-        try:
-            df = pd.read_csv(file)
-            X = imputer.fit_transform(df)
-            if scaler is not None:
-                X = scaler.transform(X)
-            predictions = model.predict(X)
-            
-            normal = int(sum(predictions == 1))
-            attack = int(sum(predictions == -1))
-            total = len(predictions)
-            
-            results["files"].append({
-                "filename": os.path.basename(file),
-                "normal": normal,
-                "attack": attack,
-                "total": total,
-                "normal_percentage": float(normal/total*100),
-                "attack_percentage": float(attack/total*100)
-            })
-            
-            results["total"]["normal"] += normal
-            results["total"]["attack"] += attack
-            results["total"]["total"] += total
-            
-        except Exception as e:
-            print(f"\nError processing {file}: {e}")
-    
-    if results["total"]["total"] > 0:
-        total = results["total"]["total"]
-        results["total"]["normal_percentage"] = float(results["total"]["normal"]/total*100)
-        results["total"]["attack_percentage"] = float(results["total"]["attack"]/total*100)
-    
-    return results
 
-contamination_values = [0.0001, 0.001, 0.01, 0.05, 0.1, 0.2]
-n_estimators_values = [100, 200, 500, 1000]
-max_samples_values = [10000] 
-scaling_methods = [
-    ('none', None),
-    ('standard', StandardScaler()),
-    ('minmax', MinMaxScaler())
-]
+    file_numbers.sort(key=lambda x: x[1])
+    return [f for f, num in file_numbers if 1 <= num <= 50]
 
-dataset_path = "/home/philipp/Documents/Thesis/session_Datasets/normal/*.csv"
-csv_files = glob.glob(dataset_path)
-training_files = csv_files[:10]
-print(f"Using {len(training_files)} files for training")
+def load_test_sets(imputer):
+    # Test files are imputed with the training imputer once and shared by every forest
+    test_sets = []
+    for scenario in scenarios:
+        scenario_path = os.path.join(base_dir, "session_Datasets", scenario)
+        if os.path.exists(scenario_path):
+            filenames, offsets, X = stack_files(select_test_files(scenario_path), imputer.transform)
+            if filenames:
+                test_sets.append((scenario, filenames, offsets, X))
+    return test_sets
 
-dataframes = load_csv_files(training_files)
-if not dataframes:
-    raise ValueError("No objects to concatenate")
+def model_name_for(cont, n_est, max_samp, scaling_name):
+    return f"iforest_cont{cont}_est{n_est}_samp{max_samp}_{scaling_name}".replace(".", "")
 
-df_normal = pd.concat(dataframes, ignore_index=True)
-imputer = SimpleImputer(strategy='mean')
-X_train = imputer.fit_transform(df_normal)
+worker_data = {}
 
-print(f"Loaded {len(X_train)} normal NetML flow entries for training")
+def init_worker(X_train, imputer, test_sets):
+    worker_data["X_train"] = X_train
+    worker_data["imputer"] = imputer
+    worker_data["test_sets"] = test_sets
 
-script_dir = os.path.dirname(os.path.abspath(__file__))
-models_dir = os.path.join(script_dir, "grid_search_models")
-os.makedirs(models_dir, exist_ok=True)
-
-all_results = {
-    "training_info": {
-        "samples": len(X_train),
-        "files_used": len(training_files)
-    },
-    "models": []
-}
-
-for cont, n_est, max_samp, (scaling_name, scaler) in product(
-    contamination_values, n_estimators_values, 
-    max_samples_values, scaling_methods):
-    
-    model_name = f"iforest_cont{cont}_est{n_est}_samp{max_samp}_{scaling_name}".replace(".", "")
-    print(f"\nTraining model: {model_name}")
-    print(f"Parameters: contamination={cont}, n_estimators={n_est}, "
-          f"max_samples={max_samp}, scaling={scaling_name}")
-    
+def run_grid_point(n_est, max_samp, scaling_name, scaler):
+    # Contamination only sets offset_, so one forest serves every contamination value
+    X_train, imputer = worker_data["X_train"], worker_data["imputer"]
+    scaler = clone(scaler) if scaler is not None else None
     X_train_scaled = X_train
     if scaler is not None:
         X_train_scaled = scaler.fit_transform(X_train)
-    
+
+    print(f"\nTraining forest: n_estimators={n_est}, max_samples={max_samp}, scaling={scaling_name}")
     iforest = IsolationForest(
-        contamination=cont,
+        contamination=contamination_values[0],
         n_estimators=n_est,
         max_samples=max_samp,
         random_state=42
     )
     iforest.fit(X_train_scaled)
-    
-    model_path = os.path.join(models_dir, f"{model_name}.pkl")
-    imputer_path = os.path.join(models_dir, f"{model_name}_imputer.pkl")
-    
-    joblib.dump(iforest, model_path)
-    joblib.dump(imputer, imputer_path)
-    
-    if scaler is not None:
-        scaler_path = os.path.join(models_dir, f"{model_name}_scaler.pkl")
-        joblib.dump(scaler, scaler_path)
-
-    base_dir = "/home/philipp/Documents/Thesis"
-    scenarios = ["normal", "flooding", "slowloris", "quicly", "lsquic"]
-    
-    model_results = {
-        "model_name": model_name,
-        "parameters": {
-            "contamination": cont,
-            "n_estimators": n_est,
-            "max_samples": max_samp,
-            "scaling": scaling_name
+    train_scores = iforest.score_samples(X_train_scaled)
+
+    scenario_scores = []
+    for scenario, filenames, offsets, X in worker_data["test_sets"]:
+        if scaler is not None:
+            X = scaler.transform(X)
+        scenario_scores.append((scenario, split_scores(iforest.score_samples(X), filenames, offsets)))
+
+    # Stored scores follow predict's rule: attack when score_samples < offset_
+    score_index = ScoreIndex(scenario_scores)
+    offsets = {model_name_for(cont, n_est, max_samp, scaling_name): float(np.percentile(train_scores, 100.0 * cont))
+               for cont in contamination_values}
+    save_scores(os.path.join(scores_dir, f"iforest_est{n_est}_samp{max_samp}_{scaling_name}.npz"), scenario_scores,
+                {"score": "score_samples", "operating_points": offsets})
+
+    grid_results = {}
+    for cont in contamination_values:
+        model_name = model_name_for(cont, n_est, max_samp, scaling_name)
+        model = copy.copy(iforest)
+        model.set_params(contamination=cont)
+        model.offset_ = offsets[model_name]
+
+        joblib.dump(model, os.path.join(models_dir, f"{model_name}.pkl"))
+        joblib.dump(imputer, os.path.join(models_dir, f"{model_name}_imputer.pkl"))
+        if scaler is not None:
+            joblib.dump(scaler, os.path.join(models_dir, f"{model_name}_scaler.pkl"))
+
+        grid_results[model_name] = {
+            "model_name": model_name,
+            "parameters": {
+                "contamination": cont,
+                "n_estimators": n_est,
+                "max_samples": max_samp,
+                "scaling": scaling_name
+            },
+            "scenarios": score_index.summarize_all(model.offset_)
+        }
+    return grid_results
+
+def main():
+    parser = argparse.ArgumentParser(description="Isolation Forest grid search over contamination, n_estimators and scaling.")
+    parser.add_argument('--workers', type=int, default=1, help="Number of (n_estimators, scaler) fits to run in parallel")
+    args = parser.parse_args()
+
+    dataset_path = "/home/philipp/Documents/Thesis/session_Datasets/normal/*.csv"
+    csv_files = glob.glob(dataset_path)
+    training_files = csv_files[:10]
+    print(f"Using {len(training_files)} files for training")
+
+    dataframes = load_csv_files(training_files)
+    if not dataframes:
+        raise ValueError("No objects to concatenate")
+
+    df_normal = pd.concat(dataframes, ignore_index=True)
+    imputer = SimpleImputer(strategy='mean')
+    X_train = imputer.fit_transform(df_normal)
+
+    print(f"Loaded {len(X_train)} normal NetML flow entries for training")
+
+    os.makedirs(models_dir, exist_ok=True)
+    test_sets = load_test_sets(imputer)
+    print(f"Loaded {sum(len(X) for _, _, _, X in test_sets)} test flows from {len(test_sets)} scenarios")
+
+    all_results = {
+        "training_info": {
+            "samples": len(X_train),
+            "files_used": len(training_files)
         },
-        "scenarios": []
+        "models": []
     }
-    
-    for scenario in scenarios:
-        scenario_path = os.path.join(base_dir, "session_Datasets", scenario)
-        if os.path.exists(scenario_path):
-            results = test_scenario(scenario_path, iforest, scaler, imputer, scenario)
-            if results:
-                model_results["scenarios"].append(results)
-    
-    all_results["models"].append(model_results)
-    
-    print(f"Model complete: {model_name}")
-    for scenario in model_results["scenarios"]:
-        print(f"{scenario['scenario']}: Normal={scenario['total']['normal_percentage']:.2f}%, "
-              f"Attack={scenario['total']['attack_percentage']:.2f}%")
-
-results_file = os.path.join(script_dir, "complete_grid_search_results.json")
-with open(results_file, 'w') as f:
-    json.dump(all_results, f, indent=4)
-
-print(f"\nAll results saved to {results_file}")
-print(f"Models saved in: {models_dir}")
+
+    fits = list(product(n_estimators_values, max_samples_values, scaling_methods))
+    print(f"Fitting {len(fits)} forests for {len(fits) * len(contamination_values)} grid points with {args.workers} workers")
+
+    grid_results = {}
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker, initargs=(X_train, imputer, test_sets)) as executor:
+        futures = {executor.submit(run_grid_point, n_est, max_samp, scaling_name, scaler): (n_est, scaling_name)
+                   for n_est, max_samp, (scaling_name, scaler) in fits}
+        for future in as_completed(futures):
+            grid_results.update(future.result())
+            print(f"Forest complete: n_estimators={futures[future][0]}, scaling={futures[future][1]}")
+
+    for cont, n_est, max_samp, (scaling_name, _) in product(
+        contamination_values, n_estimators_values,
+        max_samples_values, scaling_methods):
+        model_results = grid_results[model_name_for(cont, n_est, max_samp, scaling_name)]
+        all_results["models"].append(model_results)
+
+        print(f"Model complete: {model_results['model_name']}")
+        for scenario in model_results["scenarios"]:
+            print(f"{scenario['scenario']}: Normal={scenario['total']['normal_percentage']:.2f}%, "
+                  f"Attack={scenario['total']['attack_percentage']:.2f}%")
+
+    results_file = os.path.join(script_dir, "complete_grid_search_results.json")
+    with open(results_file, 'w') as f:
+        json.dump(all_results, f, indent=4)
+
+    print(f"\nAll results saved to {results_file}")
+    print(f"Models saved in: {models_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,11 @@ from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import StandardScaler
 import joblib
 import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "model_evaluation"))
+from model_bundle import UNSUPERVISED_LABELS, save_bundle
 
 def load_csv_files(file_paths):
     dataframes = []
@@ -38,7 +43,9 @@ iforest = IsolationForest(
     contamination=0.001,  
     random_state=42
 )
+start_time = time.perf_counter()
 iforest.fit(X_train)
+fit_seconds = time.perf_counter() - start_time
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 model_path = os.path.join(script_dir, "isolation_forest_model.pkl") 
@@ -48,7 +55,11 @@ scaler_path = os.path.join(script_dir, "scaler.pkl")
 joblib.dump(iforest, model_path)
 joblib.dump(imputer, imputer_path)
 joblib.dump(scaler, scaler_path)
+bundle_dir = save_bundle(os.path.join(script_dir, "isolation_forest_bundle"), iforest, imputer, scaler,
+                         label_map=UNSUPERVISED_LABELS, training_files=training_files,
+                         timings={"fit_seconds": fit_seconds})
 
 print(f"Model trained and saved at {model_path}")
 print(f"Imputer saved at {imputer_path}")
 print(f"Scaler saved at {scaler_path}")
+print(f"Bundle saved at {bundle_dir}")
@@ -0,0 +1,24 @@
+import json
+import resource
+import subprocess
+
+SUMMARY_PREFIX = "SUMMARY "
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def print_summary(summary):
+    # The last line of a benchmarked run, parsed by run_summary
+    print(SUMMARY_PREFIX + json.dumps(summary))
+
+def run_summary(command, label_key, label):
+    # A fresh process per run so ru_maxrss only covers that run
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr)
+        return {label_key: label, "error": f"exited with code {result.returncode}"}
+    for line in reversed(result.stdout.splitlines()):
+        if line.startswith(SUMMARY_PREFIX):
+            return json.loads(line[len(SUMMARY_PREFIX):])
+    return {label_key: label, "error": "no summary in output"}
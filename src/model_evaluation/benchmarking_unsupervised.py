@@ -1,62 +1,181 @@
 import pandas as pd
+import numpy as np
 import glob
 import joblib
 import os
+import sys
+import time
 import argparse
-from collections import Counter
+from collections import defaultdict
 
-parser = argparse.ArgumentParser(description="...")
-parser.add_argument('--model_dir', type=str, required=True, help="P...")
-args = parser.parse_args()
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "file_processing"))
+from dataset_loader import CACHE_DIR, dataset_fingerprint
+from extraction_manifest import file_sha256
+from model_bundle import is_bundle, ModelBundle
 
-model = joblib.load(os.path.join(args.model_dir, "...pkl"))
-imputer = joblib.load(os.path.join(args.model_dir, "imputer.pkl"))
-scaler = joblib.load(os.path.join(args.model_dir, "scaler.pkl"))
+# python3 benchmarking_unsupervised.py --model_dir ../isolation_forest/grid_search_models
 
 scenario_config = {
     "normal": {"label": 0, "prefix": None},
-    "flood": {"label": 1, "prefix": None},  
+    "flood": {"label": 1, "prefix": None},
     "slowloris": {"label": 1, "prefix": "slowloris_isolated_con:5-10_sleep:1-5_time:100_it:"},
     "quicly": {"label": 2, "prefix": "quicly_isolation_time:100_it:"},
     "lsquic": {"label": 3, "prefix": "lsquic_isolation_time:100_it:"}
 }
 
-def summarize_predictions(scenario_config, base_path):
-    summaries = {}
+def scenario_files(scenario, config, base_path):
+    prefix = config['prefix']
+    pattern = f"**/{prefix}*.csv" if prefix else "**/*.csv"
+    file_paths = glob.glob(os.path.join(base_path, pattern), recursive=True)
+    if scenario == "normal":
+        file_paths = [f for f in file_paths if "it:" in f and 81 <= int(f.split("it:")[1].split(".")[0]) <= 100]
+    return sorted(file_paths)
 
-    for scenario, config in scenario_config.items():
-        prefix = config['prefix']
-        pattern = f"**/{prefix}*.csv" if prefix else "**/*.csv"
-        file_paths = glob.glob(os.path.join(base_path, pattern), recursive=True)
-        if scenario == "normal":
-            file_paths = [f for f in file_paths if "it:" in f and 81 <= int(f.split("it:")[1].split(".")[0]) <= 100]
+def load_scenarios(files_by_scenario):
+    # Scenarios overlap (flood matches every CSV), so each file is read only once
+    frames = {}
+    scenarios = {}
+    for scenario, file_paths in files_by_scenario.items():
+        for file in file_paths:
+            if file not in frames:
+                frames[file] = pd.read_csv(file)
+        scenarios[scenario] = pd.concat([frames[file] for file in file_paths], ignore_index=True)
+    return scenarios
 
-        if not file_paths:
-            print(f"No files found for scenario '{scenario}'")
+def discover_models(model_dir):
+    # Single-model directories (training_*.py) hold imputer.pkl/scaler.pkl next to
+    # the model, grid search directories hold <name>_imputer.pkl/<name>_scaler.pkl
+    shared_imputer = os.path.join(model_dir, "imputer.pkl")
+    shared_scaler = os.path.join(model_dir, "scaler.pkl")
+    models = []
+    for bundle_dir in sorted(glob.glob(os.path.join(model_dir, "*", ""))):
+        if is_bundle(bundle_dir):
+            bundle = ModelBundle(bundle_dir)
+            models.append({
+                "name": os.path.basename(os.path.normpath(bundle_dir)),
+                "model_path": bundle.component_path("model"),
+                "imputer_path": bundle.component_path("imputer"),
+                "scaler_path": bundle.component_path("scaler"),
+            })
+    for model_path in sorted(glob.glob(os.path.join(model_dir, "*.pkl"))):
+        name = os.path.splitext(os.path.basename(model_path))[0]
+        if name in ("imputer", "scaler") or name.endswith(("_imputer", "_scaler")):
+            continue
+        imputer_path = os.path.join(model_dir, f"{name}_imputer.pkl")
+        scaler_path = os.path.join(model_dir, f"{name}_scaler.pkl")
+        if not os.path.exists(imputer_path):
+            imputer_path, scaler_path = shared_imputer, shared_scaler
+        if not os.path.exists(imputer_path):
+            print(f"No imputer found for {model_path}, skipping")
             continue
+        models.append({
+            "name": name,
+            "model_path": model_path,
+            "imputer_path": imputer_path,
+            "scaler_path": scaler_path if os.path.exists(scaler_path) else None,
+        })
+    return models
+
+def preprocessing_key(model_info):
+    # Grid search dumps the same fitted imputer/scaler for many models, so the
+    # file contents identify which models can share a preprocessed matrix
+    key = file_sha256(model_info["imputer_path"])[:16]
+    if model_info["scaler_path"]:
+        key += "_" + file_sha256(model_info["scaler_path"])[:16]
+    return key
+
+def preprocess(data, imputer_path, scaler_path):
+    X = joblib.load(imputer_path).transform(data)
+    if scaler_path:
+        X = joblib.load(scaler_path).transform(X)
+    return X
+
+def load_preprocessed(key, model_info, scenarios, cache_path):
+    if cache_path and os.path.exists(os.path.join(cache_path, "done")):
+        print(f"Loading preprocessed matrices from {cache_path}")
+        return {scenario: np.load(os.path.join(cache_path, f"{scenario}.npy"), mmap_mode='r') for scenario in scenarios}
+
+    print(f"Preprocessing scenarios for bundle {key}")
+    matrices = {scenario: preprocess(data, model_info["imputer_path"], model_info["scaler_path"])
+                for scenario, data in scenarios.items()}
+    if cache_path:
+        os.makedirs(cache_path, exist_ok=True)
+        for scenario, X in matrices.items():
+            np.save(os.path.join(cache_path, f"{scenario}.npy"), X)
+        open(os.path.join(cache_path, "done"), 'w').close()
+    return matrices
 
-        dfs = [pd.read_csv(file) for file in file_paths]
-        data = pd.concat(dfs, ignore_index=True)
+def summarize_predictions(predictions):
+    total_predictions = len(predictions)
+    return {
+        "flows": total_predictions,
+        "attack_percentage": float(np.count_nonzero(predictions == -1) / total_predictions * 100),
+        "normal_percentage": float(np.count_nonzero(predictions == 1) / total_predictions * 100),
+    }
 
-        X_test = scaler.transform(imputer.transform(data))
-        predictions = model.predict(X_test)
+def benchmark_models(models, scenarios, cache_dir=None, data_fingerprint=None):
+    bundles = defaultdict(list)
+    for model_info in models:
+        bundles[preprocessing_key(model_info)].append(model_info)
 
-        pred_counts = Counter(predictions)
-        total_predictions = sum(pred_counts.values())
-        attack_percentage = (pred_counts.get(-1, 0) / total_predictions) * 100
-        normal_percentage = (pred_counts.get(1, 0) / total_predictions) * 100
+    rows = []
+    for key, bundle_models in bundles.items():
+        cache_path = os.path.join(cache_dir, f"benchmark_{data_fingerprint}_{key}") if cache_dir else None
+        matrices = load_preprocessed(key, bundle_models[0], scenarios, cache_path)
 
-        summaries[scenario] = {
-            "attack_percentage": attack_percentage,
-            "normal_percentage": normal_percentage
-        }
+        for model_info in bundle_models:
+            model = joblib.load(model_info["model_path"], mmap_mode='r')
+            print(f"\nModel '{model_info['name']}':")
+            for scenario, X_test in matrices.items():
+                start_time = time.time()
+                predictions = model.predict(X_test)
+                summary = summarize_predictions(predictions)
+                rows.append({
+                    "model": model_info["name"],
+                    "preprocessing": key,
+                    "scenario": scenario,
+                    **summary,
+                    "predict_seconds": time.time() - start_time,
+                })
+                print(f"  Scenario '{scenario}': Attack {summary['attack_percentage']:.2f}%, "
+                      f"Normal {summary['normal_percentage']:.2f}%")
+            del model
+        del matrices
+    return pd.DataFrame(rows)
 
-        print(f"Scenario '{scenario}':")
-        print(f"  Attack Percentage: {attack_percentage:.2f}%")
-        print(f"  Normal Percentage: {normal_percentage:.2f}%")
+def main():
+    parser = argparse.ArgumentParser(description="Score every unsupervised model in a directory against the test scenarios.")
+    parser.add_argument('--model_dir', type=str, required=True, help="Directory with the model, imputer and scaler pickles, or model bundles")
+    parser.add_argument('--output', type=str, help="Results CSV, defaults to benchmark_results.csv in the model directory")
+    parser.add_argument('--cache_dir', type=str, default=CACHE_DIR, help="Where preprocessed scenario matrices are cached")
+    parser.add_argument('--no_cache', action='store_true', help="Do not read or write preprocessed matrices on disk")
+    args = parser.parse_args()
+
+    base_dataset_path = "/home/philipp/Documents/Thesis/session_Datasets"
+
+    models = discover_models(args.model_dir)
+    if not models:
+        print(f"No models found in {args.model_dir}")
+        return
+    print(f"Found {len(models)} models")
+
+    files_by_scenario = {}
+    for scenario, config in scenario_config.items():
+        file_paths = scenario_files(scenario, config, base_dataset_path)
+        if not file_paths:
+            print(f"No files found for scenario '{scenario}'")
+            continue
+        files_by_scenario[scenario] = file_paths
 
-    return summaries
+    scenarios = load_scenarios(files_by_scenario)
+    data_fingerprint = dataset_fingerprint(files_by_scenario, scenario_config)
+    results = benchmark_models(models, scenarios, None if args.no_cache else args.cache_dir, data_fingerprint)
 
-base_dataset_path = "/home/philipp/Documents/Thesis/session_Datasets"
+    output_path = args.output or os.path.join(args.model_dir, "benchmark_results.csv")
+    results.to_csv(output_path, index=False)
+    print("\nAttack percentage per model and scenario:")
+    print(results.pivot(index="model", columns="scenario", values="attack_percentage").round(2).to_string())
+    print(f"\nResults saved to {output_path}")
 
-summarize_predictions(scenario_config, base_dataset_path)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import os
+import sys
+import json
+import time
+import argparse
+import joblib
+import numpy as np
+import matplotlib.pyplot as plt
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "file_processing"))
+from dataset_loader import load_labeled_matrix
+from compiled_forest import CompiledForest, tree_depth
+
+# python3 compact_forest.py ../random_forest/random_forest_model/random_forest_best_model.pkl --tolerance 0.001
+
+NODE_ARRAYS = ("left", "right", "feature", "threshold", "default_left", "value_index")
+
+def prune_trees(compiled, n_trees):
+    # Trees are stored back to back, so the first n trees are a prefix of every node array
+    if n_trees >= len(compiled.roots):
+        return compiled
+    n_nodes = int(compiled.roots[n_trees])
+    arrays = {name: getattr(compiled, name)[:n_nodes] for name in NODE_ARRAYS}
+    arrays["values"] = compiled.values[:int(arrays["value_index"].max()) + 1]
+    arrays["roots"] = compiled.roots[:n_trees]
+    metadata = dict(compiled.metadata, max_depth=tree_depth(arrays["left"], arrays["right"], arrays["roots"]))
+    return CompiledForest(arrays, metadata)
+
+def quantize_thresholds(threshold):
+    # Largest float32 not above the float64 threshold; inputs are float32, so
+    # x <= t64 and x <= t32 agree for every possible x
+    quantized = threshold.astype(np.float32)
+    above = quantized.astype(np.float64) > threshold
+    quantized[above] = np.nextafter(quantized[above], np.float32(-np.inf))
+    return quantized
+
+def deduplicate_leaf_values(values, value_index):
+    unique_values, inverse = np.unique(values, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    leaves = value_index >= 0
+    compact_index = value_index.copy()
+    compact_index[leaves] = inverse[value_index[leaves]]
+    return unique_values, compact_index
+
+def compact(compiled, n_trees):
+    pruned = prune_trees(compiled, n_trees)
+    arrays = {name: getattr(pruned, name) for name in NODE_ARRAYS}
+    arrays["roots"] = pruned.roots
+    arrays["threshold"] = quantize_thresholds(pruned.threshold)
+    arrays["feature"] = pruned.feature.astype(np.min_scalar_type(int(pruned.feature.max())))
+    arrays["values"], arrays["value_index"] = deduplicate_leaf_values(pruned.values, pruned.value_index)
+    return CompiledForest(arrays, dict(pruned.metadata, n_trees=n_trees))
+
+def default_tree_counts(n_trees, steps=20):
+    return sorted(set(np.geomspace(1, n_trees, steps).round().astype(int).tolist()) | {n_trees})
+
+def prefix_predictions(compiled, X, tree_counts, batch_size):
+    # One traversal of the full forest gives the prediction of every prefix size
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    predictions = {count: np.empty(X.shape[0], dtype=compiled.classes_.dtype) for count in tree_counts}
+    for start in range(0, X.shape[0], batch_size):
+        leaves = compiled.apply(X[start:start + batch_size])
+        proba = np.zeros((leaves.shape[0], len(compiled.classes_)), dtype=np.float64)
+        for tree in range(max(tree_counts)):
+            proba += compiled.values[compiled.value_index[leaves[:, tree]]]
+            if tree + 1 in predictions:
+                averaged = proba / (tree + 1)
+                predictions[tree + 1][start:start + batch_size] = compiled.classes_.take(np.argmax(averaged, axis=1))
+    return predictions
+
+def measure(path, X, batch_size, repeats):
+    start_time = time.perf_counter()
+    compiled = CompiledForest.load(path)
+    load_time = time.perf_counter() - start_time
+
+    timings = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        compiled.predict(X[:1])
+        timings.append(time.perf_counter() - start_time)
+    start_time = time.perf_counter()
+    predictions = compiled.predict(X, batch_size)
+    batch_time = time.perf_counter() - start_time
+
+    return compiled, predictions, {
+        "size_mb": os.path.getsize(path) / 1e6,
+        "load_time_s": load_time,
+        "single_row_latency_ms": min(timings) * 1000,
+        "rows_per_sec": X.shape[0] / batch_time,
+    }
+
+def plot_curve(curve, output_path):
+    counts = [point["n_trees"] for point in curve]
+    fig, f1_axis = plt.subplots(figsize=(8, 5))
+    f1_axis.plot(counts, [point["macro_f1"] for point in curve], marker="o", color="tab:blue")
+    f1_axis.set_xlabel("Number of trees")
+    f1_axis.set_ylabel("Validation macro-F1", color="tab:blue")
+    size_axis = f1_axis.twinx()
+    size_axis.plot(counts, [point["compact_size_mb"] for point in curve], marker="s", color="tab:orange")
+    size_axis.set_ylabel("Compacted size (MB)", color="tab:orange")
+    plt.title("Forest size vs. accuracy")
+    plt.tight_layout()
+    plt.savefig(output_path, dpi=150)
+    plt.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Prune, quantize and deduplicate a RandomForest for compact deployment.")
+    parser.add_argument("model_path", type=str, help="Path to the joblib RandomForest model file")
+    parser.add_argument("--output-dir", type=str, help="Defaults to a compact/ directory next to the model")
+    parser.add_argument("--tolerance", type=float, default=0.001, help="Allowed macro-F1 drop against the full forest")
+    parser.add_argument("--tree-counts", type=int, nargs="+", help="Prefix sizes to evaluate, defaults to a geometric grid")
+    parser.add_argument("--compress", action="store_true", help="Write the compacted model with savez_compressed")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or os.path.join(os.path.dirname(os.path.abspath(args.model_path)), "compact")
+    os.makedirs(output_dir, exist_ok=True)
+
+    start_time = time.perf_counter()
+    model = joblib.load(args.model_path)
+    pickle_load_time = time.perf_counter() - start_time
+    compiled = CompiledForest.from_model(model)
+    if compiled.kind != "random_forest":
+        raise ValueError("Tree-count pruning is only supported for RandomForest models")
+    n_trees = len(compiled.roots)
+    del model
+
+    print("Loading datasets...")
+    X_imputed, y, _, _ = load_labeled_matrix()
+    # Same stratified split as the trainers; the forest never saw the held-out part
+    _, X_val, _, y_val = train_test_split(X_imputed, y, test_size=0.2, random_state=42, stratify=y)
+    X_val = np.ascontiguousarray(X_val, dtype=np.float32)
+
+    tree_counts = sorted(set(count for count in (args.tree_counts or default_tree_counts(n_trees)) if 0 < count <= n_trees) | {n_trees})
+    predictions = prefix_predictions(compiled, X_val, tree_counts, args.batch_size)
+
+    curve = []
+    for count in tree_counts:
+        compacted = compact(compiled, count)
+        curve.append({
+            "n_trees": count,
+            "macro_f1": f1_score(y_val, predictions[count], average="macro"),
+            "compact_size_mb": compacted.nbytes() / 1e6,
+        })
+        print(f"{count:>5} trees: macro-F1 {curve[-1]['macro_f1']:.4f}, {curve[-1]['compact_size_mb']:.1f} MB")
+
+    full_f1 = curve[-1]["macro_f1"]
+    selected = next(point for point in curve if point["macro_f1"] >= full_f1 - args.tolerance)
+    print(f"\nSelected {selected['n_trees']} of {n_trees} trees (macro-F1 {selected['macro_f1']:.4f}, full forest {full_f1:.4f})")
+
+    full_path = os.path.join(output_dir, "forest_full.npz")
+    compact_path = os.path.join(output_dir, f"forest_{selected['n_trees']}_trees.npz")
+    compiled.save(full_path)
+    compacted = compact(compiled, selected["n_trees"])
+    compacted.save(compact_path, compressed=args.compress)
+
+    full, full_predictions, full_stats = measure(full_path, X_val, args.batch_size, args.repeats)
+    reference = prune_trees(full, selected["n_trees"]).predict(X_val, args.batch_size)
+    _, compact_predictions, compact_stats = measure(compact_path, X_val, args.batch_size, args.repeats)
+    full_stats["macro_f1"] = f1_score(y_val, full_predictions, average="macro")
+    compact_stats["macro_f1"] = f1_score(y_val, compact_predictions, average="macro")
+
+    print(f"\n{'':<10}{'size MB':>10}{'load s':>10}{'1-row ms':>10}{'rows/sec':>12}{'macro-F1':>10}")
+    print(f"{'pickle':<10}{os.path.getsize(args.model_path) / 1e6:>10.1f}{pickle_load_time:>10.2f}")
+    for name, stats in (("full", full_stats), ("compact", compact_stats)):
+        print(f"{name:<10}{stats['size_mb']:>10.1f}{stats['load_time_s']:>10.2f}{stats['single_row_latency_ms']:>10.2f}"
+              f"{stats['rows_per_sec']:>12.0f}{stats['macro_f1']:>10.4f}")
+    quantization_lossless = bool(np.array_equal(reference, compact_predictions))
+    print(f"Quantized predictions match the float64 pruned forest: {quantization_lossless}")
+
+    report = {
+        "model_path": os.path.abspath(args.model_path),
+        "tolerance": args.tolerance,
+        "selected_n_trees": selected["n_trees"],
+        "pickle": {"size_mb": os.path.getsize(args.model_path) / 1e6, "load_time_s": pickle_load_time},
+        "full": full_stats,
+        "compact": compact_stats,
+        "quantization_lossless": quantization_lossless,
+        "curve": curve,
+    }
+    with open(os.path.join(output_dir, "compaction_report.json"), "w") as f:
+        json.dump(report, f, indent=4)
+    plot_curve(curve, os.path.join(output_dir, "compaction_curve.png"))
+    print(f"\nCompacted model and report saved to {output_dir}")
+
+if __name__ == "__main__":
+    main()
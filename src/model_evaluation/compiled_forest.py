@@ -0,0 +1,322 @@
+import os
+import sys
+import json
+import time
+import argparse
+import joblib
+import numpy as np
+import sklearn
+from sklearn.model_selection import train_test_split
+from sklearn.utils.fixes import parse_version
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "file_processing"))
+from dataset_loader import load_labeled_matrix
+
+# python3 compiled_forest.py ../random_forest/random_forest_model/random_forest_best_model.pkl --benchmark
+
+# From scikit-learn 1.4 tree_.value holds class fractions that predict_proba returns
+# unchanged; older versions store weighted counts and normalise them per leaf
+TREE_VALUES_ARE_FRACTIONS = parse_version(sklearn.__version__) >= parse_version("1.4")
+XGB_OBJECTIVES = ("multi:softprob", "multi:softmax")
+ARRAY_NAMES = ("left", "right", "feature", "threshold", "default_left", "value_index", "values", "roots", "tree_group")
+
+def flatten_trees(trees):
+    # Concatenates per-tree node arrays; leaves become self-loops so every row can
+    # take the same number of steps without masking finished paths
+    left, right, feature, threshold, default_left, value_index, values, roots = [], [], [], [], [], [], [], []
+    node_offset = 0
+    value_offset = 0
+    for tree in trees:
+        n_nodes = len(tree["left"])
+        nodes = np.arange(node_offset, node_offset + n_nodes)
+        is_leaf = tree["left"] == -1
+        leaf_count = int(is_leaf.sum())
+
+        left.append(np.where(is_leaf, nodes, tree["left"] + node_offset))
+        right.append(np.where(is_leaf, nodes, tree["right"] + node_offset))
+        feature.append(np.where(is_leaf, 0, tree["feature"]))
+        threshold.append(tree["threshold"])
+        default_left.append(tree["default_left"])
+        index = np.full(n_nodes, -1, dtype=np.int64)
+        index[is_leaf] = np.arange(value_offset, value_offset + leaf_count)
+        value_index.append(index)
+        values.append(tree["leaf_values"][is_leaf])
+        roots.append(node_offset)
+
+        node_offset += n_nodes
+        value_offset += leaf_count
+
+    return {
+        "left": np.concatenate(left).astype(np.int32),
+        "right": np.concatenate(right).astype(np.int32),
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold),
+        "default_left": np.concatenate(default_left).astype(bool),
+        "value_index": np.concatenate(value_index).astype(np.int32),
+        "values": np.concatenate(values),
+        "roots": np.asarray(roots, dtype=np.int32),
+    }
+
+def tree_depth(left, right, roots):
+    nodes = np.arange(len(left))
+    frontier = roots[left[roots] != nodes[roots]]
+    depth = 0
+    while frontier.size:
+        depth += 1
+        children = np.concatenate([left[frontier], right[frontier]])
+        frontier = children[left[children] != children]
+    return depth
+
+def random_forest_trees(model):
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        leaf_values = tree.value[:, 0, :model.n_classes_].astype(np.float64)
+        if not TREE_VALUES_ARE_FRACTIONS:
+            # Same per-leaf normalisation as DecisionTreeClassifier.predict_proba
+            normalizer = leaf_values.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            leaf_values = leaf_values / normalizer
+        missing_go_to_left = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=bool))
+        yield {
+            "left": tree.children_left.astype(np.int64),
+            "right": tree.children_right.astype(np.int64),
+            "feature": tree.feature.astype(np.int64),
+            "threshold": tree.threshold.astype(np.float64),
+            "default_left": np.asarray(missing_go_to_left, dtype=bool),
+            "leaf_values": leaf_values,
+        }
+
+def xgboost_trees(model_json, n_trees):
+    for tree in model_json["learner"]["gradient_booster"]["model"]["trees"][:n_trees]:
+        left = np.asarray(tree["left_children"], dtype=np.int64)
+        split_conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+        yield {
+            "left": left,
+            "right": np.asarray(tree["right_children"], dtype=np.int64),
+            "feature": np.asarray(tree["split_indices"], dtype=np.int64),
+            "threshold": split_conditions,
+            "default_left": np.asarray(tree["default_left"], dtype=bool),
+            # Leaf values are stored in split_conditions
+            "leaf_values": split_conditions[:, np.newaxis],
+        }
+
+def parse_base_score(value, n_outputs):
+    if value.startswith("["):
+        scores = json.loads(value)
+    else:
+        scores = [float(value)] * n_outputs
+    return np.asarray(scores, dtype=np.float32)
+
+class CompiledForest:
+    def __init__(self, arrays, metadata):
+        self.metadata = metadata
+        self.kind = metadata["kind"]
+        self.classes_ = np.asarray(metadata["classes"])
+        self.max_depth = metadata["max_depth"]
+        for name in ARRAY_NAMES:
+            setattr(self, name, arrays.get(name))
+
+    @classmethod
+    def from_random_forest(cls, model):
+        arrays = flatten_trees(random_forest_trees(model))
+        metadata = {
+            "kind": "random_forest",
+            "classes": model.classes_.tolist(),
+            "n_features": int(model.n_features_in_),
+            "max_depth": tree_depth(arrays["left"], arrays["right"], arrays["roots"]),
+        }
+        return cls(arrays, metadata)
+
+    @classmethod
+    def from_xgboost(cls, model):
+        booster = model.get_booster()
+        model_json = json.loads(booster.save_raw("json"))
+        learner = model_json["learner"]
+        objective = learner["objective"]["name"]
+        if objective not in XGB_OBJECTIVES:
+            raise ValueError(f"Unsupported XGBoost objective: {objective}")
+        if learner["gradient_booster"]["name"] != "gbtree":
+            raise ValueError(f"Unsupported XGBoost booster: {learner['gradient_booster']['name']}")
+
+        gbtree = learner["gradient_booster"]["model"]
+        n_outputs = int(learner["learner_model_param"]["num_class"])
+        tree_info = np.asarray(gbtree["tree_info"], dtype=np.int32)
+        n_trees = len(tree_info)
+        # XGBClassifier.predict stops at best_iteration when early stopping was used
+        best_iteration = booster.attr("best_iteration")
+        if best_iteration is not None:
+            if "iteration_indptr" in gbtree:
+                n_trees = int(gbtree["iteration_indptr"][int(best_iteration) + 1])
+            else:
+                num_parallel_tree = int(gbtree["gbtree_model_param"].get("num_parallel_tree", 1))
+                n_trees = (int(best_iteration) + 1) * num_parallel_tree * n_outputs
+
+        arrays = flatten_trees(xgboost_trees(model_json, n_trees))
+        arrays["tree_group"] = tree_info[:n_trees]
+        metadata = {
+            "kind": "xgboost",
+            "objective": objective,
+            "classes": model.classes_.tolist(),
+            "n_features": int(learner["learner_model_param"]["num_feature"]),
+            "n_outputs": n_outputs,
+            "base_score": parse_base_score(learner["learner_model_param"]["base_score"], n_outputs).tolist(),
+            "max_depth": tree_depth(arrays["left"], arrays["right"], arrays["roots"]),
+        }
+        return cls(arrays, metadata)
+
+    @classmethod
+    def from_model(cls, model):
+        if hasattr(model, "get_booster"):
+            return cls.from_xgboost(model)
+        if hasattr(model, "estimators_"):
+            return cls.from_random_forest(model)
+        raise ValueError(f"Unsupported model type: {type(model).__name__}")
+
+    def save(self, path, compressed=False):
+        arrays = {name: getattr(self, name) for name in ARRAY_NAMES if getattr(self, name) is not None}
+        savez = np.savez_compressed if compressed else np.savez
+        savez(path, metadata=np.array(json.dumps(self.metadata)), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            metadata = json.loads(str(data["metadata"]))
+            arrays = {name: data[name] for name in ARRAY_NAMES if name in data.files}
+        return cls(arrays, metadata)
+
+    def apply(self, X):
+        # Walks every (row, tree) pair one level per step, like sklearn's apply
+        n_rows = X.shape[0]
+        rows = np.arange(n_rows)[:, np.newaxis]
+        node = np.broadcast_to(self.roots, (n_rows, len(self.roots))).copy()
+        has_missing = np.isnan(X).any()
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[node]]
+            # XGBoost sends a row left on x < split, sklearn on x <= threshold
+            if self.kind == "xgboost":
+                go_left = x < self.threshold[node]
+            else:
+                go_left = x <= self.threshold[node]
+            if has_missing:
+                go_left |= np.isnan(x) & self.default_left[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def batch_scores(self, X):
+        leaves = self.apply(X)
+        if self.kind == "xgboost":
+            margin = np.empty((X.shape[0], self.metadata["n_outputs"]), dtype=np.float32)
+            margin[:] = np.asarray(self.metadata["base_score"], dtype=np.float32)
+            # Accumulate tree by tree in float32, the order XGBoost's CPU predictor uses
+            for tree, group in enumerate(self.tree_group):
+                margin[:, group] += self.values[self.value_index[leaves[:, tree]], 0]
+            return margin
+
+        proba = np.zeros((X.shape[0], len(self.classes_)), dtype=np.float64)
+        # Same summation order as RandomForestClassifier.predict_proba with n_jobs=1
+        for tree in range(len(self.roots)):
+            proba += self.values[self.value_index[leaves[:, tree]]]
+        proba /= len(self.roots)
+        return proba
+
+    def iter_batches(self, X, batch_size):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        for start in range(0, X.shape[0], batch_size):
+            yield self.batch_scores(X[start:start + batch_size])
+
+    def decision_function(self, X, batch_size=1024):
+        return np.concatenate(list(self.iter_batches(X, batch_size)))
+
+    def predict_proba(self, X, batch_size=1024):
+        scores = self.decision_function(X, batch_size)
+        if self.kind == "random_forest":
+            return scores
+        # float32 softmax in the same order as XGBoost's common::Softmax. NumPy's exp can
+        # differ from XGBoost's expf in the last bit, so probabilities agree to about 1e-7
+        # while margins and labels are identical
+        exp = np.exp(scores - scores.max(axis=1, keepdims=True))
+        total = np.zeros(exp.shape[0], dtype=np.float32)
+        for column in range(exp.shape[1]):
+            total += exp[:, column]
+        return exp / total[:, np.newaxis]
+
+    def predict(self, X, batch_size=1024):
+        if self.kind == "xgboost" and self.metadata["objective"] == "multi:softmax":
+            scores = self.decision_function(X, batch_size)
+        else:
+            scores = self.predict_proba(X, batch_size)
+        return self.classes_.take(np.argmax(scores, axis=1), axis=0)
+
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ARRAY_NAMES if getattr(self, name) is not None)
+
+def time_call(func, repeats):
+    timings = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start_time)
+    return result, min(timings)
+
+def run_benchmark(model, compiled, X, batch_size, repeats):
+    print(f"\nBenchmarking on {X.shape[0]} rows (best of {repeats})")
+    reference, model_time = time_call(lambda: model.predict(X), repeats)
+    predictions, compiled_time = time_call(lambda: compiled.predict(X, batch_size), repeats)
+    print(f"model.predict:    {model_time:.3f}s ({X.shape[0] / model_time:.0f} rows/sec)")
+    print(f"compiled.predict: {compiled_time:.3f}s ({X.shape[0] / compiled_time:.0f} rows/sec)")
+    print(f"Predictions identical: {np.array_equal(reference, predictions)}")
+
+    if compiled.kind == "random_forest":
+        # Threaded predict_proba sums the trees in completion order, so compare against n_jobs=1
+        n_jobs = model.n_jobs
+        model.set_params(n_jobs=1)
+        reference_scores = model.predict_proba(X)
+        model.set_params(n_jobs=n_jobs)
+        label = "Probabilities"
+    else:
+        reference_scores = model.predict(X, output_margin=True)
+        label = "Margins"
+    scores = compiled.decision_function(X, batch_size)
+    print(f"{label} bit-identical: {np.array_equal(reference_scores, scores)} "
+          f"(max abs difference {np.abs(reference_scores - scores).max():.3g})")
+
+    single_row = X[:1]
+    _, model_latency = time_call(lambda: model.predict(single_row), repeats * 10)
+    _, compiled_latency = time_call(lambda: compiled.predict(single_row), repeats * 10)
+    print(f"Single-row latency: model {model_latency * 1000:.2f}ms, compiled {compiled_latency * 1000:.2f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Flatten a RandomForest or XGBoost model into arrays for fast batched inference.")
+    parser.add_argument("model_path", type=str, help="Path to the joblib model file")
+    parser.add_argument("--output", type=str, help="Output .npz path, defaults to the model path with a .npz suffix")
+    parser.add_argument("--benchmark", action="store_true", help="Compare latency, throughput and outputs against model.predict")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    model = joblib.load(args.model_path)
+    print(f"Loaded {type(model).__name__} in {time.perf_counter() - start_time:.2f}s "
+          f"({os.path.getsize(args.model_path) / 1e6:.1f} MB on disk)")
+
+    compiled = CompiledForest.from_model(model)
+    output_path = args.output or os.path.splitext(args.model_path)[0]
+    if not output_path.endswith(".npz"):
+        output_path += ".npz"
+    compiled.save(output_path)
+    print(f"Compiled {len(compiled.roots)} trees, {len(compiled.left)} nodes, max depth {compiled.max_depth} "
+          f"({compiled.nbytes() / 1e6:.1f} MB in memory)")
+
+    start_time = time.perf_counter()
+    compiled = CompiledForest.load(output_path)
+    print(f"Saved to {output_path} ({os.path.getsize(output_path) / 1e6:.1f} MB), "
+          f"reloaded in {time.perf_counter() - start_time:.2f}s")
+
+    if args.benchmark:
+        print("Loading datasets...")
+        X_imputed, y, _, _ = load_labeled_matrix()
+        _, X_test, _, _ = train_test_split(X_imputed, y, test_size=0.2, random_state=42, stratify=y)
+        run_benchmark(model, compiled, np.asarray(X_test), args.batch_size, args.repeats)
+
+if __name__ == "__main__":
+    main()
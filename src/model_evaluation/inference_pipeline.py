@@ -0,0 +1,189 @@
+import os
+import json
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+from model_bundle import load_components
+from compiled_forest import time_call
+from benchmarking_unsupervised import load_scenarios, scenario_config, scenario_files
+
+# python3 inference_pipeline.py ../ocsvm/one_class_svm_bundle --repeats 3
+
+def scaling_terms(scaler, n_features):
+    # Every supported scaler is an affine map per column: X * multiplier + offset
+    ones, zeros = np.ones(n_features), np.zeros(n_features)
+    if scaler is None:
+        return ones, zeros, None
+    if isinstance(scaler, StandardScaler):
+        # mean_ is set even with with_mean=False, so the flags decide what transform applies
+        mean = scaler.mean_ if scaler.with_mean else zeros
+        scale = scaler.scale_ if scaler.with_std else ones
+        return 1.0 / scale, -mean / scale, None
+    if isinstance(scaler, MinMaxScaler):
+        return scaler.scale_, scaler.min_, scaler.feature_range if scaler.clip else None
+    raise ValueError(f"Unsupported scaler {type(scaler).__name__}, expected StandardScaler or MinMaxScaler")
+
+class InferencePipeline:
+    # Imputation and scaling in one pass over a reused block buffer, instead of the
+    # two full-size float64 copies imputer.transform and scaler.transform allocate.
+    # The buffers are reused between calls, so one instance per thread.
+    def __init__(self, model, imputer, scaler=None, dtype=np.float32, block_size=65536):
+        if not (isinstance(imputer.missing_values, float) and np.isnan(imputer.missing_values)):
+            raise ValueError("Only imputers with missing_values=np.nan are supported")
+        if imputer.add_indicator:
+            raise ValueError("Imputers with add_indicator=True are not supported")
+
+        statistics = np.asarray(imputer.statistics_, dtype=np.float64)
+        if getattr(imputer, "keep_empty_features", False):
+            keep = np.ones(len(statistics), dtype=bool)
+            statistics = np.nan_to_num(statistics, nan=0.0)
+        else:
+            # SimpleImputer drops the columns that were all-NaN during fit
+            keep = ~np.isnan(statistics)
+
+        self.model = model
+        self.dtype = np.dtype(dtype)
+        self.block_size = block_size
+        self.columns = [str(column) for column in getattr(imputer, "feature_names_in_", [])]
+        self.n_input_features = len(statistics)
+        self.keep_index = np.flatnonzero(keep)
+        self.drops_columns = len(self.keep_index) < len(statistics)
+
+        multiplier, offset, self.clip = scaling_terms(scaler, len(self.keep_index))
+        fill = statistics[keep] * multiplier + offset
+        if self.clip is not None:
+            fill = np.clip(fill, *self.clip)
+        self.multiplier = multiplier.astype(self.dtype)
+        self.offset = offset.astype(self.dtype)
+        # NaNs pass through the affine step unchanged, so they are replaced by the scaled mean afterwards
+        self.fill = fill.astype(self.dtype)
+        self._buffer = None
+        self._mask = None
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        model, imputer, scaler = load_components(path)
+        return cls(model, imputer, scaler, **kwargs)
+
+    def input_array(self, df):
+        if self.columns:
+            df = df.reindex(columns=self.columns)
+        return df.to_numpy(dtype=np.float64)
+
+    def transform(self, X, out=None, mask=None):
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_input_features:
+            raise ValueError(f"Expected a 2D array with {self.n_input_features} columns, got shape {X.shape}")
+        n_rows, n_features = X.shape[0], len(self.keep_index)
+        out = np.empty((n_rows, n_features), dtype=self.dtype) if out is None else out
+        mask = np.empty((n_rows, n_features), dtype=bool) if mask is None else mask
+
+        if self.drops_columns:
+            # Column by column, so dropping columns never needs a full-size temporary
+            for column, source in enumerate(self.keep_index):
+                out[:, column] = X[:, source]
+        else:
+            np.copyto(out, X, casting='unsafe')
+        out *= self.multiplier
+        out += self.offset
+        if self.clip is not None:
+            np.clip(out, *self.clip, out=out)
+        np.isnan(out, out=mask)
+        np.copyto(out, self.fill, where=mask)
+        return out
+
+    def _map_blocks(self, func, X):
+        X = np.asarray(X)
+        rows = min(X.shape[0], self.block_size)
+        if self._buffer is None or self._buffer.shape[0] < rows:
+            self._buffer = np.empty((rows, len(self.keep_index)), dtype=self.dtype)
+            self._mask = np.empty((rows, len(self.keep_index)), dtype=bool)
+
+        results = []
+        for start in range(0, X.shape[0], self.block_size):
+            block = X[start:start + self.block_size]
+            n_rows = block.shape[0]
+            results.append(func(self.transform(block, self._buffer[:n_rows], self._mask[:n_rows])))
+        return np.concatenate(results) if results else np.empty(0)
+
+    def predict_batch(self, X):
+        return self._map_blocks(self.model.predict, X)
+
+    def score_batch(self, X):
+        return self._map_blocks(self.model.decision_function, X)
+
+def reference_predict(model, imputer, scaler, df):
+    # The chain every evaluation script uses today
+    X = imputer.transform(df)
+    if scaler is not None:
+        X = scaler.transform(X)
+    return model.predict(X)
+
+def peak_traced_bytes(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def run_benchmark(model, imputer, scaler, pipeline, scenarios, repeats):
+    rows = []
+    for scenario, df in scenarios.items():
+        input_bytes = df.memory_usage(index=False).sum()
+        reference = lambda: reference_predict(model, imputer, scaler, df)
+        fused = lambda: pipeline.predict_batch(pipeline.input_array(df))
+
+        expected, reference_seconds = time_call(reference, repeats)
+        predictions, fused_seconds = time_call(fused, repeats)
+        # Timed without tracing, tracemalloc slows every allocation down
+        reference_peak = peak_traced_bytes(reference)
+        fused_peak = peak_traced_bytes(fused)
+        rows.append({
+            "scenario": scenario,
+            "rows": len(df),
+            "input_mb": input_bytes / 1e6,
+            "reference_seconds": reference_seconds,
+            "fused_seconds": fused_seconds,
+            "reference_peak_mb": reference_peak / 1e6,
+            "fused_peak_mb": fused_peak / 1e6,
+            # Peak extra allocation in units of the input frame, i.e. the number of full-size copies
+            "reference_copies": reference_peak / input_bytes,
+            "fused_copies": fused_peak / input_bytes,
+            "prediction_agreement": float(np.mean(expected == predictions)),
+        })
+    return pd.DataFrame(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the fused inference pipeline with imputer -> scaler -> model on the test scenarios.")
+    parser.add_argument('model_path', type=str, help="Model pickle or bundle directory")
+    parser.add_argument('--dtype', choices=['float32', 'float64'], default='float32',
+                        help="Buffer dtype, tree models work in float32 internally, kernel SVMs upcast to float64")
+    parser.add_argument('--block-size', type=int, default=65536, help="Rows preprocessed and scored per block")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', type=str, help="Results JSON, defaults to inference_pipeline_benchmark.json next to the model")
+    args = parser.parse_args()
+
+    model, imputer, scaler = load_components(args.model_path)
+    pipeline = InferencePipeline(model, imputer, scaler, dtype=args.dtype, block_size=args.block_size)
+    print(f"{type(model).__name__}: {pipeline.n_input_features} input columns, "
+          f"{len(pipeline.keep_index)} after imputation, {args.dtype} blocks of {args.block_size} rows")
+
+    base_dataset_path = "/home/philipp/Documents/Thesis/session_Datasets"
+    files_by_scenario = {scenario: scenario_files(scenario, config, base_dataset_path)
+                         for scenario, config in scenario_config.items()}
+    scenarios = load_scenarios({scenario: files for scenario, files in files_by_scenario.items() if files})
+
+    results = run_benchmark(model, imputer, scaler, pipeline, scenarios, args.repeats)
+    print(results.round(3).to_string(index=False))
+
+    model_dir = args.model_path if os.path.isdir(args.model_path) else os.path.dirname(args.model_path)
+    output_path = args.output or os.path.join(model_dir, "inference_pipeline_benchmark.json")
+    with open(output_path, 'w') as f:
+        json.dump(results.to_dict(orient="records"), f, indent=4)
+    print(f"\nResults saved to {output_path}")
+
+if __name__ == "__main__":
+    main()
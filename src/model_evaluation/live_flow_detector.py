@@ -0,0 +1,166 @@
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+import subprocess
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "file_processing"))
+from flow_stats import PACKET_FIELDS, STATS_COLUMNS, compute_segment_stats
+from model_bundle import load_components
+
+# python3 live_flow_detector.py --model-path ocsvm/one_class_svm_model.pkl --replay normal_it:90.pcap
+
+def tshark_command(interface=None, replay=None, tshark_path="tshark"):
+    command = [tshark_path, "-l", "-n", "-Y", "ip and (tcp or udp)", "-T", "fields",
+               "-E", "separator=,", "-E", "occurrence=f"]
+    command.extend(["-r", replay] if replay else ["-i", interface])
+    for field in PACKET_FIELDS:
+        command.extend(["-e", field])
+    return command
+
+def read_lines(stream, line_queue):
+    for line in stream:
+        line_queue.put((line, time.perf_counter()))
+    line_queue.put((None, time.perf_counter()))
+
+def parse_packet(line):
+    time_epoch, cap_len, src, dst, proto, tcp_sport, tcp_dport, udp_sport, udp_dport = line.rstrip("\n").split(",")
+    sport = tcp_sport or udp_sport
+    dport = tcp_dport or udp_dport
+    return float(time_epoch), float(cap_len), (src, dst, sport, dport, proto)
+
+class FlowTable:
+    def __init__(self, idle_timeout, packet_threshold):
+        self.idle_timeout = idle_timeout
+        self.packet_threshold = packet_threshold
+        self.flows = {}
+
+    def add(self, key, packet_time, size, received_at):
+        flow = self.flows.get(key)
+        if flow is None:
+            flow = self.flows[key] = {"times": [], "sizes": [], "received_at": received_at}
+        flow["times"].append(packet_time)
+        flow["sizes"].append(size)
+        flow["received_at"] = received_at
+        if len(flow["times"]) >= self.packet_threshold:
+            return [(key, self.flows.pop(key))]
+        return []
+
+    def expire(self, now, received_at):
+        expired = [key for key, flow in self.flows.items() if now - flow["times"][-1] > self.idle_timeout]
+        return [(key, dict(self.flows.pop(key), received_at=received_at)) for key in expired]
+
+    def drain(self, received_at):
+        drained = [(key, dict(flow, received_at=received_at)) for key, flow in self.flows.items()]
+        self.flows = {}
+        return drained
+
+def flow_features(flows):
+    times = np.concatenate([np.asarray(flow["times"]) for _, flow in flows])
+    sizes = np.concatenate([np.asarray(flow["sizes"]) for _, flow in flows])
+    segment_ids = np.repeat(np.arange(len(flows)), [len(flow["times"]) for _, flow in flows])
+    return pd.DataFrame(compute_segment_stats(times, sizes, segment_ids), columns=STATS_COLUMNS)
+
+def score_flows(flows, model, imputer, scaler, min_packets, latencies):
+    flows = [(key, flow) for key, flow in flows if len(flow["times"]) >= min_packets]
+    if not flows:
+        return
+
+    X = imputer.transform(flow_features(flows))
+    if scaler is not None:
+        X = scaler.transform(X)
+    predictions = model.predict(X)
+    scored_at = time.perf_counter()
+
+    for (key, flow), prediction in zip(flows, predictions):
+        latency_ms = (scored_at - flow["received_at"]) * 1000
+        latencies.append(latency_ms)
+        # Supervised models predict class 0 for normal traffic, unsupervised ones +1/-1
+        is_attack = prediction != 0 if hasattr(model, "classes_") else prediction == -1
+        verdict = "ATTACK" if is_attack else "normal"
+        src, dst, sport, dport, proto = key
+        print(f"{verdict:<6} {src}:{sport} -> {dst}:{dport} proto={proto} "
+              f"packets={len(flow['times'])} prediction={prediction} latency={latency_ms:.1f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description='Score flows from a live interface or a pcap replay with a trained flow model')
+    parser.add_argument('--model-path', type=str, required=True,
+                        help='Model pickle or bundle directory, relative to /home/philipp/Documents/Thesis/src')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--interface', type=str, help='Capture interface for live detection')
+    source.add_argument('--replay', type=str, help='pcap file to replay, relative to packet_capture/ or absolute')
+    parser.add_argument('--idle-timeout', type=float, default=5.0, help='Seconds without packets before a flow is scored')
+    parser.add_argument('--packet-threshold', type=int, default=100, help='Score a flow once it reaches this many packets')
+    parser.add_argument('--min-packets', type=int, default=2, help='Ignore flows with fewer packets, like flow_ptks_thres')
+    args = parser.parse_args()
+
+    base_src_dir = "/home/philipp/Documents/Thesis/src"
+    model, imputer, scaler = load_components(os.path.join(base_src_dir, args.model_path))
+
+    replay = args.replay
+    if replay and not os.path.isabs(replay):
+        replay = os.path.join("/home/philipp/Documents/Thesis/packet_capture", replay)
+
+    process = subprocess.Popen(tshark_command(args.interface, replay), stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, text=True, bufsize=1)
+    line_queue = queue.Queue(maxsize=100000)
+    threading.Thread(target=read_lines, args=(process.stdout, line_queue), daemon=True).start()
+
+    flow_table = FlowTable(args.idle_timeout, args.packet_threshold)
+    latencies = []
+    packet_count = 0
+    clock = None
+    last_sweep = None
+    sweep_interval = min(1.0, args.idle_timeout / 10)
+    last_wall = time.perf_counter()
+    start_time = last_wall
+
+    try:
+        while True:
+            ready = []
+            try:
+                line, received_at = line_queue.get(timeout=0.05)
+            except queue.Empty:
+                line, received_at = "", time.perf_counter()
+                if clock is not None and args.interface:
+                    # No traffic: advance the packet clock with wall time so idle flows still expire
+                    clock += received_at - last_wall
+                last_wall = received_at
+            else:
+                if line is None:
+                    break
+                last_wall = received_at
+
+            if line:
+                try:
+                    packet_time, size, key = parse_packet(line)
+                except ValueError:
+                    continue
+                packet_count += 1
+                clock = packet_time if clock is None else max(clock, packet_time)
+                ready.extend(flow_table.add(key, packet_time, size, received_at))
+
+            if clock is not None and (last_sweep is None or not line or clock - last_sweep >= sweep_interval):
+                ready.extend(flow_table.expire(clock, received_at))
+                last_sweep = clock
+            if ready:
+                score_flows(ready, model, imputer, scaler, args.min_packets, latencies)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        process.terminate()
+
+    score_flows(flow_table.drain(time.perf_counter()), model, imputer, scaler, args.min_packets, latencies)
+
+    elapsed = time.perf_counter() - start_time
+    print(f"\nProcessed {packet_count} packets in {elapsed:.1f}s ({packet_count / elapsed:.1f} packets/sec)")
+    if latencies:
+        print(f"Scored {len(latencies)} flows, latency p50={np.percentile(latencies, 50):.1f}ms "
+              f"p99={np.percentile(latencies, 99):.1f}ms max={max(latencies):.1f}ms")
+
+if __name__ == "__main__":
+    main()
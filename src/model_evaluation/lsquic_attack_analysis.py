@@ -1,12 +1,12 @@
 import pandas as pd
 import glob
 import os
-import joblib
 import json
 import numpy as np
 from sklearn.impute import SimpleImputer
 import argparse
 from tqdm import tqdm
+from model_bundle import load_components
 import matplotlib.pyplot as plt
 import re
 
@@ -41,7 +41,7 @@ def test_scenario(scenario_path, model, imputer, scaler, scenario_name):
                 continue
             df = pd.read_csv(file)
             X_imputed = imputer.transform(df)
-            X = scaler.transform(X_imputed)
+            X = scaler.transform(X_imputed) if scaler is not None else X_imputed
             
             predictions = model.predict(X)
             normal = int(sum(predictions == 1))
@@ -81,7 +81,7 @@ def test_scenario(scenario_path, model, imputer, scaler, scenario_name):
 def main():
     parser = argparse.ArgumentParser(description='Test OCSVM model with custom ranges')
     parser.add_argument('--model-path', type=str, required=True, 
-                       help='Path to model file relative to /home/philipp/Documents/Thesis/src')
+                       help='Model pickle or bundle directory, relative to /home/philipp/Documents/Thesis/src')
     args = parser.parse_args()
 
     base_src_dir = "/home/philipp/Documents/Thesis/src"
@@ -89,9 +89,7 @@ def main():
     model_name = os.path.splitext(os.path.basename(args.model_path))[0]
     
     try:
-        model = joblib.load(os.path.join(base_src_dir, args.model_path))
-        imputer = joblib.load(os.path.join(model_dir, "imputer.pkl"))
-        scaler = joblib.load(os.path.join(model_dir, "scaler.pkl"))
+        model, imputer, scaler = load_components(os.path.join(base_src_dir, args.model_path))
         print(f"Model and preprocessing components loaded successfully")
     except Exception as e:
         print(f"Error loading model components: {e}")
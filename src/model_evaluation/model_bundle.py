@@ -0,0 +1,187 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import datetime
+import joblib
+import sklearn
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "file_processing"))
+from extraction_manifest import file_sha256
+
+# python3 model_bundle.py convert ../ocsvm/one_class_svm_model.pkl --output ../ocsvm/one_class_svm_bundle
+# python3 model_bundle.py info ../ocsvm/one_class_svm_bundle
+
+BUNDLE_VERSION = 1
+METADATA_FILE = "metadata.json"
+COMPONENTS = ("model", "imputer", "scaler")
+UNSUPERVISED_LABELS = {1: "normal", -1: "attack"}
+SUPERVISED_LABELS = {0: "Normal", 1: "Slowloris", 2: "Quicly", 3: "LSQUIC"}
+
+def training_data_hash(file_paths):
+    # Content hash, so a bundle can be matched to its data even after the files were copied
+    digest = hashlib.sha256()
+    for path in sorted(file_paths):
+        digest.update(f"{os.path.basename(path)}|{file_sha256(path)}\n".encode())
+    return digest.hexdigest()
+
+def is_bundle(path):
+    return os.path.isfile(os.path.join(path, METADATA_FILE))
+
+def save_bundle(bundle_dir, model, imputer, scaler=None, label_map=None, training_files=None,
+                data_hash=None, timings=None, extra=None):
+    components = {"model": model, "imputer": imputer, "scaler": scaler}
+    metadata = {
+        "bundle_version": BUNDLE_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "sklearn_version": sklearn.__version__,
+        "model_class": type(model).__name__,
+        "components": {name: f"{name}.joblib" for name, component in components.items() if component is not None},
+        "feature_columns": [str(column) for column in getattr(imputer, "feature_names_in_", [])],
+        "label_map": {str(label): name for label, name in (label_map or {}).items()},
+        "training_files": [os.path.basename(path) for path in training_files or []],
+        "training_data_hash": data_hash or (training_data_hash(training_files) if training_files else None),
+        "timings": timings or {},
+        **(extra or {}),
+    }
+
+    parent_dir = os.path.dirname(os.path.abspath(bundle_dir))
+    os.makedirs(parent_dir, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(dir=parent_dir)
+    for name, filename in metadata["components"].items():
+        # Uncompressed, otherwise joblib cannot memory-map the arrays on load
+        joblib.dump(components[name], os.path.join(tmp_path, filename))
+    with open(os.path.join(tmp_path, METADATA_FILE), 'w') as f:
+        json.dump(metadata, f, indent=4)
+
+    if os.path.exists(bundle_dir):
+        shutil.rmtree(bundle_dir)
+    os.rename(tmp_path, bundle_dir)
+    return bundle_dir
+
+class ModelBundle:
+    # Reads metadata.json up front and each component on first access. With
+    # mmap_mode='r' plain numpy attributes stay memory-mapped and are shared through
+    # the page cache: OneClassSVM support vectors and dual coefficients, imputer and
+    # scaler statistics. Tree models are not: sklearn's Tree copies its node arrays
+    # when unpickled (RandomForest, IsolationForest) and XGBoost loads its booster
+    # from raw bytes, so every process still holds its own copy of those.
+    def __init__(self, bundle_dir, mmap_mode='r'):
+        self.bundle_dir = bundle_dir
+        self.mmap_mode = mmap_mode
+        with open(os.path.join(bundle_dir, METADATA_FILE), 'r') as f:
+            self.metadata = json.load(f)
+        if self.metadata.get("bundle_version", 0) > BUNDLE_VERSION:
+            raise ValueError(f"{bundle_dir} has bundle version {self.metadata['bundle_version']}, "
+                             f"this code reads up to {BUNDLE_VERSION}")
+        self._components = {}
+        self.load_seconds = {}
+
+    def component_path(self, name):
+        filename = self.metadata["components"].get(name)
+        return os.path.join(self.bundle_dir, filename) if filename else None
+
+    def _load(self, name):
+        if name not in self._components:
+            path = self.component_path(name)
+            start_time = time.perf_counter()
+            self._components[name] = joblib.load(path, mmap_mode=self.mmap_mode) if path else None
+            self.load_seconds[name] = time.perf_counter() - start_time
+        return self._components[name]
+
+    @property
+    def model(self):
+        return self._load("model")
+
+    @property
+    def imputer(self):
+        return self._load("imputer")
+
+    @property
+    def scaler(self):
+        return self._load("scaler")
+
+    @property
+    def feature_columns(self):
+        return self.metadata["feature_columns"]
+
+    @property
+    def label_map(self):
+        return {int(label): name for label, name in self.metadata["label_map"].items()}
+
+    def transform(self, df):
+        if self.feature_columns:
+            df = df.reindex(columns=self.feature_columns)
+        X = self.imputer.transform(df)
+        return self.scaler.transform(X) if self.scaler is not None else X
+
+    def predict(self, df):
+        return self.model.predict(self.transform(df))
+
+def legacy_component_paths(model_path):
+    # The convention used by the training scripts: imputer.pkl/scaler.pkl next to
+    # the model, or <name>_imputer.pkl/<name>_scaler.pkl for grid search models
+    model_dir = os.path.dirname(model_path)
+    name = os.path.splitext(os.path.basename(model_path))[0]
+    paths = {"model": model_path}
+    for component in ("imputer", "scaler"):
+        path = os.path.join(model_dir, f"{name}_{component}.pkl")
+        if not os.path.exists(path):
+            path = os.path.join(model_dir, f"{component}.pkl")
+        paths[component] = path if os.path.exists(path) else None
+    return paths
+
+def load_components(path, mmap_mode='r'):
+    # Bundle directory or legacy model pickle, returns (model, imputer, scaler)
+    if is_bundle(path):
+        bundle = ModelBundle(path, mmap_mode)
+        return bundle.model, bundle.imputer, bundle.scaler
+    paths = legacy_component_paths(path)
+    if paths["imputer"] is None:
+        raise FileNotFoundError(f"No imputer found next to {path}")
+    return tuple(joblib.load(paths[name]) if paths[name] else None for name in COMPONENTS)
+
+def convert(model_path, output, label_map=None):
+    paths = legacy_component_paths(model_path)
+    if paths["imputer"] is None:
+        raise FileNotFoundError(f"No imputer found next to {model_path}")
+    components = {name: joblib.load(path) if path else None for name, path in paths.items()}
+    extra = {"converted_from": {name: os.path.abspath(path) for name, path in paths.items() if path}}
+    return save_bundle(output, components["model"], components["imputer"], components["scaler"],
+                       label_map=label_map, extra=extra)
+
+def print_info(bundle_dir):
+    bundle = ModelBundle(bundle_dir)
+    print(json.dumps({key: value for key, value in bundle.metadata.items() if key != "training_files"}, indent=4))
+    for name in COMPONENTS:
+        path = bundle.component_path(name)
+        if path:
+            print(f"{name:<8} {os.path.getsize(path) / 1e6:>10.2f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert legacy model pickles to bundles and inspect bundles.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    convert_parser = subparsers.add_parser("convert", help="Bundle a model pickle with the imputer/scaler next to it")
+    convert_parser.add_argument('model_path', type=str)
+    convert_parser.add_argument('--output', type=str, help="Bundle directory, defaults to <model name>_bundle next to the model")
+    convert_parser.add_argument('--supervised', action='store_true', help="Record the multi-class label map instead of normal/attack")
+    info_parser = subparsers.add_parser("info", help="Print a bundle's metadata and component sizes")
+    info_parser.add_argument('bundle_dir', type=str)
+    args = parser.parse_args()
+
+    if args.command == "info":
+        print_info(args.bundle_dir)
+        return
+
+    output = args.output or os.path.splitext(args.model_path)[0] + "_bundle"
+    label_map = SUPERVISED_LABELS if args.supervised else UNSUPERVISED_LABELS
+    convert(args.model_path, output, label_map)
+    print(f"Bundle saved to {output}")
+    print_info(output)
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,12 @@
 import pandas as pd
 import glob
 import os
-import joblib
 import json
 import numpy as np
 from sklearn.impute import SimpleImputer
 import argparse
 from tqdm import tqdm
+from model_bundle import load_components
 
 
 # python3 benchmarking_ocsvm.py --model-path ocsvm/one_class_svm_model.pkl --normal-start 90 --normal-end 91 --attack-start 1 --attack-end 1
@@ -49,7 +49,7 @@ def test_scenario(scenario_path, model, imputer, scaler, scenario_name, normal_r
         try:
             df = pd.read_csv(file)
             X_imputed = imputer.transform(df)
-            X = scaler.transform(X_imputed)
+            X = scaler.transform(X_imputed) if scaler is not None else X_imputed
             
             predictions = model.predict(X)
             normal = int(sum(predictions == 1))
@@ -83,7 +83,7 @@ def test_scenario(scenario_path, model, imputer, scaler, scenario_name, normal_r
 def main():
     parser = argparse.ArgumentParser(description='Test OCSVM model with custom ranges')
     parser.add_argument('--model-path', type=str, required=True, 
-                       help='Path to model file relative to /home/philipp/Documents/Thesis/src')
+                       help='Model pickle or bundle directory, relative to /home/philipp/Documents/Thesis/src')
     parser.add_argument('--normal-start', type=int, default=81)
     parser.add_argument('--normal-end', type=int, default=100)
     parser.add_argument('--attack-start', type=int, default=1)
@@ -95,9 +95,7 @@ def main():
     model_name = os.path.splitext(os.path.basename(args.model_path))[0]
     
     try:
-        model = joblib.load(os.path.join(base_src_dir, args.model_path))
-        imputer = joblib.load(os.path.join(model_dir, "imputer.pkl"))
-        scaler = joblib.load(os.path.join(model_dir, "scaler.pkl"))
+        model, imputer, scaler = load_components(os.path.join(base_src_dir, args.model_path))
         print(f"Model and preprocessing components loaded successfully")
     except Exception as e:
         print(f"Error loading model components: {e}")
@@ -0,0 +1,173 @@
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from sklearn.metrics import roc_curve, precision_recall_curve, auc
+
+# python3 score_store.py ../isolation_forest/grid_search_scores/iforest_est100_samp10000_none.npz --threshold -0.05 0
+
+def save_scores(path, scenario_scores, metadata):
+    # scenario_scores: [(scenario, [(filename, scores), ...]), ...]
+    arrays = {}
+    for scenario, file_scores in scenario_scores:
+        arrays[f"{scenario}__scores"] = np.concatenate([scores for _, scores in file_scores])
+        arrays[f"{scenario}__offsets"] = np.cumsum([0] + [len(scores) for _, scores in file_scores])
+        arrays[f"{scenario}__files"] = np.array([filename for filename, _ in file_scores])
+    metadata = dict(metadata, scenarios=[scenario for scenario, _ in scenario_scores])
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    np.savez(path, metadata=np.array(json.dumps(metadata)), **arrays)
+
+def stack_files(file_paths, transform):
+    # One matrix per scenario; offsets[i]:offsets[i + 1] are the rows of filenames[i]
+    frames, filenames = [], []
+    for file in file_paths:
+        try:
+            frames.append(pd.read_csv(file))
+            filenames.append(os.path.basename(file))
+        except Exception as e:
+            print(f"\nError processing {file}: {e}")
+    if not frames:
+        return [], np.zeros(1, dtype=np.int64), None
+    offsets = np.cumsum([0] + [len(df) for df in frames])
+    return filenames, offsets, transform(pd.concat(frames, ignore_index=True))
+
+def split_scores(scores, filenames, offsets):
+    return [(filename, scores[start:end]) for filename, start, end in zip(filenames, offsets[:-1], offsets[1:])]
+
+class ScoreIndex:
+    # A flow counts as attack when its score is below the threshold, or at it
+    # with attack_inclusive (libsvm's OneClassSVM.predict labels 0 as -1)
+    def __init__(self, scenario_scores, metadata=None):
+        self.metadata = metadata or {}
+        self.side = "right" if self.metadata.get("attack_inclusive") else "left"
+        self.scenarios = {}
+        for scenario, file_scores in scenario_scores:
+            self.scenarios[scenario] = {
+                "files": [filename for filename, _ in file_scores],
+                "sorted": [np.sort(scores) for _, scores in file_scores],
+            }
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            metadata = json.loads(str(data["metadata"]))
+            scenario_scores = []
+            for scenario in metadata["scenarios"]:
+                scores = data[f"{scenario}__scores"]
+                offsets = data[f"{scenario}__offsets"]
+                files = data[f"{scenario}__files"].tolist()
+                scenario_scores.append((scenario, split_scores(scores, files, offsets)))
+        return cls(scenario_scores, metadata)
+
+    def scores(self, scenario):
+        return np.concatenate(self.scenarios[scenario]["sorted"])
+
+    def summarize(self, scenario, threshold):
+        entry = self.scenarios[scenario]
+        results = {
+            "scenario": scenario,
+            "files": [],
+            "total": {"normal": 0, "attack": 0, "total": 0}
+        }
+
+        for filename, sorted_scores in zip(entry["files"], entry["sorted"]):
+            total = len(sorted_scores)
+            if total == 0:
+                continue
+            attack = int(np.searchsorted(sorted_scores, threshold, side=self.side))
+            normal = total - attack
+
+            results["files"].append({
+                "filename": filename,
+                "normal": normal,
+                "attack": attack,
+                "total": total,
+                "normal_percentage": float(normal/total*100),
+                "attack_percentage": float(attack/total*100)
+            })
+
+            results["total"]["normal"] += normal
+            results["total"]["attack"] += attack
+            results["total"]["total"] += total
+
+        if results["total"]["total"] > 0:
+            total = results["total"]["total"]
+            results["total"]["normal_percentage"] = float(results["total"]["normal"]/total*100)
+            results["total"]["attack_percentage"] = float(results["total"]["attack"]/total*100)
+
+        return results
+
+    def summarize_all(self, threshold):
+        return [self.summarize(scenario, threshold) for scenario in self.scenarios]
+
+    def curves(self, normal_scenario="normal", attack_scenarios=None):
+        attack_scenarios = attack_scenarios or [s for s in self.scenarios if s != normal_scenario]
+        normal_scores = self.scores(normal_scenario)
+        attack_scores = np.concatenate([self.scores(scenario) for scenario in attack_scenarios])
+        y_true = np.r_[np.zeros(len(normal_scores)), np.ones(len(attack_scores))]
+        # Lower scores mean more anomalous, so negate them for the attack class
+        y_score = -np.r_[normal_scores, attack_scores]
+
+        fpr, tpr, roc_thresholds = roc_curve(y_true, y_score)
+        precision, recall, pr_thresholds = precision_recall_curve(y_true, y_score)
+        return {
+            "roc": {"fpr": fpr, "tpr": tpr, "thresholds": -roc_thresholds, "auc": auc(fpr, tpr)},
+            "pr": {"precision": precision, "recall": recall, "thresholds": -pr_thresholds, "auc": auc(recall, precision)},
+        }
+
+def plot_curves(curves, title, output_path):
+    fig, (roc_axis, pr_axis) = plt.subplots(1, 2, figsize=(12, 5))
+    roc_axis.plot(curves["roc"]["fpr"], curves["roc"]["tpr"], label=f"AUC = {curves['roc']['auc']:.4f}")
+    roc_axis.plot([0, 1], [0, 1], linestyle="--", color="grey")
+    roc_axis.set_xlabel("False Positive Rate")
+    roc_axis.set_ylabel("True Positive Rate")
+    roc_axis.set_title("ROC")
+    roc_axis.legend()
+    pr_axis.plot(curves["pr"]["recall"], curves["pr"]["precision"], label=f"AUC = {curves['pr']['auc']:.4f}")
+    pr_axis.set_xlabel("Recall")
+    pr_axis.set_ylabel("Precision")
+    pr_axis.set_title("Precision-Recall")
+    pr_axis.legend()
+    fig.suptitle(title)
+    plt.tight_layout()
+    plt.savefig(output_path, dpi=150)
+    plt.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate stored anomaly scores at any threshold without rescoring the model.")
+    parser.add_argument("score_file", type=str, help="Score store written by a fine-tuning script (.npz)")
+    parser.add_argument("--threshold", type=float, nargs="+",
+                        help="Thresholds to evaluate, defaults to the operating points stored with the scores")
+    parser.add_argument("--normal-scenario", type=str, default="normal")
+    parser.add_argument("--output-dir", type=str, help="Where to write curves, defaults to the score file's directory")
+    args = parser.parse_args()
+
+    index = ScoreIndex.load(args.score_file)
+    operating_points = index.metadata.get("operating_points", {})
+    if args.threshold:
+        operating_points = {f"threshold={threshold}": threshold for threshold in args.threshold}
+
+    for name, threshold in operating_points.items():
+        print(f"\n{name} (threshold {threshold:.6g}):")
+        for results in index.summarize_all(threshold):
+            if results["total"]["total"]:
+                print(f"  {results['scenario']}: Normal={results['total']['normal_percentage']:.2f}%, "
+                      f"Attack={results['total']['attack_percentage']:.2f}%")
+
+    if args.normal_scenario not in index.scenarios or len(index.scenarios) < 2:
+        print(f"\nNeed '{args.normal_scenario}' and at least one attack scenario for ROC/PR curves")
+        return
+
+    curves = index.curves(args.normal_scenario)
+    print(f"\nROC AUC: {curves['roc']['auc']:.4f}, PR AUC: {curves['pr']['auc']:.4f}")
+
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(args.score_file))
+    stem = os.path.splitext(os.path.basename(args.score_file))[0]
+    output_path = os.path.join(output_dir, f"{stem}_curves.png")
+    plot_curves(curves, stem, output_path)
+    print(f"Curves saved to {output_path}")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,5 @@
 import os
 import glob
-import joblib
 import argparse
 import pandas as pd
 import numpy as np
@@ -9,9 +8,10 @@ import seaborn as sns
 from sklearn.impute import SimpleImputer
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import confusion_matrix, ConfusionMatrixDisplay
+from model_bundle import load_components
 
 parser = argparse.ArgumentParser(description='Evaluate an XGBoost model and generate a confusion matrix.')
-parser.add_argument('model_path', type=str, help='Absolute path to the saved XGBoost model file (xgboost_best_model.pkl).')
+parser.add_argument('model_path', type=str, help='Absolute path to the saved model file (xgboost_best_model.pkl) or a bundle directory.')
 parser.add_argument('--caption', type=str, default='Confusion Matrix', help='Custom description for the confusion matrix caption.')
 args = parser.parse_args()
 
@@ -51,14 +51,13 @@ data = pd.concat(dataframes, ignore_index=True)
 
 X = data.drop(columns=['label'])
 y = data['label']
-imputer = joblib.load(os.path.join(os.path.dirname(args.model_path), "imputer.pkl"))
+model, imputer, _ = load_components(args.model_path)
 X_imputed = imputer.transform(X)
 
 _, X_test, _, y_test = train_test_split(
     X_imputed, y, test_size=0.2, random_state=42, stratify=y
 )
 
-model = joblib.load(args.model_path)
 y_pred = model.predict(X_test)
 
 cm = confusion_matrix(y_test, y_pred)
@@ -0,0 +1,50 @@
+import numpy as np
+from sklearn.kernel_approximation import Nystroem, RBFSampler
+from sklearn.linear_model import SGDOneClassSVM
+from sklearn.pipeline import Pipeline
+
+APPROXIMATIONS = ("nystroem", "rbf")
+
+def resolve_gamma(gamma, X):
+    # Same definitions as sklearn.svm.OneClassSVM
+    if gamma == "scale":
+        variance = X.var()
+        return 1.0 / (X.shape[1] * variance) if variance != 0 else 1.0
+    if gamma == "auto":
+        return 1.0 / X.shape[1]
+    return float(gamma)
+
+def make_feature_map(approximation, gamma, n_components, random_state=42):
+    if approximation == "nystroem":
+        return Nystroem(kernel="rbf", gamma=gamma, n_components=n_components, random_state=random_state)
+    if approximation == "rbf":
+        return RBFSampler(gamma=gamma, n_components=n_components, random_state=random_state)
+    raise ValueError(f"Unknown kernel approximation: {approximation}")
+
+def lightweight_coreset(X, size, random_state=42):
+    # Lightweight coreset (Bachem et al., 2018): mix uniform sampling with sampling
+    # proportional to the squared distance from the mean, reweighted to stay unbiased
+    if size >= len(X):
+        return X, np.ones(len(X))
+    rng = np.random.default_rng(random_state)
+    distances = ((X - X.mean(axis=0)) ** 2).sum(axis=1)
+    total = distances.sum()
+    probabilities = 0.5 / len(X) + (0.5 * distances / total if total > 0 else 0.5 / len(X))
+    probabilities = probabilities / probabilities.sum()
+    indices = rng.choice(len(X), size=size, replace=True, p=probabilities)
+    weights = 1.0 / (size * probabilities[indices])
+    # Scale weights so their mean is 1, SGD step sizes assume unit weights
+    return X[indices], weights / weights.mean()
+
+def fit_approximate_ocsvm(X, nu=0.01, gamma="auto", approximation="nystroem", n_components=500,
+                          coreset_size=None, random_state=42, max_iter=1000, tol=1e-3):
+    sample_weight = None
+    if coreset_size:
+        X, sample_weight = lightweight_coreset(X, coreset_size, random_state)
+
+    model = Pipeline([
+        ("features", make_feature_map(approximation, resolve_gamma(gamma, X), n_components, random_state)),
+        ("svm", SGDOneClassSVM(nu=nu, max_iter=max_iter, tol=tol, random_state=random_state)),
+    ])
+    model.fit(X, svm__sample_weight=sample_weight)
+    return model
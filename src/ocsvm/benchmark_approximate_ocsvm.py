@@ -0,0 +1,125 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import pandas as pd
+from sklearn.svm import OneClassSVM
+from sklearn.impute import SimpleImputer
+from sklearn.preprocessing import StandardScaler
+from approximate_ocsvm import APPROXIMATIONS, fit_approximate_ocsvm
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "model_evaluation"))
+from score_store import ScoreIndex
+
+# python3 benchmark_approximate_ocsvm.py --training-files 20 --n-components 100 500 1000
+
+base_dir = "/home/philipp/Documents/Thesis/session_Datasets"
+file_prefixes = {
+    "normal": None,
+    "slowloris": "slowloris_isolated_con:5-10_sleep:1-5_time:100_it:",
+    "quicly": "quicly_isolation_time:100_it:",
+    "lsquic": "lsquic_isolation_time:100_it:"
+}
+
+def iteration_number(path):
+    try:
+        return int(path.split('it:')[1].split('.')[0])
+    except (IndexError, ValueError):
+        return None
+
+def test_files(scenario, prefix):
+    # Same test files as fine_tuning_training_ocsvm.py
+    first, last = (81, 100) if scenario == "normal" else (1, 50)
+    files = [f for f in glob.glob(os.path.join(base_dir, scenario, "*.csv"))
+             if iteration_number(f) is not None and first <= iteration_number(f) <= last]
+    if prefix:
+        files = [f for f in files if os.path.basename(f).startswith(prefix)]
+    return sorted(files, key=iteration_number)
+
+def load_test_sets(imputer, scaler):
+    test_sets = []
+    for scenario, prefix in file_prefixes.items():
+        file_matrices = [(os.path.basename(f), scaler.transform(imputer.transform(pd.read_csv(f))))
+                         for f in test_files(scenario, prefix)]
+        if file_matrices:
+            test_sets.append((scenario, file_matrices))
+    return test_sets
+
+def evaluate(name, fit, X_train, test_sets, attack_inclusive):
+    start_time = time.perf_counter()
+    model = fit(X_train)
+    training_time = time.perf_counter() - start_time
+
+    n_flows = sum(len(X) for _, file_matrices in test_sets for _, X in file_matrices)
+    start_time = time.perf_counter()
+    scenario_scores = [(scenario, [(filename, model.decision_function(X)) for filename, X in file_matrices])
+                       for scenario, file_matrices in test_sets]
+    scoring_time = time.perf_counter() - start_time
+
+    index = ScoreIndex(scenario_scores, {"attack_inclusive": attack_inclusive})
+    result = {
+        "model": name,
+        "training_seconds": training_time,
+        "scoring_flows_per_sec": n_flows / scoring_time,
+        "attack_percentage": {summary["scenario"]: summary["total"]["attack_percentage"]
+                              for summary in index.summarize_all(0.0) if summary["total"]["total"]},
+    }
+    if "normal" in index.scenarios and len(index.scenarios) > 1:
+        result["roc_auc"] = float(index.curves("normal")["roc"]["auc"])
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare exact and approximate One-Class SVMs on the same train/test split.")
+    parser.add_argument('--training-files', type=int, default=20, help="Number of normal CSVs used for training")
+    parser.add_argument('--nu', type=float, default=0.01)
+    parser.add_argument('--gamma', default='auto', help="'scale', 'auto' or a float")
+    parser.add_argument('--approximations', choices=APPROXIMATIONS, nargs="+", default=list(APPROXIMATIONS))
+    parser.add_argument('--n-components', type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument('--coreset-size', type=int, help="Also benchmark approximate models trained on a coreset of this size")
+    parser.add_argument('--skip-exact', action='store_true', help="Only run the approximate models")
+    args = parser.parse_args()
+    gamma = args.gamma if args.gamma in ('scale', 'auto') else float(args.gamma)
+
+    csv_files = glob.glob(os.path.join(base_dir, "normal", "*.csv"))
+    training_files = csv_files[:args.training_files]
+    df_normal = pd.concat([pd.read_csv(f) for f in training_files], ignore_index=True)
+    imputer = SimpleImputer(strategy='mean')
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(imputer.fit_transform(df_normal))
+    print(f"Training on {len(X_train)} flows from {len(training_files)} files")
+
+    test_sets = load_test_sets(imputer, scaler)
+
+    candidates = []
+    if not args.skip_exact:
+        candidates.append(("exact", lambda X: OneClassSVM(kernel="rbf", gamma=gamma, nu=args.nu).fit(X), True))
+    for approximation in args.approximations:
+        for n_components in args.n_components:
+            for coreset_size in [None, args.coreset_size] if args.coreset_size else [None]:
+                name = f"{approximation}_{n_components}" + (f"_coreset{coreset_size}" if coreset_size else "")
+                fit = lambda X, a=approximation, n=n_components, c=coreset_size: fit_approximate_ocsvm(
+                    X, nu=args.nu, gamma=gamma, approximation=a, n_components=n, coreset_size=c)
+                candidates.append((name, fit, False))
+
+    results = []
+    for name, fit, attack_inclusive in candidates:
+        print(f"\nBenchmarking {name}...")
+        results.append(evaluate(name, fit, X_train, test_sets, attack_inclusive))
+
+    scenarios = [scenario for scenario, _ in test_sets]
+    print(f"\n{'model':<28}{'train s':>10}{'flows/s':>12}{'ROC AUC':>9}" + "".join(f"{s:>11}" for s in scenarios))
+    for result in results:
+        print(f"{result['model']:<28}{result['training_seconds']:>10.1f}{result['scoring_flows_per_sec']:>12.0f}"
+              f"{result.get('roc_auc', float('nan')):>9.4f}"
+              + "".join(f"{result['attack_percentage'].get(s, float('nan')):>10.2f}%" for s in scenarios))
+
+    output_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "approximate_ocsvm_benchmark.json")
+    with open(output_path, 'w') as f:
+        json.dump({"training_flows": len(X_train), "training_files": len(training_files),
+                   "nu": args.nu, "gamma": args.gamma, "results": results}, f, indent=4)
+    print(f"\nResults saved to {output_path}")
+
+if __name__ == "__main__":
+    main()
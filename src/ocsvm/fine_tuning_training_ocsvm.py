@@ -1,5 +1,6 @@
 import pandas as pd
 import glob
+import argparse
 from sklearn.svm import OneClassSVM
 from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import StandardScaler, MinMaxScaler
@@ -7,7 +8,11 @@ import joblib
 import os
 from itertools import product
 import json
-from tqdm import tqdm
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "model_evaluation"))
+from score_store import ScoreIndex, save_scores, split_scores, stack_files
+from approximate_ocsvm import APPROXIMATIONS, fit_approximate_ocsvm
 
 def load_csv_files(file_paths):
     dataframes = []
@@ -19,7 +24,7 @@ def load_csv_files(file_paths):
             print(f"Error loading {file}: {e}")
     return dataframes
 
-def test_scenario(scenario_path, model, scaler, imputer, scenario_name, file_prefix=None, normal_test=False):
+def select_test_files(scenario_path, file_prefix=None, normal_test=False):
     csv_files = glob.glob(os.path.join(scenario_path, "*.csv"))
     
     file_numbers = []
@@ -39,50 +44,7 @@ def test_scenario(scenario_path, model, scaler, imputer, scenario_name, file_pre
 
     if file_prefix:
         valid_files = [f for f in valid_files if os.path.basename(f).startswith(file_prefix)]
-    
-    if not valid_files:
-        return None
-
-    results = {
-        "scenario": scenario_name,
-        "files": [],
-        "total": {"normal": 0, "attack": 0, "total": 0}
-    }
-    
-    for file in tqdm(valid_files, desc=f"Testing {scenario_name}"):
-        try:
-            df = pd.read_csv(file)
-            X = imputer.fit_transform(df)
-            if scaler is not None:
-                X = scaler.transform(X)
-            predictions = model.predict(X)
-            
-            normal = int(sum(predictions == 1))
-            attack = int(sum(predictions == -1))
-            total = len(predictions)
-            
-            results["files"].append({
-                "filename": os.path.basename(file),
-                "normal": normal,
-                "attack": attack,
-                "total": total,
-                "normal_percentage": float(normal/total*100),
-                "attack_percentage": float(attack/total*100)
-            })
-            
-            results["total"]["normal"] += normal
-            results["total"]["attack"] += attack
-            results["total"]["total"] += total
-            
-        except Exception as e:
-            print(f"\nError processing {file}: {e}")
-    
-    if results["total"]["total"] > 0:
-        total = results["total"]["total"]
-        results["total"]["normal_percentage"] = float(results["total"]["normal"]/total*100)
-        results["total"]["attack_percentage"] = float(results["total"]["attack"]/total*100)
-    
-    return results
+    return valid_files
 
 nu_values = [0.001, 0.01,  0.1, 0.5]
 gamma_values = ['scale', 'auto', 0.01, 0.001, 0.00001]
@@ -92,10 +54,20 @@ scaling_methods = [
     ('minmax', MinMaxScaler())
 ]
 
+parser = argparse.ArgumentParser(description="One-Class SVM grid search over nu, gamma and scaling.")
+parser.add_argument('--mode', choices=['exact', 'approximate'], default='exact',
+                    help="exact: kernel OneClassSVM, approximate: kernel approximation + SGDOneClassSVM")
+parser.add_argument('--training-files', type=int, default=20, help="Number of normal CSVs used for training")
+parser.add_argument('--approximation', choices=APPROXIMATIONS, default='nystroem')
+parser.add_argument('--n-components', type=int, default=500, help="Dimension of the approximate kernel feature map")
+parser.add_argument('--coreset-size', type=int, help="Train approximate models on a weighted coreset of this many flows")
+args = parser.parse_args()
+model_prefix = "ocsvm" if args.mode == 'exact' else f"sgdocsvm_{args.approximation}"
+
 dataset_path = "/home/philipp/Documents/Thesis/session_Datasets/normal/*.csv"
 
 csv_files = glob.glob(dataset_path)
-training_files = csv_files[:20]
+training_files = csv_files[:args.training_files]
 
 dataframes = load_csv_files(training_files)
 if not dataframes:
@@ -109,6 +81,7 @@ print(f"Loaded {len(X_train)} NetML flow entries for training")
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 models_dir = os.path.join(script_dir, "grid_search_models")
+scores_dir = os.path.join(script_dir, "grid_search_scores")
 os.makedirs(models_dir, exist_ok=True)
 
 all_results = {
@@ -125,8 +98,24 @@ file_prefixes = {
     "lsquic": "lsquic_isolation_time:100_it:"
 }
 
+base_dir = "/home/philipp/Documents/Thesis"
+scenarios = ["normal", "slowloris", "quicly", "lsquic"]
+
+# Test files are imputed with the training imputer once and shared by every model
+test_sets = []
+for scenario in scenarios:
+    scenario_path = os.path.join(base_dir, "session_Datasets", scenario)
+    if not os.path.exists(scenario_path):
+        print(f"Directory not found: {scenario_path}")
+        continue
+
+    valid_files = select_test_files(scenario_path, file_prefixes.get(scenario), scenario == "normal")
+    filenames, offsets, X_test = stack_files(valid_files, imputer.transform)
+    if filenames:
+        test_sets.append((scenario, filenames, offsets, X_test))
+
 for nu, gamma, (scaling_name, scaler) in product(nu_values, gamma_values, scaling_methods):
-    model_name = f"ocsvm_nu{nu}_gamma{gamma}_{scaling_name}".replace(".", "")
+    model_name = f"{model_prefix}_nu{nu}_gamma{gamma}_{scaling_name}".replace(".", "")
     print(f"\nTraining model: {model_name}")
     print(f"Parameters: nu={nu}, gamma={gamma}, scaling={scaling_name}")
     
@@ -134,8 +123,12 @@ for nu, gamma, (scaling_name, scaler) in product(nu_values, gamma_values, scalin
     if scaler is not None:
         X_train_scaled = scaler.fit_transform(X_train)
     
-    svm_model = OneClassSVM(kernel="rbf", gamma=gamma, nu=nu)
-    svm_model.fit(X_train_scaled)
+    if args.mode == 'exact':
+        svm_model = OneClassSVM(kernel="rbf", gamma=gamma, nu=nu)
+        svm_model.fit(X_train_scaled)
+    else:
+        svm_model = fit_approximate_ocsvm(X_train_scaled, nu=nu, gamma=gamma, approximation=args.approximation,
+                                          n_components=args.n_components, coreset_size=args.coreset_size)
     
     model_path = os.path.join(models_dir, f"{model_name}.pkl")
     imputer_path = os.path.join(models_dir, f"{model_name}_imputer.pkl")
@@ -148,8 +141,6 @@ for nu, gamma, (scaling_name, scaler) in product(nu_values, gamma_values, scalin
         joblib.dump(scaler, scaler_path)
 
     print("\nTesting model on all scenarios...")
-    base_dir = "/home/philipp/Documents/Thesis"
-    scenarios = ["normal", "slowloris", "quicly", "lsquic"]
     
     model_results = {
         "model_name": model_name,
@@ -161,17 +152,17 @@ for nu, gamma, (scaling_name, scaler) in product(nu_values, gamma_values, scalin
         "scenarios": []
     }
     
-    for scenario in scenarios:
-        scenario_path = os.path.join(base_dir, "session_Datasets", scenario)
-        if not os.path.exists(scenario_path):
-            print(f"Directory not found: {scenario_path}")
-            continue
-        
-        file_prefix = file_prefixes.get(scenario)
-        normal_test = (scenario == "normal")
-        results = test_scenario(scenario_path, svm_model, scaler, imputer, scenario, file_prefix, normal_test)
-        if results:
-            model_results["scenarios"].append(results)
+    scenario_scores = []
+    for scenario, filenames, offsets, X_test in test_sets:
+        if scaler is not None:
+            X_test = scaler.transform(X_test)
+        scenario_scores.append((scenario, split_scores(svm_model.decision_function(X_test), filenames, offsets)))
+
+    # decision_function scores; OneClassSVM flags a flow as attack at or below 0, SGDOneClassSVM below 0
+    score_metadata = {"score": "decision_function", "attack_inclusive": args.mode == 'exact',
+                      "operating_points": {model_name: 0.0}}
+    save_scores(os.path.join(scores_dir, f"{model_name}.npz"), scenario_scores, score_metadata)
+    model_results["scenarios"] = ScoreIndex(scenario_scores, score_metadata).summarize_all(0.0)
     
     all_results["models"].append(model_results)
     
@@ -197,4 +188,4 @@ with open(os.path.join(models_dir, "models_info.txt"), "w") as f:
     f.write("Models created:\n")
     for nu, gamma, (scaling_name, _) in product(nu_values, gamma_values, scaling_methods):
         f.write(f"\n- nu={nu}, gamma={gamma}, scaling={scaling_name}")
-        f.write(f"\n  Model name: ocsvm_nu{nu}_gamma{gamma}_{scaling_name}".replace(".", ""))
+        f.write(f"\n  Model name: {model_prefix}_nu{nu}_gamma{gamma}_{scaling_name}".replace(".", ""))
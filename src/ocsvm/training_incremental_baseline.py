@@ -0,0 +1,234 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import SGDOneClassSVM
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import OneClassSVM
+from approximate_ocsvm import APPROXIMATIONS, make_feature_map, resolve_gamma
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "model_evaluation"))
+from model_bundle import UNSUPERVISED_LABELS, save_bundle
+from benchmark_utils import peak_rss_mb, print_summary, run_summary
+
+# python3 training_incremental_baseline.py --model sgd-ocsvm
+# python3 training_incremental_baseline.py --model iforest --compare
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+dataset_path = "/home/philipp/Documents/Thesis/session_Datasets/normal"
+MODELS = ("sgd-ocsvm", "iforest")
+# The in-memory limits of training_ocsvm.py and fine_tuning_training_iforest.py
+CAPPED_FILES = {"sgd-ocsvm": 80, "iforest": 10}
+MODEL_FILES = {"sgd-ocsvm": "one_class_svm_model.pkl", "iforest": "isolation_forest_model.pkl"}
+
+def normal_files(limit=None):
+    # Unsorted glob order, the order training_ocsvm.py and fine_tuning_training_iforest.py
+    # slice, so a capped run trains on exactly the files those scripts use
+    files = glob.glob(os.path.join(dataset_path, "*.csv"))
+    return files[:limit] if limit else files
+
+def iter_chunks(files, chunksize=None, columns=None):
+    for path in files:
+        chunks = pd.read_csv(path, chunksize=chunksize) if chunksize else [pd.read_csv(path)]
+        for df in chunks:
+            yield df if columns is None else df.reindex(columns=columns)
+
+class Reservoir:
+    # Uniform sample of every row seen so far (Algorithm R), filled chunk by chunk
+    def __init__(self, size, random_state=42):
+        self.size = size
+        self.rng = np.random.default_rng(random_state)
+        self.rows = None
+        self.seen = 0
+
+    def add(self, X):
+        if self.rows is None:
+            self.rows = np.empty((self.size, X.shape[1]), dtype=X.dtype)
+        n_fill = min(max(self.size - self.seen, 0), len(X))
+        self.rows[self.seen:self.seen + n_fill] = X[:n_fill]
+        rest = X[n_fill:]
+        if len(rest):
+            positions = self.seen + n_fill + np.arange(len(rest))
+            slots = self.rng.integers(0, positions + 1)
+            keep = slots < self.size
+            self.rows[slots[keep]] = rest[keep]
+        self.seen += len(X)
+
+    def sample(self):
+        return self.rows[:min(self.seen, self.size)]
+
+def fit_streaming_imputer(files, chunksize=None):
+    # First pass: column means, fitted into a SimpleImputer that matches one fitted on all rows
+    columns = sums = counts = None
+    n_rows = 0
+    for df in iter_chunks(files, chunksize):
+        if columns is None:
+            columns = list(df.columns)
+            sums = np.zeros(len(columns))
+            counts = np.zeros(len(columns))
+        values = df.reindex(columns=columns).to_numpy(dtype=np.float64)
+        sums += np.nansum(values, axis=0)
+        counts += np.count_nonzero(~np.isnan(values), axis=0)
+        n_rows += len(values)
+
+    with np.errstate(invalid='ignore'):
+        means = sums / counts
+    imputer = SimpleImputer(strategy='mean')
+    imputer.fit(pd.DataFrame([means], columns=columns))
+    return columns, imputer, n_rows
+
+def fit_streaming_scaler(files, columns, imputer, reservoir, chunksize=None):
+    # Second pass: scaler statistics on the imputed rows, and the reservoir sample
+    scaler = StandardScaler()
+    for df in iter_chunks(files, chunksize, columns):
+        X = imputer.transform(df)
+        scaler.partial_fit(X)
+        reservoir.add(X)
+    return scaler
+
+def train_incremental(files, args):
+    columns, imputer, n_rows = fit_streaming_imputer(files, args.chunksize)
+    reservoir = Reservoir(args.reservoir_size)
+    scaler = fit_streaming_scaler(files, columns, imputer, reservoir, args.chunksize)
+    # The scaler is only final after the pass, so the reservoir is scaled afterwards
+    sample = scaler.transform(reservoir.sample())
+    print(f"Streamed {n_rows} flows from {len(files)} files, reservoir of {len(sample)}")
+
+    if args.model == "iforest":
+        # Every tree only sees max_samples=256 rows, so a large uniform reservoir
+        # gives the same forest distribution as fitting on all rows
+        model = IsolationForest(n_estimators=args.n_estimators, contamination=args.contamination, random_state=42)
+        model.fit(sample)
+        return model, imputer, scaler, n_rows
+
+    features = make_feature_map(args.approximation, resolve_gamma(args.gamma, sample), args.n_components)
+    features.fit(sample)
+    svm = SGDOneClassSVM(nu=args.nu, random_state=42)
+    rng = np.random.default_rng(42)
+    for epoch in range(args.epochs):
+        # Files are recorded sessions, so shuffle file order and rows within a chunk for SGD
+        for file_index in rng.permutation(len(files)):
+            for df in iter_chunks([files[file_index]], args.chunksize, columns):
+                X = features.transform(scaler.transform(imputer.transform(df)))
+                svm.partial_fit(X[rng.permutation(len(X))])
+        print(f"Epoch {epoch + 1}/{args.epochs} done")
+    return Pipeline([("features", features), ("svm", svm)]), imputer, scaler, n_rows
+
+def train_capped(files, args):
+    # The current approach: concatenate the capped file list and fit in memory
+    df_normal = pd.concat([pd.read_csv(path) for path in files], ignore_index=True)
+    imputer = SimpleImputer(strategy='mean')
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(imputer.fit_transform(df_normal))
+    if args.model == "iforest":
+        model = IsolationForest(n_estimators=args.n_estimators, contamination=args.contamination, random_state=42)
+    else:
+        gamma = args.gamma if args.gamma in ("scale", "auto") else float(args.gamma)
+        model = OneClassSVM(kernel="rbf", gamma=gamma, nu=args.nu)
+    model.fit(X_train)
+    return model, imputer, scaler, len(df_normal)
+
+def run_approach(approach, args):
+    command = [sys.executable, os.path.abspath(__file__), "--model", args.model, "--no-save"]
+    if approach == "capped":
+        command += ["--capped", str(CAPPED_FILES[args.model])]
+    for option in ("training_files", "chunksize", "reservoir_size", "epochs", "n_components", "n_estimators"):
+        value = getattr(args, option)
+        if value is not None:
+            command += [f"--{option.replace('_', '-')}", str(value)]
+    command += ["--approximation", args.approximation, "--gamma", str(args.gamma),
+                "--nu", str(args.nu), "--contamination", str(args.contamination)]
+    return run_summary(command, "approach", approach)
+
+def compare(args):
+    results = []
+    print(f"capped: the first {CAPPED_FILES[args.model]} normal files in glob order, as the current training scripts use them")
+    for approach in ("capped", "incremental"):
+        print(f"Running {approach}...")
+        results.append(run_approach(approach, args))
+
+    print(f"\n{'approach':<12}{'files':>6}{'flows':>12}{'fit s':>10}{'peak RSS MB':>14}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['approach']:<12} {result['error']}")
+            continue
+        print(f"{result['approach']:<12}{result['files']:>6}{result['flows']:>12}"
+              f"{result['fit_seconds']:>10.1f}{result['peak_rss_mb']:>14.0f}")
+
+    output_path = os.path.join(script_dir, f"incremental_{args.model}_benchmark.json")
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"\nResults saved to {output_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the normal-traffic baseline out of core, chunk by chunk.")
+    parser.add_argument('--model', choices=MODELS, default='sgd-ocsvm',
+                        help="sgd-ocsvm: kernel approximation + SGDOneClassSVM.partial_fit, "
+                             "iforest: IsolationForest on a reservoir sample")
+    parser.add_argument('--training-files', type=int, help="Number of normal CSVs, defaults to all of them")
+    parser.add_argument('--chunksize', type=int, help="Rows per chunk, defaults to one chunk per CSV")
+    parser.add_argument('--reservoir-size', type=int, default=100000,
+                        help="Rows kept for the IsolationForest and for fitting the kernel approximation")
+    parser.add_argument('--epochs', type=int, default=3, help="Passes of SGDOneClassSVM.partial_fit over the files")
+    parser.add_argument('--nu', type=float, default=0.01)
+    parser.add_argument('--gamma', default='auto')
+    parser.add_argument('--approximation', choices=APPROXIMATIONS, default='nystroem')
+    parser.add_argument('--n-components', type=int, default=500, help="Dimension of the approximate kernel feature map")
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--contamination', type=float, default=0.001)
+    parser.add_argument('--capped', type=int, help="Run the current in-memory approach on this many files instead")
+    parser.add_argument('--compare', action='store_true', help="Run the capped and incremental approaches and compare them")
+    parser.add_argument('--no-save', action='store_true', help="Skip saving the model, e.g. when benchmarking")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args)
+        return
+
+    approach = "capped" if args.capped else "incremental"
+    files = normal_files(args.capped or args.training_files)
+    if not files:
+        raise ValueError(f"No normal CSVs found in {dataset_path}")
+    print(f"Training {args.model} ({approach}) on {len(files)} normal files")
+
+    start_time = time.perf_counter()
+    if approach == "capped":
+        model, imputer, scaler, n_rows = train_capped(files, args)
+    else:
+        model, imputer, scaler, n_rows = train_incremental(files, args)
+    fit_seconds = time.perf_counter() - start_time
+
+    summary = {
+        "approach": approach,
+        "model": args.model,
+        "model_class": type(model).__name__,
+        "files": len(files),
+        "flows": n_rows,
+        "fit_seconds": fit_seconds,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    print(f"Trained in {fit_seconds:.1f}s, peak RSS {summary['peak_rss_mb']:.0f} MB")
+
+    if not args.no_save:
+        model_dir = os.path.join(script_dir, f"{approach}_{args.model}_model")
+        os.makedirs(model_dir, exist_ok=True)
+        joblib.dump(model, os.path.join(model_dir, MODEL_FILES[args.model]))
+        joblib.dump(imputer, os.path.join(model_dir, "imputer.pkl"))
+        joblib.dump(scaler, os.path.join(model_dir, "scaler.pkl"))
+        save_bundle(os.path.join(model_dir, "bundle"), model, imputer, scaler, label_map=UNSUPERVISED_LABELS,
+                    training_files=files, timings={"fit_seconds": fit_seconds}, extra={"approach": approach})
+        print(f"Model saved to {model_dir}")
+
+    # Parsed by --compare
+    print_summary(summary)
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,17 @@
 import pandas as pd
 import glob
+import argparse
 from sklearn.svm import OneClassSVM
 from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import StandardScaler
 import joblib
 import os
+import sys
+import time
 import numpy as np
+from approximate_ocsvm import APPROXIMATIONS, fit_approximate_ocsvm
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "model_evaluation"))
+from model_bundle import UNSUPERVISED_LABELS, save_bundle
 
 def load_csv_files(file_paths):
     dataframes = []
@@ -17,9 +23,18 @@ def load_csv_files(file_paths):
             print(f"Error loading {file}: {e}")
     return dataframes
 
+parser = argparse.ArgumentParser(description="Train a One-Class SVM on normal traffic.")
+parser.add_argument('--mode', choices=['exact', 'approximate'], default='exact',
+                    help="exact: kernel OneClassSVM, approximate: kernel approximation + SGDOneClassSVM")
+parser.add_argument('--training-files', type=int, default=80, help="Number of normal CSVs used for training")
+parser.add_argument('--approximation', choices=APPROXIMATIONS, default='nystroem')
+parser.add_argument('--n-components', type=int, default=500, help="Dimension of the approximate kernel feature map")
+parser.add_argument('--coreset-size', type=int, help="Train the approximate model on a weighted coreset of this many flows")
+args = parser.parse_args()
+
 dataset_path = "/home/philipp/Documents/Thesis/session_Datasets/normal/*.csv"
 csv_files = glob.glob(dataset_path)
-training_files = csv_files[:80]
+training_files = csv_files[:args.training_files]
 dataframes = load_csv_files(training_files)
 
 if not dataframes:
@@ -35,19 +50,33 @@ scaler = StandardScaler()
 X_scaled = scaler.fit_transform(X_imputed)
 
 
-svm_model = OneClassSVM(kernel="rbf", gamma="auto", nu=0.01)
-svm_model.fit(X_scaled)
+script_dir = os.path.dirname(os.path.abspath(__file__))
+start_time = time.perf_counter()
+if args.mode == 'exact':
+    svm_model = OneClassSVM(kernel="rbf", gamma="auto", nu=0.01)
+    svm_model.fit(X_scaled)
+    model_dir = script_dir
+    model_path = os.path.join(model_dir, "one_class_svm_model.pkl")
+else:
+    svm_model = fit_approximate_ocsvm(X_scaled, nu=0.01, gamma="auto", approximation=args.approximation,
+                                      n_components=args.n_components, coreset_size=args.coreset_size)
+    model_dir = os.path.join(script_dir, "approximate_ocsvm_model")
+    os.makedirs(model_dir, exist_ok=True)
+    model_path = os.path.join(model_dir, "one_class_svm_model.pkl")
 
+fit_seconds = time.perf_counter() - start_time
 
-script_dir = os.path.dirname(os.path.abspath(__file__))
-model_path = os.path.join(script_dir, "one_class_svm_model.pkl")
-imputer_path = os.path.join(script_dir, "imputer.pkl")
-scaler_path = os.path.join(script_dir, "scaler.pkl")
+imputer_path = os.path.join(model_dir, "imputer.pkl")
+scaler_path = os.path.join(model_dir, "scaler.pkl")
 
 joblib.dump(svm_model, model_path)
 joblib.dump(imputer, imputer_path)
 joblib.dump(scaler, scaler_path)
+bundle_dir = save_bundle(os.path.join(model_dir, "one_class_svm_bundle"), svm_model, imputer, scaler,
+                         label_map=UNSUPERVISED_LABELS, training_files=training_files,
+                         timings={"fit_seconds": fit_seconds}, extra={"mode": args.mode})
 
 print(f"Weighted Model trained and saved at {model_path}")
 print(f"Imputer saved at {imputer_path}")
 print(f"Scaler saved at {scaler_path}")
+print(f"Bundle saved at {bundle_dir}")
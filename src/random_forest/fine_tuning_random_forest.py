@@ -1,29 +1,24 @@
-import pandas as pd
-import glob
+import sys
 import os
 import json
 import joblib
-import optuna
+import argparse
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.impute import SimpleImputer
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import f1_score, classification_report
 from joblib import parallel_backend
 import gc  
 
-def load_csv_files(file_paths, label):
-    dfs = []
-    for file in file_paths:
-        try:
-            df = pd.read_csv(file)
-            df['label'] = label
-            dfs.append(df)
-        except Exception as e:
-            print(f"Error loading {file}: {e}")
-    return dfs
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "file_processing"))
+from dataset_loader import load_labeled_matrix
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tuning"))
+from optuna_runner import add_study_arguments, load_study, run_study, report_and_prune, staged_sizes
+
+parser = argparse.ArgumentParser(description="Tune hyperparameters with a persistent Optuna study.")
+add_study_arguments(parser, "random_forest", os.path.dirname(os.path.abspath(__file__)))
+args = parser.parse_args()
 
 base_dir = "/home/philipp/Documents/Thesis/session_Datasets"
-scenarios = ["normal", "slowloris", "quicly", "lsquic"]
 
 scenario_config = {
     "normal": {"label": 0, "prefix": None},
@@ -33,23 +28,7 @@ scenario_config = {
 }
 
 print("Loading datasets...")
-dataframes = []
-for scenario in scenarios:
-    path = os.path.join(base_dir, scenario, "*.csv")
-    csv_files = glob.glob(path)
-
-    if scenario_config[scenario]["prefix"]:
-        csv_files = [f for f in csv_files if os.path.basename(f).startswith(scenario_config[scenario]["prefix"])]
-
-    dfs = load_csv_files(csv_files, scenario_config[scenario]["label"])
-    dataframes.extend(dfs)
-
-data = pd.concat(dataframes, ignore_index=True)
-
-X = data.drop(columns=['label'])
-y = data['label']
-imputer = SimpleImputer(strategy='mean')
-X_imputed = imputer.fit_transform(X)
+X_imputed, y, feature_names, imputer = load_labeled_matrix(scenario_config, base_dir)
 X_train, X_test, y_train, y_test = train_test_split(
     X_imputed, y, test_size=0.2, random_state=42, stratify=y
 )
@@ -69,22 +48,30 @@ def objective(trial):
         max_features=max_features,
         class_weight=None,
         n_jobs=-1,
+        warm_start=True,
         random_state=42
     )
 
-    with parallel_backend('loky'):
-        model.fit(X_train, y_train)
-
-    y_pred = model.predict(X_test)
-    return f1_score(y_test, y_pred, average='macro')
+    # Grow the forest in stages; warm_start keeps the trees already built and
+    # ends with the same forest as a single fit, so weak trials can be pruned early
+    for step, n_trees in enumerate(staged_sizes(model.n_estimators), 1):
+        model.set_params(n_estimators=n_trees)
+        with parallel_backend('loky'):
+            model.fit(X_train, y_train)
+        y_pred = model.predict(X_test)
+        score = f1_score(y_test, y_pred, average='macro')
+        report_and_prune(trial, score, step)
+    return score
 
 print("\nStarting Bayesian Search with Optuna...")
-study = optuna.create_study(direction='maximize')
-study.optimize(objective, n_trials=100, n_jobs=3)
+study = run_study(load_study(args), objective, args)
 
 print("\nBest parameters found:")
 print(study.best_params)
 
+if args.no_final_model:
+    sys.exit(0)
+
 print("\nEvaluating best model on test set...")
 best_model = RandomForestClassifier(**study.best_params, n_jobs=-1, random_state=42)
 with parallel_backend('loky'):
@@ -113,5 +100,5 @@ with open(os.path.join(model_dir, "rf_results.json"), 'w') as f:
 print(f"\nModel and results saved to {model_dir}")
 
 
-del X, y, X_train, X_test, y_train, y_test, best_model, study
+del X_imputed, y, X_train, X_test, y_train, y_test, best_model, study
 gc.collect()
\ No newline at end of file
@@ -0,0 +1,140 @@
+import os
+import sys
+import time
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+from collections import deque
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "file_processing"))
+from json_to_packetcsv import (FEATURE_COLUMNS, COLUMN_INDEX, MAX_QUIC_FRAMES, MAX_HTTP3_FRAMES,
+                               fill_packet_row, compute_interarrival_times, iter_packet_records)
+from pcap_to_json import BASE_DIR, BACKENDS, extract_pcap_name, iter_packet_infos
+
+# python3 packet_level_stream_scorer.py lsquic_isolation_time:100_it:1 --backend tshark
+
+INPUT_COLUMNS = FEATURE_COLUMNS[:-1]
+
+def connection_key(packet):
+    return tuple(sorted((packet["Source IP"], packet["Destination IP"])))
+
+class ConnectionWindows:
+    def __init__(self, window_size):
+        self.window_size = window_size
+        self.windows = {}
+        self.alert_sums = {}
+        self.packet_counts = {}
+
+    def update(self, connections, alerts):
+        touched = set()
+        for connection, alert in zip(connections, alerts):
+            window = self.windows.get(connection)
+            if window is None:
+                window = self.windows[connection] = deque(maxlen=self.window_size)
+                self.alert_sums[connection] = 0
+                self.packet_counts[connection] = 0
+            if len(window) == self.window_size:
+                self.alert_sums[connection] -= window[0]
+            window.append(alert)
+            self.alert_sums[connection] += alert
+            self.packet_counts[connection] += 1
+            touched.add(connection)
+        return touched
+
+    def alert_rate(self, connection):
+        return self.alert_sums[connection] / len(self.windows[connection])
+
+class PacketStreamScorer:
+    def __init__(self, model, batch_size, window_size, alert_threshold):
+        self.model = model
+        self.batch_size = batch_size
+        self.alert_threshold = alert_threshold
+        self.windows = ConnectionWindows(window_size)
+        self.values = np.zeros((batch_size, len(FEATURE_COLUMNS)), dtype=np.float64)
+        self.empty_row = [0] * len(FEATURE_COLUMNS)
+        self.arrival_times = []
+        self.connections = []
+        self.prev_ns = None
+        self.packet_count = 0
+        self.alert_count = 0
+        self.scoring_time = 0.0
+
+    def add(self, packet):
+        if len(packet.get("QUIC Frames", [])) > MAX_QUIC_FRAMES or len(packet.get("HTTP3 Frames", [])) > MAX_HTTP3_FRAMES:
+            return
+        start_time = time.perf_counter()
+        self.values[len(self.connections)] = fill_packet_row(list(self.empty_row), packet)
+        self.arrival_times.append(packet["Arrival Time"])
+        self.connections.append(connection_key(packet))
+        self.scoring_time += time.perf_counter() - start_time
+        if len(self.connections) == self.batch_size:
+            self.flush()
+
+    def flush(self):
+        size = len(self.connections)
+        if size == 0:
+            return
+        start_time = time.perf_counter()
+
+        interarrival_times, self.prev_ns = compute_interarrival_times(self.arrival_times, self.prev_ns)
+        self.values[:size, COLUMN_INDEX["Interarrival Time"]] = interarrival_times
+        X = pd.DataFrame(self.values[:size, :-1], columns=INPUT_COLUMNS, copy=False)
+        alerts = (self.model.predict(X) != 0).astype(np.int64)
+
+        touched = self.windows.update(self.connections, alerts)
+        self.scoring_time += time.perf_counter() - start_time
+        self.packet_count += size
+        self.alert_count += int(alerts.sum())
+
+        for connection in sorted(touched):
+            rate = self.windows.alert_rate(connection)
+            if rate >= self.alert_threshold:
+                print(f"ALERT {connection[0]} <-> {connection[1]}: {rate * 100:.1f}% of the last "
+                      f"{len(self.windows.windows[connection])} packets classified as attack")
+
+        self.values[:size] = 0
+        self.arrival_times = []
+        self.connections = []
+
+def main():
+    parser = argparse.ArgumentParser(description="Score QUIC packets with the packet-level model in micro-batches.")
+    parser.add_argument("case", type=str, help="Capture name in packet_capture/, or a .json/.jsonl result file")
+    parser.add_argument("--model-path", type=str,
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "packet_level_random_forest_model", "packet_rf_model.pkl"))
+    parser.add_argument("--backend", choices=BACKENDS, default="tshark")
+    parser.add_argument("--base-dir", type=str, default=BASE_DIR)
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--window-size", type=int, default=1000, help="Packets per connection in the alert window")
+    parser.add_argument("--alert-threshold", type=float, default=0.5, help="Report connections whose window alert rate reaches this value")
+    args = parser.parse_args()
+
+    model = joblib.load(args.model_path)
+    scorer = PacketStreamScorer(model, args.batch_size, args.window_size, args.alert_threshold)
+
+    if args.case.endswith((".json", ".jsonl")):
+        packets = iter_packet_records(args.case)
+    else:
+        case = extract_pcap_name(args.case)
+        packets = iter_packet_infos(f"{args.base_dir}/packet_capture/{case}.pcap",
+                                    f"{args.base_dir}/secrets_files/{case}.txt", case, args.backend)
+
+    start_time = time.perf_counter()
+    for packet in packets:
+        scorer.add(packet)
+    scorer.flush()
+    elapsed = time.perf_counter() - start_time
+
+    print("\nConnection alert rates:")
+    windows = scorer.windows
+    for connection in sorted(windows.windows):
+        print(f"{connection[0]} <-> {connection[1]}: {windows.packet_counts[connection]} packets, "
+              f"window alert rate {windows.alert_rate(connection) * 100:.1f}%")
+
+    print(f"\nScored {scorer.packet_count} packets, {scorer.alert_count} classified as attack")
+    if elapsed > 0 and scorer.scoring_time > 0:
+        print(f"End-to-end: {scorer.packet_count / elapsed:.1f} packets/sec")
+        print(f"Feature building and scoring: {scorer.packet_count / scorer.scoring_time:.1f} packets/sec")
+
+if __name__ == "__main__":
+    main()
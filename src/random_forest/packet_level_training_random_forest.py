@@ -1,4 +1,6 @@
 import pandas as pd
+import os
+import joblib
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
@@ -25,3 +27,8 @@ clf.fit(X_train, y_train)
 y_pred = clf.predict(X_test)
 print("\nClassification Report:")
 print(classification_report(y_test, y_pred, digits=4))
+
+model_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "packet_level_random_forest_model")
+os.makedirs(model_dir, exist_ok=True)
+joblib.dump(clf, os.path.join(model_dir, "packet_rf_model.pkl"))
+print(f"\nModel saved to {model_dir}")
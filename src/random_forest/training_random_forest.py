@@ -1,16 +1,19 @@
-import pandas as pd
-import glob
+import sys
 import os
 import json
+import time
 import joblib
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.impute import SimpleImputer
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
 from joblib import parallel_backend
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "file_processing"))
+from dataset_loader import collect_dataset_files, load_labeled_matrix
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "model_evaluation"))
+from model_bundle import SUPERVISED_LABELS, save_bundle
+
 base_dir = "/home/philipp/Documents/Thesis/session_Datasets"
-scenarios = ["normal", "slowloris", "quicly", "lsquic"]
 scenario_config = {
     "normal": {"label": 0, "prefix": None},
     "slowloris": {"label": 1, "prefix": "slowloris_isolated_con:5-10_sleep:1-5_time:100_it:"},
@@ -18,34 +21,8 @@ scenario_config = {
     "lsquic": {"label": 3, "prefix": "lsquic_isolation_time:100_it:"}
 }
 
-def load_csv_files(file_paths, label):
-    dfs = []
-    for file in file_paths:
-        try:
-            df = pd.read_csv(file)
-            df['label'] = label
-            dfs.append(df)
-        except Exception as e:
-            print(f"Error loading {file}: {e}")
-    return dfs
 print("Loading datasets...")
-dataframes = []
-for scenario in scenarios:
-    path = os.path.join(base_dir, scenario, "*.csv")
-    csv_files = glob.glob(path)
-
-    prefix = scenario_config[scenario]["prefix"]
-    if prefix:
-        csv_files = [f for f in csv_files if os.path.basename(f).startswith(prefix)]
-
-    dfs = load_csv_files(csv_files, scenario_config[scenario]["label"])
-    dataframes.extend(dfs)
-
-data = pd.concat(dataframes, ignore_index=True)
-X = data.drop(columns=['label'])
-y = data['label']
-imputer = SimpleImputer(strategy='mean')
-X_imputed = imputer.fit_transform(X)
+X_imputed, y, feature_names, imputer = load_labeled_matrix(scenario_config, base_dir)
 X_train, X_test, y_train, y_test = train_test_split(
     X_imputed, y, test_size=0.2, random_state=42, stratify=y
 )
@@ -61,8 +38,10 @@ best_params = {
 
 print("Training RandomForest with best parameters...")
 model = RandomForestClassifier(**best_params, n_jobs=-1, random_state=42)
+start_time = time.perf_counter()
 with parallel_backend('loky'):
     model.fit(X_train, y_train)
+fit_seconds = time.perf_counter() - start_time
 
 y_pred = model.predict(X_test)
 report = classification_report(y_test, y_pred, target_names=['Normal', 'Slowloris', 'Quicly', 'LSQUIC'])
@@ -81,4 +60,8 @@ results = {
 with open(os.path.join(model_dir, "rf_results.json"), "w") as f:
     json.dump(results, f, indent=4)
 
+training_files = [path for files in collect_dataset_files(scenario_config, base_dir).values() for path in files]
+save_bundle(os.path.join(model_dir, "bundle"), model, imputer, label_map=SUPERVISED_LABELS,
+            training_files=training_files, timings={"fit_seconds": fit_seconds}, extra={"params": best_params})
+
 print(f"\nModel and results saved to {model_dir}")
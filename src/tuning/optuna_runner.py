@@ -0,0 +1,85 @@
+import os
+import optuna
+from optuna.study import MaxTrialsCallback
+from optuna.trial import TrialState
+
+# Several processes or hosts can work on one study by pointing at the same storage:
+#   python3 fine_tuning_xgboost.py --storage sqlite:////shared/optuna.db --no-final-model
+#   python3 fine_tuning_xgboost.py --storage journal:/shared/xgboost.log --no-final-model
+# SQLite is fine for processes on one machine; use a journal file on a shared
+# filesystem or a server URL (postgresql://...) when spreading across hosts.
+
+PRUNERS = ("median", "hyperband", "none")
+
+def add_study_arguments(parser, study_name, script_dir):
+    parser.add_argument('--study-name', type=str, default=study_name)
+    parser.add_argument('--storage', type=str, default=f"sqlite:///{os.path.join(script_dir, 'optuna_studies.db')}",
+                        help="RDB URL (sqlite:///..., postgresql://...) or journal:<path> for a journal file")
+    parser.add_argument('--n-trials', type=int, default=100, help="Finished trials for the whole study, across all workers")
+    parser.add_argument('--timeout', type=float, help="Wall-clock budget in seconds for this worker")
+    parser.add_argument('--n-jobs', type=int, default=3, help="Parallel trials in this process")
+    parser.add_argument('--pruner', choices=PRUNERS, default="median")
+    parser.add_argument('--no-final-model', action='store_true',
+                        help="Only run trials; leave training the best model to one process")
+    return parser
+
+def make_storage(storage):
+    if not storage.startswith("journal:"):
+        return storage
+    path = storage[len("journal:"):]
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    try:
+        from optuna.storages.journal import JournalFileBackend
+    except ImportError:
+        # optuna < 4.0
+        from optuna.storages import JournalFileStorage as JournalFileBackend
+    return optuna.storages.JournalStorage(JournalFileBackend(path))
+
+def make_pruner(name):
+    if name == "median":
+        return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=1)
+    if name == "hyperband":
+        return optuna.pruners.HyperbandPruner()
+    return optuna.pruners.NopPruner()
+
+def load_study(args, direction='maximize'):
+    return optuna.create_study(
+        study_name=args.study_name,
+        storage=make_storage(args.storage),
+        direction=direction,
+        pruner=make_pruner(args.pruner),
+        load_if_exists=True
+    )
+
+def finished_trials(study):
+    return study.get_trials(deepcopy=False, states=(TrialState.COMPLETE, TrialState.PRUNED))
+
+def run_study(study, objective, args):
+    already_finished = len(finished_trials(study))
+    if already_finished >= args.n_trials:
+        print(f"Study '{study.study_name}' already has {already_finished} finished trials")
+        return study
+    if already_finished:
+        print(f"Resuming study '{study.study_name}' with {already_finished} finished trials")
+
+    # The trial budget counts trials of every worker attached to the study
+    study.optimize(
+        objective,
+        n_jobs=args.n_jobs,
+        timeout=args.timeout,
+        callbacks=[MaxTrialsCallback(args.n_trials, states=(TrialState.COMPLETE, TrialState.PRUNED))],
+        gc_after_trial=True
+    )
+
+    complete = study.get_trials(deepcopy=False, states=(TrialState.COMPLETE,))
+    pruned = study.get_trials(deepcopy=False, states=(TrialState.PRUNED,))
+    print(f"Study '{study.study_name}': {len(complete)} complete, {len(pruned)} pruned trials")
+    return study
+
+def report_and_prune(trial, value, step):
+    trial.report(value, step)
+    if trial.should_prune():
+        raise optuna.TrialPruned()
+
+def staged_sizes(n_estimators, stages=4):
+    return sorted(set(max(1, -(-n_estimators * stage // stages)) for stage in range(1, stages + 1)))
@@ -0,0 +1,23 @@
+import optuna
+import xgboost as xgb
+
+class OptunaPruningCallback(xgb.callback.TrainingCallback):
+    # Reports the validation loss negated, so it points the same way as a
+    # maximised study objective, and prunes the trial when the pruner says so
+    def __init__(self, trial, data_name="validation_0", metric="mlogloss", report_every=10):
+        super().__init__()
+        self.trial = trial
+        self.data_name = data_name
+        self.metric = metric
+        self.report_every = report_every
+
+    def after_iteration(self, model, epoch, evals_log):
+        if epoch % self.report_every:
+            return False
+        loss = evals_log[self.data_name][self.metric][-1]
+        if isinstance(loss, tuple):
+            loss = loss[0]
+        self.trial.report(-float(loss), epoch)
+        if self.trial.should_prune():
+            raise optuna.TrialPruned(f"Trial was pruned at iteration {epoch}")
+        return False
@@ -0,0 +1,57 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+from external_memory import MEMORY_MODES
+
+# python3 benchmark_external_memory_xgboost.py --modes in-memory quantile external
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+def run_mode(mode, extra_args):
+    # A fresh process per mode so ru_maxrss only covers that mode
+    command = [sys.executable, os.path.join(script_dir, "training_external_memory_xgboost.py"),
+               "--mode", mode, "--no-save"] + extra_args
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr)
+        return {"mode": mode, "error": f"exited with code {result.returncode}"}
+    for line in reversed(result.stdout.splitlines()):
+        if line.startswith("SUMMARY "):
+            return json.loads(line[len("SUMMARY "):])
+    return {"mode": mode, "error": "no summary in output"}
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare peak RSS and fit time of in-memory and streamed XGBoost training.")
+    parser.add_argument('--modes', nargs="+", choices=('in-memory',) + MEMORY_MODES,
+                        default=['in-memory'] + list(MEMORY_MODES))
+    parser.add_argument('--params', type=str, help="Passed through to the training script")
+    parser.add_argument('--store-dir', type=str, help="Passed through to the training script")
+    args = parser.parse_args()
+
+    extra_args = []
+    if args.params:
+        extra_args += ["--params", args.params]
+    if args.store_dir:
+        extra_args += ["--store-dir", args.store_dir]
+
+    results = []
+    for mode in args.modes:
+        print(f"Running {mode}...")
+        results.append(run_mode(mode, extra_args))
+
+    print(f"\n{'mode':<12}{'fit s':>10}{'peak RSS MB':>14}{'macro-F1':>10}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['mode']:<12} {result['error']}")
+            continue
+        print(f"{result['mode']:<12}{result['fit_seconds']:>10.1f}{result['peak_rss_mb']:>14.0f}{result['macro_f1']:>10.4f}")
+
+    output_path = os.path.join(script_dir, "external_memory_benchmark.json")
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"\nResults saved to {output_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import xgboost as xgb
+from sklearn.impute import SimpleImputer
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "file_processing"))
+from dataset_loader import collect_dataset_files
+from dataset_store import LABEL_COLUMNS
+
+TEST_SIZE = 0.2
+MEMORY_MODES = ("quantile", "external")
+
+def list_chunks(scenario_config, base_dir, store_dir=None):
+    # One chunk per CSV file or parquet partition, labelled by its scenario
+    dataset_files = collect_dataset_files(scenario_config, base_dir, store_dir)
+    return [(path, scenario_config[scenario]["label"])
+            for scenario, files in dataset_files.items() for path in sorted(files)]
+
+def read_chunk(path, feature_names=None):
+    if path.endswith(".parquet"):
+        df = pq.read_table(path).to_pandas()
+    else:
+        df = pd.read_csv(path)
+    df = df.drop(columns=[column for column in LABEL_COLUMNS if column in df.columns])
+    return df if feature_names is None else df.reindex(columns=feature_names)
+
+def test_mask(n_rows, chunk_index, test_size=TEST_SIZE, seed=42):
+    # Every chunk holds a single label, so a fixed fraction per chunk is a stratified split
+    rng = np.random.default_rng([seed, chunk_index])
+    mask = np.zeros(n_rows, dtype=bool)
+    mask[rng.permutation(n_rows)[:int(round(n_rows * test_size))]] = True
+    return mask
+
+def scan_chunks(chunks, test_size=TEST_SIZE):
+    # First pass: column means for the imputer and training rows per class
+    feature_names = None
+    sums = counts = None
+    class_counts = {}
+    for path, label in chunks:
+        df = read_chunk(path, feature_names)
+        if feature_names is None:
+            feature_names = list(df.columns)
+            sums = np.zeros(len(feature_names))
+            counts = np.zeros(len(feature_names))
+        values = df.to_numpy(dtype=np.float64)
+        sums += np.nansum(values, axis=0)
+        counts += np.count_nonzero(~np.isnan(values), axis=0)
+        class_counts[label] = class_counts.get(label, 0) + len(df) - int(round(len(df) * test_size))
+
+    with np.errstate(invalid='ignore'):
+        means = sums / counts
+    # Fitting on the means alone gives the same statistics_ (and the same dropped
+    # all-NaN columns) as SimpleImputer fitted on the full matrix
+    imputer = SimpleImputer(strategy='mean')
+    imputer.fit(pd.DataFrame([means], columns=feature_names))
+    return feature_names, imputer, class_counts
+
+def balanced_weights(class_counts):
+    # Same as compute_class_weight('balanced')
+    total = sum(class_counts.values())
+    return {label: total / (len(class_counts) * count) for label, count in class_counts.items()}
+
+class ChunkIter(xgb.DataIter):
+    def __init__(self, chunks, feature_names, imputer, part, class_weights=None, cache_prefix=None, test_size=TEST_SIZE):
+        self.chunks = chunks
+        self.feature_names = feature_names
+        self.imputer = imputer
+        self.part = part
+        self.class_weights = class_weights
+        self.test_size = test_size
+        self._index = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        while self._index < len(self.chunks):
+            chunk_index = self._index
+            self._index += 1
+            path, label = self.chunks[chunk_index]
+            df = read_chunk(path, self.feature_names)
+            mask = test_mask(len(df), chunk_index, self.test_size)
+            if self.part == "train":
+                mask = ~mask
+            if not mask.any():
+                continue
+
+            X = self.imputer.transform(df.loc[mask]).astype(np.float32)
+            y = np.full(len(X), label, dtype=np.float32)
+            weight = None
+            if self.class_weights:
+                weight = np.full(len(X), self.class_weights[label], dtype=np.float32)
+            input_data(data=X, label=y, weight=weight)
+            return 1
+        return 0
+
+    def reset(self):
+        self._index = 0
+
+def make_dmatrix(iterator, memory, max_bin=256, ref=None):
+    # quantile keeps only the compressed histogram index in RAM, external also pages it to disk
+    if memory == "external":
+        if hasattr(xgb, "ExtMemQuantileDMatrix"):
+            return xgb.ExtMemQuantileDMatrix(iterator, max_bin=max_bin, ref=ref)
+        return xgb.DMatrix(iterator)
+    return xgb.QuantileDMatrix(iterator, max_bin=max_bin, ref=ref)
+
+def booster_params(params, num_class=4):
+    booster_params = {
+        'objective': 'multi:softprob',
+        'num_class': num_class,
+        'eval_metric': 'mlogloss',
+        'tree_method': 'hist',
+        'seed': 42,
+        'verbosity': 0,
+    }
+    booster_params.update({key: value for key, value in params.items() if key != 'n_estimators'})
+    return booster_params
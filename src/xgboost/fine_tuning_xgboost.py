@@ -1,28 +1,26 @@
-import pandas as pd
-import glob
+import sys
 import os
 import json
 import joblib
-import optuna
+import argparse
 import gc  # Garbage collection
 import xgboost as xgb
-from sklearn.impute import SimpleImputer
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import f1_score, classification_report
 
-def load_csv_files(file_paths, label):
-    dfs = []
-    for file in file_paths:
-        try:
-            df = pd.read_csv(file)
-            df['label'] = label
-            dfs.append(df)
-        except Exception as e:
-            print(f"Error loading {file}: {e}")
-    return dfs
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "file_processing"))
+from dataset_loader import load_labeled_matrix
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tuning"))
+from optuna_runner import add_study_arguments, load_study, run_study
+from xgboost_callbacks import OptunaPruningCallback
+
+parser = argparse.ArgumentParser(description="Tune hyperparameters with a persistent Optuna study.")
+add_study_arguments(parser, "xgboost", os.path.dirname(os.path.abspath(__file__)))
+parser.add_argument('--early-stopping-rounds', type=int, default=20,
+                    help="Stop a trial once validation mlogloss has not improved for this many rounds")
+args = parser.parse_args()
 
 base_dir = "/home/philipp/Documents/Thesis/session_Datasets"
-scenarios = ["normal", "slowloris", "quicly", "lsquic"]
 scenario_config = {
     "normal": {"label": 0, "prefix": None},
     "slowloris": {"label": 1, "prefix": "slowloris_isolated_con:5-10_sleep:1-5_time:100_it:"},
@@ -31,28 +29,19 @@ scenario_config = {
 }
 
 print("Loading datasets...")
-dataframes = []
-for scenario in scenarios:
-    path = os.path.join(base_dir, scenario, "*.csv")
-    csv_files = glob.glob(path)
-
-    if scenario_config[scenario]["prefix"]:
-        csv_files = [f for f in csv_files if os.path.basename(f).startswith(scenario_config[scenario]["prefix"])]
-
-    dfs = load_csv_files(csv_files, scenario_config[scenario]["label"])
-    dataframes.extend(dfs)
-
-data = pd.concat(dataframes, ignore_index=True)
-
-X = data.drop(columns=['label'])
-y = data['label']
-imputer = SimpleImputer(strategy='mean')
-X_imputed = imputer.fit_transform(X)
+X_imputed, y, feature_names, imputer = load_labeled_matrix(scenario_config, base_dir)
 
 X_train, X_test, y_train, y_test = train_test_split(
     X_imputed, y, test_size=0.2, random_state=42, stratify=y
 )
 
+# Validation split for early stopping, carved out of the training part
+X_fit, X_val, y_fit, y_val = train_test_split(
+    X_train, y_train, test_size=0.2, random_state=42, stratify=y_train
+)
+trial_model_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "optuna_trial_models", args.study_name)
+os.makedirs(trial_model_dir, exist_ok=True)
+
 def objective(trial):
     params = {
         'objective': 'multi:softprob',
@@ -71,30 +60,48 @@ def objective(trial):
         'n_jobs': -1
     }
 
-    model = xgb.XGBClassifier(**params)
-    model.fit(X_train, y_train)
+    model = xgb.XGBClassifier(**params, early_stopping_rounds=args.early_stopping_rounds,
+                              callbacks=[OptunaPruningCallback(trial)])
+    model.fit(X_fit, y_fit, eval_set=[(X_val, y_val)], verbose=False)
     y_pred = model.predict(X_test)
+
+    # Keep the trained booster so the best trial does not have to be refitted
+    model_path = os.path.join(trial_model_dir, f"trial_{trial.number}.json")
+    model.save_model(model_path)
+    trial.set_user_attr("model_path", model_path)
+    trial.set_user_attr("best_iteration", int(model.best_iteration))
     return f1_score(y_test, y_pred, average='macro')
 
 print("\nStarting Bayesian Search with Optuna...")
-study = optuna.create_study(direction='maximize')
-study.optimize(objective, n_trials=100, n_jobs=3)
+study = run_study(load_study(args), objective, args)
 
 print("\nBest parameters found:")
 print(study.best_params)
 
-print("\nEvaluating best model on test set...")
-best_model = xgb.XGBClassifier(
-    **study.best_params,
-    objective='multi:softprob',
-    num_class=4,
-    use_label_encoder=False,
-    eval_metric='mlogloss',
-    random_state=42,
-    n_jobs=-1
-)
-best_model.fit(X_train, y_train)
+if args.no_final_model:
+    sys.exit(0)
+
+model_path = study.best_trial.user_attrs.get("model_path")
+if model_path and os.path.exists(model_path):
+    print(f"\nLoading the best trial's model from {model_path}...")
+    best_model = xgb.XGBClassifier()
+    best_model.load_model(model_path)
+else:
+    # The best trial ran on another host, or before trial models were kept
+    print("\nRetraining best model...")
+    best_model = xgb.XGBClassifier(
+        **study.best_params,
+        objective='multi:softprob',
+        num_class=4,
+        use_label_encoder=False,
+        eval_metric='mlogloss',
+        early_stopping_rounds=args.early_stopping_rounds,
+        random_state=42,
+        n_jobs=-1
+    )
+    best_model.fit(X_fit, y_fit, eval_set=[(X_val, y_val)], verbose=False)
 
+print("\nEvaluating best model on test set...")
 y_pred = best_model.predict(X_test)
 report = classification_report(y_test, y_pred, target_names=['Normal', 'Slowloris', 'Quicly', 'LSQUIC'])
 print("\nClassification Report:")
@@ -107,6 +114,7 @@ joblib.dump(imputer, os.path.join(model_dir, "imputer.pkl"))
 
 results = {
     "best_params": study.best_params,
+    "best_iteration": study.best_trial.user_attrs.get("best_iteration"),
     "classification_report": report
 }
 with open(os.path.join(model_dir, "xgboost_results.json"), 'w') as f:
@@ -114,5 +122,5 @@ with open(os.path.join(model_dir, "xgboost_results.json"), 'w') as f:
 
 print(f"\nModel and results saved to {model_dir}")
 
-del X, y, X_train, X_test, y_train, y_test, best_model, study
+del X_imputed, y, X_train, X_test, y_train, y_test, best_model, study
 gc.collect()
@@ -0,0 +1,140 @@
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import joblib
+import numpy as np
+import xgboost as xgb
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import f1_score, classification_report
+from sklearn.utils.class_weight import compute_class_weight
+from external_memory import (MEMORY_MODES, ChunkIter, balanced_weights, booster_params,
+                             list_chunks, make_dmatrix, scan_chunks)
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "file_processing"))
+from dataset_loader import SCENARIO_CONFIG, BASE_DIR, load_labeled_matrix
+
+# python3 training_external_memory_xgboost.py --mode quantile --params balanced_xgboost_model/xgboost_results.json
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PARAMS = {
+    'n_estimators': 300,
+    'max_depth': 8,
+    'learning_rate': 0.1,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'gamma': 0,
+    'min_child_weight': 1
+}
+
+def load_params(params_path):
+    if params_path is None:
+        default_path = os.path.join(script_dir, "balanced_xgboost_model", "xgboost_results.json")
+        params_path = default_path if os.path.exists(default_path) else None
+    if params_path is None:
+        return dict(DEFAULT_PARAMS)
+    with open(params_path, 'r') as f:
+        results = json.load(f)
+    return results.get("best_params", results)
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def train_in_memory(params, store_dir, balanced):
+    # The current path: one dense matrix, split in memory, XGBClassifier.fit
+    X_imputed, y, _, imputer = load_labeled_matrix(SCENARIO_CONFIG, BASE_DIR, store_dir=store_dir, use_cache=False)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X_imputed, y, test_size=0.2, random_state=42, stratify=y
+    )
+    sample_weights = None
+    if balanced:
+        class_weights = compute_class_weight(class_weight='balanced', classes=np.unique(y_train), y=y_train)
+        class_weight_dict = dict(zip(np.unique(y_train), class_weights))
+        sample_weights = np.array([class_weight_dict[label] for label in y_train])
+
+    model = xgb.XGBClassifier(
+        **params,
+        objective='multi:softprob',
+        num_class=4,
+        eval_metric='mlogloss',
+        random_state=42,
+        n_jobs=-1
+    )
+    start_time = time.perf_counter()
+    model.fit(X_train, y_train, sample_weight=sample_weights)
+    fit_seconds = time.perf_counter() - start_time
+    return model.get_booster(), imputer, y_test, model.predict(X_test), fit_seconds
+
+def train_streaming(params, store_dir, balanced, memory, max_bin, cache_dir):
+    chunks = list_chunks(SCENARIO_CONFIG, BASE_DIR, store_dir)
+    feature_names, imputer, class_counts = scan_chunks(chunks)
+    class_weights = balanced_weights(class_counts) if balanced else None
+    print(f"Streaming {len(chunks)} chunks, training rows per class: {class_counts}")
+
+    cache_prefix = lambda part: os.path.join(cache_dir, part) if memory == "external" else None
+    train_iter = ChunkIter(chunks, feature_names, imputer, "train", class_weights, cache_prefix("train"))
+    test_iter = ChunkIter(chunks, feature_names, imputer, "test", cache_prefix=cache_prefix("test"))
+
+    start_time = time.perf_counter()
+    dtrain = make_dmatrix(train_iter, memory, max_bin)
+    dtest = make_dmatrix(test_iter, memory, max_bin, ref=dtrain)
+    booster = xgb.train(booster_params(params), dtrain, num_boost_round=params.get('n_estimators', 100),
+                        evals=[(dtest, "test")], verbose_eval=50)
+    fit_seconds = time.perf_counter() - start_time
+
+    y_pred = booster.predict(dtest).argmax(axis=1)
+    return booster, imputer, dtest.get_label().astype(np.int64), y_pred, fit_seconds
+
+def main():
+    parser = argparse.ArgumentParser(description="Train XGBoost in memory or from a chunked data iterator.")
+    parser.add_argument('--mode', choices=('in-memory',) + MEMORY_MODES, default='quantile',
+                        help="in-memory: dense matrix (current path), quantile: QuantileDMatrix over chunks, "
+                             "external: disk-backed pages over chunks")
+    parser.add_argument('--params', type=str, help="JSON file with best_params, defaults to the balanced tuning results")
+    parser.add_argument('--store-dir', type=str, help="Read parquet partitions instead of CSVs")
+    parser.add_argument('--unbalanced', action='store_true', help="Do not use balanced sample weights")
+    parser.add_argument('--max-bin', type=int, default=256)
+    parser.add_argument('--cache-dir', type=str, help="Page cache for --mode external, defaults to a temporary directory")
+    parser.add_argument('--no-save', action='store_true', help="Skip saving the model, e.g. when benchmarking")
+    args = parser.parse_args()
+
+    params = load_params(args.params)
+    balanced = not args.unbalanced
+    print(f"Training with {args.mode} data and params {params}")
+
+    if args.mode == 'in-memory':
+        booster, imputer, y_test, y_pred, fit_seconds = train_in_memory(params, args.store_dir, balanced)
+    else:
+        with tempfile.TemporaryDirectory(dir=args.cache_dir) as cache_dir:
+            booster, imputer, y_test, y_pred, fit_seconds = train_streaming(
+                params, args.store_dir, balanced, args.mode, args.max_bin, cache_dir)
+
+    report = classification_report(y_test, y_pred, target_names=['Normal', 'Slowloris', 'Quicly', 'LSQUIC'])
+    print("\nClassification Report:")
+    print(report)
+
+    summary = {
+        "mode": args.mode,
+        "fit_seconds": fit_seconds,
+        "peak_rss_mb": peak_rss_mb(),
+        "macro_f1": f1_score(y_test, y_pred, average='macro'),
+    }
+
+    if not args.no_save:
+        model_dir = os.path.join(script_dir, "external_memory_xgboost_model")
+        os.makedirs(model_dir, exist_ok=True)
+        booster.save_model(os.path.join(model_dir, f"xgboost_{args.mode}_model.json"))
+        joblib.dump(imputer, os.path.join(model_dir, "imputer.pkl"))
+        with open(os.path.join(model_dir, f"xgboost_{args.mode}_results.json"), 'w') as f:
+            json.dump({"params": params, "classification_report": report, **summary}, f, indent=4)
+        print(f"\nModel and results saved to {model_dir}")
+
+    # Parsed by benchmark_external_memory_xgboost.py
+    print("SUMMARY " + json.dumps(summary))
+
+if __name__ == "__main__":
+    main()